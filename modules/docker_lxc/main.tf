@@ -1,5 +1,12 @@
-# Download template if not exists
+locals {
+  # Golden template mode: clone a template built by `deploy.py template build`
+  use_golden_template = var.clone_template_vmid > 0
+}
+
+# Download template if not exists (not needed when cloning a golden template)
 resource "null_resource" "download_template" {
+  count = local.use_golden_template ? 0 : 1
+
   provisioner "local-exec" {
     command = <<-EOT
       PYTHON_CMD="python3"
@@ -25,7 +32,9 @@ resource "proxmox_lxc" "docker" {
 
   target_node  = var.target_node
   hostname     = var.hostname
-  ostemplate   = var.ostemplate
+  ostemplate   = local.use_golden_template ? null : var.ostemplate
+  clone        = local.use_golden_template ? tostring(var.clone_template_vmid) : null
+  full         = local.use_golden_template ? var.full_clone : null
   password     = var.password
   unprivileged = true
   cores        = var.cores
@@ -65,7 +74,8 @@ resource "null_resource" "docker_install" {
         "${var.proxmox_host}" \
         "${var.proxmox_ssh_user}" \
         "${proxmox_lxc.docker.vmid}" \
-        "${var.install_compose}"
+        "${var.install_compose}" \
+        "${var.apk_cache_max_mb}"
     EOT
   }
 
@@ -29,6 +29,18 @@ variable "ostemplate_name" {
   default     = "alpine-3.22-default_20250617_amd64.tar.xz"
 }
 
+variable "clone_template_vmid" {
+  description = "VMID of a golden LXC template to clone instead of creating from ostemplate (0 = disabled)"
+  type        = number
+  default     = 0
+}
+
+variable "full_clone" {
+  description = "Use a full clone of the golden template (false = linked clone, needs ZFS/LVM-thin/RBD storage)"
+  type        = bool
+  default     = false
+}
+
 variable "template_storage" {
   description = "Storage where templates are stored"
   type        = string
@@ -89,6 +101,12 @@ variable "install_compose" {
   default     = true
 }
 
+variable "apk_cache_max_mb" {
+  description = "Size limit in MB of the apk package cache on the Proxmox host (0 = disabled)"
+  type        = number
+  default     = 0
+}
+
 variable "start_on_boot" {
   description = "Start container on boot"
   type        = bool
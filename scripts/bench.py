@@ -0,0 +1,153 @@
+"""Load test of the Infisical secrets path (concurrent readers and writers via InfisicalClient)."""
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from scripts.infisical_client import InfisicalClient
+from scripts.standin import InfisicalStandIn
+from scripts.utils import log_error, log_info, log_step
+
+# Secrets written by the benchmark are named BENCH_SECRET_PREFIX<writer>_<n>
+BENCH_SECRET_PREFIX = "SELFHOST_BENCH_"
+
+
+@dataclass
+class OperationStats:
+    """Latencies of one kind of operation."""
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    def percentile(self, p: float) -> float:
+        """Nearest-rank percentile in seconds (0 without samples)."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+@dataclass
+class BenchReport:
+    """Outcome of one benchmark run."""
+    duration: float
+    readers: int
+    writers: int
+    operations: dict[str, OperationStats] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        """Successful operations per second, all kinds together."""
+        done = sum(len(s.latencies) for s in self.operations.values())
+        return done / self.duration if self.duration else 0.0
+
+    def log(self) -> None:
+        log_step(
+            f"Infisical bench: {self.readers} reader(s), {self.writers} writer(s), "
+            f"{self.duration:.1f}s, {self.throughput:.1f} ops/s"
+        )
+        for stats in self.operations.values():
+            if not stats.latencies and not stats.errors:
+                continue
+            log_info(
+                f"  {stats.name:<6} {len(stats.latencies):>7} ok {stats.errors:>5} err  "
+                f"{len(stats.latencies) / self.duration:8.1f}/s  "
+                f"p50 {stats.percentile(50) * 1000:7.1f}ms  "
+                f"p95 {stats.percentile(95) * 1000:7.1f}ms  "
+                f"p99 {stats.percentile(99) * 1000:7.1f}ms"
+            )
+
+
+def run_infisical_bench(
+    host: str,
+    port: int,
+    client_id: str,
+    client_secret: str,
+    project_id: str,
+    env_slug: str = "production",
+    readers: int = 8,
+    writers: int = 0,
+    duration: float = 10.0,
+    secret_path: str = "/",
+    keys_per_writer: int = 4
+) -> Optional[BenchReport]:
+    """
+    Drive concurrent readers (list_secrets) and writers (set_secret) for duration seconds.
+
+    Every worker has its own client (own keep-alive connection and access
+    token); logins happen before the clock starts. The local secret cache is
+    disabled so every read is a request. Writers cycle over keys_per_writer
+    secrets each, so repeated runs do not accumulate secrets.
+
+    Returns:
+        BenchReport, or None if a worker could not log in
+    """
+    workers = [("read", i) for i in range(readers)] + [("write", i) for i in range(writers)]
+    if not workers:
+        log_error("Nothing to run: no readers and no writers")
+        return None
+
+    clients = []
+    for _ in workers:
+        client = InfisicalClient(host, port, cache_ttl=0)
+        if not client.login(client_id, client_secret):
+            return None
+        clients.append(client)
+
+    report = BenchReport(0.0, readers, writers, {"read": OperationStats("read"), "write": OperationStats("write")})
+    start_barrier = threading.Barrier(len(workers) + 1)
+    lock = threading.Lock()
+    deadline = 0.0
+
+    def work(kind: str, index: int, client: InfisicalClient) -> None:
+        latencies, errors, n = [], 0, 0
+        start_barrier.wait()
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            if kind == "read":
+                ok = client.list_secrets(project_id, env_slug, secret_path) is not None
+            else:
+                name = f"{BENCH_SECRET_PREFIX}{index}_{n % keys_per_writer}"
+                ok = client.set_secret(project_id, env_slug, name, f"{time.time():.6f}", secret_path)
+                n += 1
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+        with lock:
+            report.operations[kind].latencies.extend(latencies)
+            report.operations[kind].errors += errors
+
+    with ThreadPoolExecutor(max_workers=len(workers), thread_name_prefix="bench") as pool:
+        futures = [pool.submit(work, kind, i, client) for (kind, i), client in zip(workers, clients)]
+        deadline = time.monotonic() + duration
+        started = time.monotonic()
+        start_barrier.wait()
+        for future in futures:
+            future.result()
+        report.duration = time.monotonic() - started
+
+    return report
+
+
+def run_local_infisical_bench(
+    readers: int = 8,
+    writers: int = 2,
+    duration: float = 10.0,
+    latency: float = 0.0,
+    seed_secrets: int = 20
+) -> Optional[BenchReport]:
+    """Run the benchmark against a local InfisicalStandIn (offline, e.g. in CI)."""
+    standin = InfisicalStandIn(latency=latency).start()
+    try:
+        standin.seed("bench", "production", {f"SECRET_{i}": "x" * 32 for i in range(seed_secrets)})
+        log_info(f"Local Infisical stand-in on {standin.host}:{standin.port} ({latency * 1000:.0f}ms latency)")
+        return run_infisical_bench(
+            standin.host, standin.port, standin.client_id, standin.client_secret, "bench",
+            readers=readers, writers=writers, duration=duration
+        )
+    finally:
+        standin.stop()
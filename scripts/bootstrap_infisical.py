@@ -10,11 +10,15 @@ Usage:
 Outputs:
     JSON to stdout: {"token": "...", "org_id": "..."}
     Logs to stderr for human readability
+
+deploy.py calls run_bootstrap() in-process; the CLI is a thin wrapper around it.
 """
 
 import sys
 import json
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 import requests
 from requests.exceptions import RequestException
 
@@ -31,13 +35,29 @@ def log_error(msg: str) -> None:
     print(f"[ERROR] {msg}", file=sys.stderr)
 
 
-def check_existing_bootstrap(base_url: str, email: str, password: str) -> dict | None:
+@dataclass
+class BootstrapResult:
+    """Admin token and organization of a bootstrapped Infisical instance."""
+    token: str
+    org_id: str
+
+    def to_dict(self) -> dict:
+        return {"token": self.token, "org_id": self.org_id}
+
+
+def check_existing_bootstrap(
+    base_url: str,
+    email: str,
+    password: str,
+    session: Optional[requests.Session] = None
+) -> Optional[BootstrapResult]:
     """Check if Infisical is already bootstrapped and try to get token."""
     log_info("Checking if Infisical is already bootstrapped...")
+    http = session or requests
 
     try:
         # Try to login with provided credentials
-        resp = requests.post(
+        resp = http.post(
             f"{base_url}/api/v1/auth/login",
             json={
                 "email": email,
@@ -52,7 +72,7 @@ def check_existing_bootstrap(base_url: str, email: str, password: str) -> dict |
             if token:
                 # Get organization info
                 headers = {"Authorization": f"Bearer {token}"}
-                org_resp = requests.get(
+                org_resp = http.get(
                     f"{base_url}/api/v1/organization",
                     headers=headers,
                     timeout=10
@@ -64,19 +84,13 @@ def check_existing_bootstrap(base_url: str, email: str, password: str) -> dict |
                         org_id = orgs[0].get("id") or orgs[0].get("_id")
                         if org_id:
                             log_info("Found existing bootstrap, using existing credentials")
-                            return {
-                                "token": token,
-                                "org_id": org_id
-                            }
+                            return BootstrapResult(token, org_id)
                     # Try alternative response format
                     org = org_data.get("organization", {})
                     org_id = org.get("id") or org.get("_id")
                     if org_id:
                         log_info("Found existing bootstrap, using existing credentials")
-                        return {
-                            "token": token,
-                            "org_id": org_id
-                        }
+                        return BootstrapResult(token, org_id)
                 else:
                     log_error(f"Failed to get organization: {org_resp.status_code} - {org_resp.text}")
         else:
@@ -87,12 +101,19 @@ def check_existing_bootstrap(base_url: str, email: str, password: str) -> dict |
     return None
 
 
-def bootstrap(base_url: str, email: str, password: str, org_name: str) -> dict | None:
+def bootstrap(
+    base_url: str,
+    email: str,
+    password: str,
+    org_name: str,
+    session: Optional[requests.Session] = None
+) -> Optional[BootstrapResult]:
     """Bootstrap Infisical with admin user and organization."""
     log_info("Attempting Infisical bootstrap...")
+    http = session or requests
 
     try:
-        resp = requests.post(
+        resp = http.post(
             f"{base_url}/api/v1/admin/bootstrap",
             json={
                 "email": email,
@@ -121,7 +142,7 @@ def bootstrap(base_url: str, email: str, password: str, org_name: str) -> dict |
                 org_id = data["organization"].get("id") or data["organization"].get("_id")
 
             if token and org_id:
-                return {"token": token, "org_id": org_id}
+                return BootstrapResult(token, org_id)
             else:
                 log_error(f"Bootstrap response missing token or org_id: {data}")
                 return None
@@ -129,7 +150,7 @@ def bootstrap(base_url: str, email: str, password: str, org_name: str) -> dict |
         if resp.status_code == 400 and "already" in resp.text.lower():
             log_info("Instance already bootstrapped, checking for existing credentials...")
             # Try to get token via login
-            return check_existing_bootstrap(base_url, email, password)
+            return check_existing_bootstrap(base_url, email, password, session)
 
         log_error(f"Bootstrap failed: {resp.status_code} - {resp.text}")
         return None
@@ -139,6 +160,47 @@ def bootstrap(base_url: str, email: str, password: str, org_name: str) -> dict |
         return None
 
 
+def run_bootstrap(
+    url: str,
+    email: str,
+    password: str,
+    org_name: str,
+    check_existing: bool = True,
+    client: Optional[InfisicalClient] = None
+) -> Optional[BootstrapResult]:
+    """
+    Wait for the Infisical API, then reuse an existing bootstrap or perform it.
+
+    Args:
+        url: Infisical base URL (e.g. http://10.0.0.5:8080)
+        check_existing: Try logging in with the admin credentials first
+        client: Client to wait with (its keep-alive session is reused)
+
+    Returns:
+        BootstrapResult, or None if the API never came up or bootstrap failed
+    """
+    if client is None:
+        # Parse host and port from URL
+        url_clean = url.replace("http://", "").replace("https://", "")
+        # Remove path if present (e.g., "host:port/path" -> "host:port")
+        url_clean = url_clean.split("/")[0]
+        url_parts = url_clean.split(":")
+        host = url_parts[0]
+        port = int(url_parts[1]) if len(url_parts) > 1 else 8080
+        client = InfisicalClient(host, port)
+
+    if not client.wait_for_api():
+        return None
+
+    # Check for existing bootstrap first if requested
+    if check_existing:
+        result = check_existing_bootstrap(url, email, password, client.session)
+        if result:
+            return result
+
+    return bootstrap(url, email, password, org_name, client.session)
+
+
 def main():
     if len(sys.argv) < 5:
         print(__doc__, file=sys.stderr)
@@ -150,32 +212,11 @@ def main():
     org_name = sys.argv[4]
     check_existing = "--check-existing" in sys.argv
 
-    # Parse host and port from URL
-    url_clean = url.replace("http://", "").replace("https://", "")
-    # Remove path if present (e.g., "host:port/path" -> "host:port")
-    url_clean = url_clean.split("/")[0]
-    url_parts = url_clean.split(":")
-    host = url_parts[0]
-    port = int(url_parts[1]) if len(url_parts) > 1 else 8080
-
-    # Wait for API using InfisicalClient
-    client = InfisicalClient(host, port)
-    if not client.wait_for_api():
-        sys.exit(1)
-
-    # Check for existing bootstrap first if requested
-    if check_existing:
-        result = check_existing_bootstrap(url, email, password)
-        if result:
-            print(json.dumps(result))
-            sys.exit(0)
-
-    # Bootstrap
-    result = bootstrap(url, email, password, org_name)
+    result = run_bootstrap(url, email, password, org_name, check_existing)
 
     if result:
         # Output JSON to stdout (for Terraform/deploy.py to capture)
-        print(json.dumps(result))
+        print(json.dumps(result.to_dict()))
         log_info("Bootstrap completed successfully")
     else:
         log_error("Bootstrap failed and no existing credentials found")
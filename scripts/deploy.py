@@ -4,21 +4,55 @@ Intelligent Terraform deployment script.
 Replaces apply.sh with a modular Python approach.
 
 Usage:
-    python scripts/deploy.py apply      # Full intelligent deploy
+    python scripts/deploy.py apply      # Full intelligent deploy (resumes: steps done with
+                                        # unchanged inputs are skipped)
+    python scripts/deploy.py apply --from phase2  # Redo a step and everything after it
+    python scripts/deploy.py apply --force        # Redo every step
     python scripts/deploy.py bootstrap  # Bootstrap Infisical only
+    python scripts/deploy.py init       # terraform init, only if versions.tf, provider/module
+                                        # sources or .terraform.lock.hcl changed
     python scripts/deploy.py destroy    # Destroy infrastructure
+    python scripts/deploy.py destroy --fast  # Skip the redundant Docker cleanup, run stages concurrently
     python scripts/deploy.py phase1     # Deploy LXC only
     python scripts/deploy.py phase2     # Deploy Infisical containers only
     python scripts/deploy.py deps       # Check system dependencies
+    python scripts/deploy.py template build  # Build golden Docker LXC template
+    python scripts/deploy.py watch      # Health monitor, Prometheus metrics on 127.0.0.1:9477
+                                        # (--port N, --interval SECONDS)
+    python scripts/deploy.py bench infisical  # Secrets API load test (p50/p95/p99, ops/s)
+                                        # (--readers N, --writers N, --duration S,
+                                        #  --local [--latency-ms MS]: bundled stand-in server)
+    python scripts/deploy.py bench deploy     # Offline apply/bootstrap/destroy with fake tools:
+                                        # processes, HTTP requests, time per phase
+                                        # (--latency ssh=20,terraform=300,tflint=100,http=5 in ms,
+                                        #  --json FILE)
+
+Options:
+    --chrome-trace   Also write a Chrome trace-event file (chrome://tracing, Perfetto)
+    --trust-cache    Skip terraform applies whose inputs (.tf files, tfvars, TF_VAR_*) and
+                     state serial are unchanged since the last successful apply, without
+                     the `plan -refresh=false` check that is done otherwise
+    --upgrade        Run terraform init with -upgrade (newest allowed provider versions)
+
+Environment:
+    SELFHOST_TOOL_TIMEOUT  Seconds before a terraform/tflint run is stopped (default 3600, 0 = none)
+
+Providers are installed through the shared plugin cache $TF_PLUGIN_CACHE_DIR
+(default ~/.terraform.d/plugin-cache).
+
+Every deploy command (apply, bootstrap, destroy, phases) writes a timing trace
+to traces/<command>-<timestamp>.json.
 """
 
 import sys
 import os
+import json
+import re
 import shutil
 import time
-import json
 from pathlib import Path
-import requests
+from typing import Callable, Optional
+
 from requests.exceptions import RequestException
 
 # Add parent directory to path for imports
@@ -26,11 +60,57 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from scripts.utils import (
     log_info, log_warn, log_error, log_step,
-    run_cmd, get_project_root, read_tfvars, write_tfvars,
-    check_ssh, check_docker, terraform_output, ensure_ssh_key,
+    run_cmd, get_project_root, read_tfvars, update_tfvars,
+    check_ssh, check_docker, terraform_output, invalidate_terraform_outputs, ensure_ssh_key,
     cleanup_docker_resources, copy_ssh_key_to_container
 )
-from scripts.infisical_client import InfisicalClient
+from scripts.infisical_client import InfisicalClient, DEFAULT_SECRET_CACHE_PATH
+from scripts.bootstrap_infisical import run_bootstrap
+from scripts.bench import BENCH_SECRET_PREFIX, run_infisical_bench, run_local_infisical_bench
+from scripts.proxmox_token import ProxmoxToken, TokenError, create_token, remove_token
+from scripts.proxmox_client import ProxmoxClient, ProxmoxAPIError, TokenVerdictCache
+from scripts.harness import DeployHarness, HarnessLatencies
+from scripts.image_prepull import ImagePrepull
+from scripts.journal import ApplyCache, DeployJournal, fingerprint, hash_files
+from scripts.tfvars import terraform_variable_default
+from scripts.proxmox_utils import (
+    download_template, build_golden_template, storage_supports_linked_clone
+)
+from scripts.ssh_session import get_ssh_session
+from scripts.streaming import stream_cmd
+from scripts.teardown import Stage, run_plan
+from scripts.tracing import get_tracer, print_summary, traced
+from scripts.watch import (
+    DEFAULT_INTERVAL as DEFAULT_WATCH_INTERVAL, DEFAULT_PORT as DEFAULT_WATCH_PORT,
+    HealthMonitor, infisical_stack_probes, serve_metrics
+)
+
+
+# How long a validated Proxmox token is trusted without asking the API (seconds, 0 = always check)
+TOKEN_CACHE_TTL_ENV = "SELFHOST_TOKEN_CACHE_TTL"
+DEFAULT_TOKEN_CACHE_TTL = 900
+
+# Limit for a streamed tool run (terraform, tflint) in seconds, 0 = no limit;
+# a hung run (e.g. a provider stuck on Proxmox) is stopped with its children
+TOOL_TIMEOUT_ENV = "SELFHOST_TOOL_TIMEOUT"
+DEFAULT_TOOL_TIMEOUT = 3600
+
+# Shared provider plugin cache (Terraform's own variable; used as-is when set)
+PLUGIN_CACHE_ENV = "TF_PLUGIN_CACHE_DIR"
+DEFAULT_PLUGIN_CACHE = Path.home() / ".terraform.d" / "plugin-cache"
+
+# Lines of .tf files that decide what `terraform init` installs (provider and module sources)
+INIT_SOURCE_LINE = re.compile(r"^\s*(source|version)\s*=.*$", re.MULTILINE)
+
+# Steps of `apply` recorded in the deploy journal, in order (--from <step>)
+APPLY_STEPS = ("proxmox_token", "lint", "init", "phase1", "docker_host", "phase2")
+
+# Per-session credentials (a fresh admin login yields a new token): only whether
+# they are set goes into apply fingerprints, as that switches resources on (count)
+SESSION_TF_VARS = ("TF_VAR_infisical_admin_token",)
+
+# Proxmox API answers for a rejected or missing token, as printed by the provider
+PROXMOX_AUTH_ERRORS = ("401 authentication failure", "401 No ticket")
 
 
 def check_dependencies(auto_install: bool = True) -> bool:
@@ -134,13 +214,37 @@ def rotate_tfstate_backups(project_root: Path, max_backups: int = 3) -> None:
         log_info(f"Removed old backup: {oldest.name}")
 
 
+def env_seconds(name: str, default: float) -> float:
+    """Read a duration in seconds from the environment; an invalid value falls back to default."""
+    value = os.getenv(name, str(default))
+    try:
+        return float(value)
+    except ValueError:
+        log_warn(f"Invalid {name}={value!r}, using {default}s")
+        return float(default)
+
+
 class Deployer:
     """Manages the deployment lifecycle."""
 
     def __init__(self):
         self.project_root = get_project_root()
         self.backup_dir = self.project_root / "tfstate.backup"
+        self.image_prepull: Optional[ImagePrepull] = None
+        self.apply_cache = ApplyCache(self.project_root / ".cache" / "terraform_applies.json")
+        # Skip applies with unchanged inputs without even planning (--trust-cache)
+        self.trust_apply_cache = False
+        self.tool_timeout = env_seconds(TOOL_TIMEOUT_ENV, DEFAULT_TOOL_TIMEOUT)
+        self.init_marker = self.project_root / ".cache" / "terraform_init"
+        # Pass -upgrade to terraform init (--upgrade)
+        self.upgrade_providers = False
+        self.journal = DeployJournal(self.project_root / ".cache" / "deploy_journal.json", APPLY_STEPS)
+        self.token_cache = TokenVerdictCache(
+            self.project_root / ".cache" / "proxmox_token_verdicts.json",
+            env_seconds(TOKEN_CACHE_TTL_ENV, DEFAULT_TOKEN_CACHE_TTL)
+        )
 
+    @traced()
     def check_tools(self) -> bool:
         """Check if required tools are installed."""
         log_step("Checking required tools...")
@@ -161,46 +265,130 @@ class Deployer:
         log_info("All required tools available")
         return True
 
+    def _run_streamed(
+        self,
+        cmd: list[str],
+        what: str,
+        interactive: bool = False,
+        on_line: Optional[Callable[[str], None]] = None
+    ) -> bool:
+        """
+        Run a tool in the project root with live, prefixed output.
+
+        On failure the reason and the last lines of output are logged.
+        Interactive runs (e.g. approval prompts) keep the terminal instead.
+        """
+        if interactive:
+            result = run_cmd(cmd, cwd=str(self.project_root), check=False)
+            if result.returncode != 0:
+                log_error(f"{what} failed (exit code {result.returncode})")
+            return result.returncode == 0
+
+        try:
+            result = stream_cmd(
+                cmd, cwd=str(self.project_root), prefix=f"[{cmd[0]}]", on_line=on_line,
+                timeout=self.tool_timeout or None
+            )
+        except OSError as e:
+            log_error(f"{what} failed: {e}")
+            return False
+        if result.returncode == 0:
+            return True
+
+        reason = (
+            f"timed out, {TOOL_TIMEOUT_ENV}={self.tool_timeout:.0f}" if result.timed_out
+            else f"exit code {result.returncode}"
+        )
+        log_error(f"{what} failed ({reason}, {result.duration:.1f}s). Last output:")
+        for line in result.tail[-15:]:
+            log_error(f"  {line}")
+        return False
+
+    @traced()
     def run_linters(self) -> bool:
         """Run tflint on Terraform files."""
         log_step("Running tflint...")
 
-        try:
-            run_cmd(
-                ["tflint", "--recursive", "--format", "compact"],
-                cwd=str(self.project_root),
-                check=True
-            )
+        if self._run_streamed(["tflint", "--recursive", "--format", "compact"], "tflint"):
             log_info("tflint passed!")
             return True
-        except Exception as e:
-            log_error(f"tflint failed: {e}")
+        return False
+
+    def init_sources(self) -> str:
+        """Fingerprint of the versions.tf files and the provider/module sources of all .tf files."""
+        root = self.project_root
+        tf_files = sorted([*root.glob("*.tf"), *(root / "modules").rglob("*.tf")])
+        sources = []
+        for path in tf_files:
+            try:
+                lines = [m.group(0).strip() for m in INIT_SOURCE_LINE.finditer(path.read_text())]
+            except OSError:
+                continue
+            sources.append(f"{path.relative_to(root)}:{'|'.join(lines)}")
+        versions = hash_files([p for p in tf_files if p.name == "versions.tf"], root)
+        return fingerprint(versions, *sources)
+
+    def init_inputs(self) -> str:
+        """Fingerprint of what init installs: init_sources() plus the lock file."""
+        return fingerprint(
+            self.init_sources(), hash_files([self.project_root / ".terraform.lock.hcl"], self.project_root)
+        )
+
+    def is_initialized(self) -> bool:
+        """Whether .terraform exists and was initialized with the current init inputs."""
+        if not (self.project_root / ".terraform").is_dir():
+            return False
+        try:
+            return self.init_marker.read_text().strip() == self.init_inputs()
+        except OSError:
             return False
 
+    @traced()
     def terraform_init(self, upgrade: bool = False) -> bool:
-        """Initialize Terraform."""
+        """
+        Initialize Terraform, unless already done with the same init inputs.
+
+        Providers come from the shared plugin cache; -upgrade is only passed
+        when asked for (upgrade, or --upgrade on the command line).
+        """
+        upgrade = upgrade or self.upgrade_providers
+        if not upgrade and self.is_initialized():
+            log_info("Terraform already initialized (providers, modules and lock file unchanged)")
+            return True
+
         log_step("Initializing Terraform...")
+        plugin_cache = Path(os.environ.setdefault(PLUGIN_CACHE_ENV, str(DEFAULT_PLUGIN_CACHE)))
+        # Terraform ignores a cache directory that doesn't exist
+        plugin_cache.mkdir(parents=True, exist_ok=True)
 
-        cmd = ["terraform", "init"]
+        cmd = ["terraform", "init", "-input=false"]
         if upgrade:
             cmd.append("-upgrade")
 
-        try:
-            run_cmd(cmd, cwd=str(self.project_root), check=True)
+        if self._run_streamed(cmd, "Terraform init"):
+            # After init: the first init writes the lock file, -upgrade may change it
+            self.init_marker.parent.mkdir(parents=True, exist_ok=True)
+            self.init_marker.write_text(self.init_inputs() + "\n")
             log_info("Terraform initialized")
             return True
-        except Exception as e:
-            log_error(f"Terraform init failed: {e}")
-            return False
+        return False
 
+    @traced()
     def terraform_apply(
         self,
         target: str = None,
         targets: list = None,
         auto_approve: bool = True,
-        refresh: bool = True
+        refresh: bool = True,
+        retry_on_auth_error: bool = True
     ) -> bool:
-        """Run terraform apply."""
+        """
+        Run terraform apply (once more after re-checking the token if Proxmox rejects it).
+
+        If the inputs and the state serial are unchanged since the last
+        successful apply of the same targets, a plan without refresh decides
+        whether the apply can be skipped (with trust_apply_cache, no plan).
+        """
         cmd = ["terraform", "apply"]
 
         # Support single target or multiple targets
@@ -209,19 +397,72 @@ class Deployer:
                 cmd.extend(["-target", t])
         elif target:
             cmd.extend(["-target", target])
+        target_args = cmd[2:]
+        scope = " ".join(target_args) or "all"
+
+        inputs = self.apply_inputs()
+        if auto_approve and refresh and not self.journal.force and self.apply_cache.is_unchanged(
+            scope, inputs, self.terraform_state_serial()
+        ):
+            if self.trust_apply_cache:
+                log_info(f"Terraform apply ({scope}): inputs and state unchanged, skipping (--trust-cache)")
+                return True
+            if self.terraform_plan_is_noop(target_args):
+                log_info(f"Terraform apply ({scope}): inputs and state unchanged and plan is empty, skipping")
+                return True
 
         if auto_approve:
             cmd.append("-auto-approve")
         if not refresh:
             cmd.append("-refresh=false")
 
+        auth_errors = []
+
+        def on_line(line: str) -> None:
+            if any(err in line for err in PROXMOX_AUTH_ERRORS):
+                auth_errors.append(line)
+
+        ok = self._run_streamed(cmd, "Terraform apply", interactive=not auto_approve, on_line=on_line)
+        # Even a failed apply may have changed state
+        invalidate_terraform_outputs()
+        if ok and refresh:
+            self.apply_cache.record(scope, inputs, self.terraform_state_serial())
+
+        if not ok and auth_errors and retry_on_auth_error:
+            # The cached verdict was stale (token deleted or secret changed on the host)
+            if self.recover_proxmox_auth():
+                log_info("Retrying terraform apply with the current Proxmox token...")
+                return self.terraform_apply(target, targets, auto_approve, refresh, retry_on_auth_error=False)
+        return ok
+
+    def terraform_state_serial(self) -> str:
+        """Lineage and serial of the local state ("" without state)."""
         try:
-            run_cmd(cmd, cwd=str(self.project_root), check=True)
-            return True
-        except Exception as e:
-            log_error(f"Terraform apply failed: {e}")
-            return False
+            state = json.loads((self.project_root / "terraform.tfstate").read_text())
+        except (OSError, ValueError):
+            return ""
+        return f"{state.get('lineage', '')}:{state.get('serial', '')}"
+
+    def apply_inputs(self) -> str:
+        """Fingerprint of everything an apply reads locally: .tf files, tfvars and TF_VAR_* env."""
+        tf_vars = sorted(
+            f"{name}={'set' if value else ''}" if name in SESSION_TF_VARS else f"{name}={value}"
+            for name, value in os.environ.items() if name.startswith("TF_VAR_")
+        )
+        return fingerprint(self.tf_files_digest(), self.tfvars_digest(), *tf_vars)
+
+    def terraform_plan_is_noop(self, target_args: list[str]) -> bool:
+        """Cheap change check: plan without refresh (exit code 0 = no changes, 2 = changes)."""
+        with get_tracer().span("plan_noop_check"):
+            result = run_cmd(
+                ["terraform", "plan", "-detailed-exitcode", "-refresh=false", "-input=false", *target_args],
+                capture=True,
+                cwd=str(self.project_root),
+                check=False,
+            )
+        return result.returncode == 0
 
+    @traced()
     def terraform_destroy(self, auto_approve: bool = True, refresh: bool = True) -> bool:
         """Run terraform destroy."""
         cmd = ["terraform", "destroy"]
@@ -230,12 +471,63 @@ class Deployer:
         if not refresh:
             cmd.append("-refresh=false")
 
-        try:
-            run_cmd(cmd, cwd=str(self.project_root), check=True)
+        ok = self._run_streamed(cmd, "Terraform destroy", interactive=not auto_approve)
+        invalidate_terraform_outputs()
+        return ok
+
+    def terraform_state_list(self) -> Optional[list[str]]:
+        """List resource addresses in Terraform state (None if the state can't be read)."""
+        result = run_cmd(
+            ["terraform", "state", "list"],
+            capture=True,
+            cwd=str(self.project_root),
+            check=False,
+        )
+        if result.returncode != 0:
+            return None
+        return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+
+    @traced()
+    def terraform_state_rm(self, addresses: list[str]) -> bool:
+        """
+        Remove resource/module addresses from Terraform state in one operation.
+
+        Addresses not present in state are skipped, so the state is read once
+        (state list) and rewritten at most once (state rm).
+        """
+        start = time.monotonic()
+        with get_tracer().span("state_list"):
+            state = self.terraform_state_list()
+        if state is None:
+            log_warn("Could not list Terraform state, nothing removed")
+            return False
+
+        def present(address: str) -> bool:
+            # A module address covers every resource inside it
+            return any(item == address or item.startswith(f"{address}.") for item in state)
+
+        def covered(address: str) -> bool:
+            return any(address.startswith(f"{other}.") for other in addresses if other != address)
+
+        to_remove = [a for a in dict.fromkeys(addresses) if present(a) and not covered(a)]
+        if not to_remove:
+            log_info(f"State rm: none of {len(addresses)} address(es) in state ({time.monotonic() - start:.2f}s)")
             return True
-        except Exception as e:
-            log_error(f"Terraform destroy failed: {e}")
+
+        with get_tracer().span("state_rm", addresses=len(to_remove)):
+            result = run_cmd(
+                ["terraform", "state", "rm", *to_remove],
+                capture=True,
+                cwd=str(self.project_root),
+                check=False,
+            )
+        invalidate_terraform_outputs()
+        elapsed = time.monotonic() - start
+        if result.returncode != 0:
+            log_warn(f"State rm of {len(to_remove)} address(es) failed after {elapsed:.2f}s: {result.stderr.strip()}")
             return False
+        log_info(f"Removed {len(to_remove)} of {len(addresses)} address(es) from state in {elapsed:.2f}s")
+        return True
 
     def has_credentials(self) -> bool:
         """Check if Infisical credentials exist (in environment or Terraform outputs)."""
@@ -259,10 +551,41 @@ class Deployer:
         value = read_tfvars("enable_infisical")
         return value == "true" if value else False
 
+    def infisical_images(self) -> list[str]:
+        """Docker images used by the Infisical module (variable defaults)."""
+        variables_tf = self.project_root / "modules" / "infisical" / "variables.tf"
+        images = [
+            terraform_variable_default(variables_tf, name)
+            for name in ("postgres_image", "redis_image", "infisical_image")
+        ]
+        return [image for image in images if image]
+
+    def start_image_prepull(self, docker_host: str, docker_ssh_user: str) -> Optional[ImagePrepull]:
+        """
+        Start pulling the Infisical images on the Docker host if Docker is reachable.
+
+        A prepull already started is reused only for the same host and the
+        same container (phase1 may recreate the LXC at the same IP).
+        """
+        container_id = terraform_output("docker_container_id") or ""
+        if (
+            self.image_prepull
+            and self.image_prepull.host == docker_host
+            and self.image_prepull.container_id == container_id
+        ):
+            return self.image_prepull
+        if not check_docker(docker_host, docker_ssh_user):
+            return None
+        self.image_prepull = ImagePrepull(
+            docker_host, docker_ssh_user, self.infisical_images(), container_id
+        ).start()
+        return self.image_prepull
+
     # =========================================================================
     # Deployment Phases
     # =========================================================================
 
+    @traced()
     def phase1(self) -> bool:
         """Phase 1: Deploy LXC container with Docker and get IP from Proxmox API."""
         log_step("Phase 1: Deploying Docker LXC...")
@@ -276,25 +599,30 @@ class Deployer:
         log_info("Get container IP: terraform output docker_container_ip")
         return True
 
+    @traced()
     def phase2(self, docker_host: str, docker_ssh_user: str) -> bool:
         """Phase 2: Deploy Infisical containers."""
         log_step("Phase 2: Deploying Infisical containers...")
 
+        # Make sure images are already on the host so Terraform only creates containers
+        prepull = self.start_image_prepull(docker_host, docker_ssh_user)
+        if prepull and not prepull.verify(timeout=900):
+            log_warn("Some images could not be pre-pulled, Terraform will pull them")
+
         # Apply Infisical module (refresh=True to detect state drift)
         if not self.terraform_apply(target="module.infisical"):
             # If failed, cleanup orphaned Docker resources and retry
             log_warn("Apply failed, cleaning up and retrying...")
             cleanup_docker_resources(docker_host, docker_ssh_user)
             # Remove Docker resources from state so Terraform recreates them
-            for resource in [
+            self.terraform_state_rm([
                 "module.infisical.docker_container.infisical[0]",
                 "module.infisical.docker_container.postgres[0]",
                 "module.infisical.docker_container.redis[0]",
                 "module.infisical.docker_network.infisical[0]",
                 "module.infisical.docker_volume.postgres_data[0]",
                 "module.infisical.docker_volume.redis_data[0]",
-            ]:
-                run_cmd(["terraform", "state", "rm", resource], cwd=str(self.project_root), check=False)
+            ])
             if not self.terraform_apply(target="module.infisical"):
                 return False
 
@@ -304,12 +632,13 @@ class Deployer:
         log_info(f"Waiting for Infisical API at {infisical_url}...")
 
         client = InfisicalClient(docker_host, int(infisical_port))
-        if not client.wait_for_api(max_retries=60):
+        if not client.wait_for_api(timeout=120):
             log_warn("Infisical API not ready after 2 minutes, continuing anyway...")
 
         log_info("Phase 2 complete!")
         return True
 
+    @traced()
     def bootstrap(self) -> bool:
         """Phase 3: Bootstrap Infisical and create Machine Identity."""
         log_step("Phase 3: Bootstrap Infisical...")
@@ -340,60 +669,27 @@ class Deployer:
         org_id = os.getenv("TF_VAR_infisical_org_id")
 
         if not admin_token or not org_id:
-            log_info("Running bootstrap script (creates admin user and org)...")
-            try:
-                result = run_cmd(
-                    [
-                        sys.executable,
-                        str(self.project_root / "scripts" / "bootstrap_infisical.py"),
-                        infisical_url,
-                        admin_email,
-                        admin_password,
-                        org_name,
-                        "--check-existing"
-                    ],
-                    capture=True,
-                    check=False
-                )
-
-                if result.returncode == 0:
-                    # Parse JSON from stdout (logs go to stderr)
-                    json_line = None
-                    for line in result.stdout.strip().split('\n'):
-                        if line.strip().startswith('{'):
-                            json_line = line.strip()
-
-                    if json_line:
-                        bootstrap_data = json.loads(json_line)
-                        admin_token = bootstrap_data.get("token")
-                        org_id = bootstrap_data.get("org_id")
-
-                        if admin_token and org_id:
-                            # Export as environment variables for Terraform
-                            os.environ["TF_VAR_infisical_admin_token"] = admin_token
-                            os.environ["TF_VAR_infisical_org_id"] = org_id
-                            log_info("Bootstrap token captured and exported")
-                        else:
-                            log_error("Bootstrap returned invalid data")
-                            return False
-                    else:
-                        log_error("No JSON found in bootstrap output")
-                        log_error(f"Output: {result.stdout}")
-                        return False
-                else:
-                    log_error(f"Bootstrap script failed: {result.stdout}")
-                    if result.stderr:
-                        log_error(f"Error: {result.stderr}")
-                    return False
-            except Exception as e:
-                log_error(f"Failed to run bootstrap script: {e}")
+            log_info("Bootstrapping Infisical (creates admin user and org)...")
+            client = InfisicalClient(docker_host, int(infisical_port))
+            result = run_bootstrap(
+                infisical_url, admin_email, admin_password, org_name,
+                check_existing=True, client=client
+            )
+            if not result:
+                log_error("Bootstrap failed and no existing credentials found")
                 return False
+
+            admin_token, org_id = result.token, result.org_id
+            # Export as environment variables for Terraform
+            os.environ["TF_VAR_infisical_admin_token"] = admin_token
+            os.environ["TF_VAR_infisical_org_id"] = org_id
+            log_info("Bootstrap token captured and exported")
         else:
             log_info("Bootstrap token already available in environment")
 
-        # Step 2: Re-init to pick up new variables
-        log_info("Re-initializing Terraform with bootstrap token...")
-        self.terraform_init(upgrade=True)
+        # Step 2: Make sure the infisical provider is installed (no-op if already initialized)
+        if not self.terraform_init():
+            return False
 
         # Step 3: Check if Machine Identity already exists in Infisical
         # Get project ID first (may need to create it)
@@ -419,6 +715,7 @@ class Deployer:
         log_warn("Machine Identity creation may require another apply")
         return True
 
+    @traced()
     def phase4(self, docker_host: str = None) -> bool:
         """Phase 4: Apply Infisical provider resources."""
         log_step("Phase 4: Applying Infisical resources...")
@@ -434,12 +731,13 @@ class Deployer:
 
             log_info(f"Checking Infisical API at {infisical_url}...")
             client = InfisicalClient(docker_host, int(infisical_port))
-            if not client.wait_for_api(max_retries=30):
+            if not client.wait_for_api(timeout=60):
                 log_error("Infisical API not accessible. Ensure containers are running.")
                 return False
 
-        # Re-init to pick up any provider changes
-        self.terraform_init(upgrade=True)
+        # Re-init if provider or module sources changed
+        if not self.terraform_init():
+            return False
 
         # Full apply (Terraform will detect existing resources and update state)
         if not self.terraform_apply():
@@ -448,24 +746,62 @@ class Deployer:
         log_info("Phase 4 complete!")
         return True
 
-    # =========================================================================
-    # Main Commands
-    # =========================================================================
+    @traced()
+    def template_build(self) -> bool:
+        """Build the golden Docker LXC template and point docker_lxc at it."""
+        log_step("Building golden Docker LXC template...")
 
-    def apply(self) -> bool:
-        """Intelligent full deployment."""
-        print("\n" + "=" * 50)
-        print("  Selfhost Intelligent Deploy")
-        print("=" * 50 + "\n")
+        proxmox_host = read_tfvars("pm_host")
+        proxmox_ssh_user = read_tfvars("proxmox_ssh_user")
+        if not proxmox_host or not proxmox_ssh_user:
+            log_error("pm_host and proxmox_ssh_user must be set in terraform.tfvars")
+            return False
 
-        # Rotate tfstate backups (keep last 3)
-        rotate_tfstate_backups(self.project_root, max_backups=3)
+        template_storage = read_tfvars("docker_template_storage") or "local"
+        ostemplate_name = read_tfvars("docker_ostemplate_name") or "alpine-3.22-default_20250617_amd64.tar.xz"
+        ostemplate = read_tfvars("docker_ostemplate") or f"{template_storage}:vztmpl/{ostemplate_name}"
+        rootfs_storage = read_tfvars("docker_rootfs_storage") or "local-zfs"
+        network_bridge = read_tfvars("docker_network_bridge") or "vmbr0"
+        install_compose = (read_tfvars("docker_install_compose") or "true") == "true"
+        apk_cache_max_mb = int(read_tfvars("docker_apk_cache_max_mb") or 0)
 
-        # Check tools
-        if not self.check_tools():
+        if not download_template(proxmox_host, proxmox_ssh_user, template_storage, ostemplate_name):
             return False
 
-        # Ensure Proxmox token exists (create if missing or invalid)
+        vmid = build_golden_template(
+            proxmox_host, proxmox_ssh_user, ostemplate, rootfs_storage, network_bridge,
+            install_compose, apk_cache_max_mb
+        )
+        if not vmid:
+            return False
+
+        linked = storage_supports_linked_clone(proxmox_host, proxmox_ssh_user, rootfs_storage)
+        log_info(f"Storage '{rootfs_storage}' {'supports' if linked else 'does not support'} linked clones")
+
+        if read_tfvars("docker_template_vmid") != vmid and terraform_output("docker_container_id"):
+            log_warn("docker_template_vmid changed: the next apply will recreate the Docker LXC")
+
+        update_tfvars({
+            "docker_template_vmid": int(vmid),
+            "docker_full_clone": not linked,
+        })
+        log_info(f"terraform.tfvars updated: docker_template_vmid = {vmid}")
+        return True
+
+    def template(self, action: str) -> bool:
+        """Golden template commands."""
+        if action == "build":
+            return self.template_build()
+        log_error(f"Unknown template action: {action or '(none)'} (expected: build)")
+        return False
+
+    # =========================================================================
+    # Main Commands
+    # =========================================================================
+
+    @traced()
+    def ensure_proxmox_token(self) -> bool:
+        """Ensure a valid Proxmox API token is configured (create or rotate if needed)."""
         proxmox_host = read_tfvars("pm_host")
         proxmox_ssh_user = read_tfvars("proxmox_ssh_user")
         proxmox_pve_user = read_tfvars("proxmox_pve_user") or "root@pam"
@@ -480,247 +816,165 @@ class Deployer:
             token_needs_creation = False
             token_needs_rotation = False
 
+            # Client authenticated by the current token, if it works but must be
+            # replaced: the new token is then created through the API, not SSH
+            api_client: Optional[ProxmoxClient] = None
+
             # Check if token is configured
             if not current_token_id or not current_token_secret:
                 log_info("No Proxmox token configured, will create one")
                 token_needs_creation = True
+            elif not pm_api_url:
+                log_warn("pm_api_url not set, cannot validate token, will rotate to be safe")
+                token_needs_rotation = True
+            elif (age := self.token_cache.age(self.proxmox_token_key())) is not None:
+                log_info(f"Proxmox token {current_token_id} validated {age:.0f}s ago, skipping verification")
             else:
-                # Token configured, verify it exists on Proxmox AND validate secret
+                # Token configured: one API call checks that it exists and the secret works
                 log_info(f"Verifying Proxmox token: {current_token_id}")
+                client = ProxmoxClient(
+                    pm_api_url, current_token_id, current_token_secret,
+                    verify=read_tfvars("pm_tls_insecure") != "true",
+                    timeout=5
+                )
                 try:
-                    # Try to list tokens to verify it exists
-                    result = run_cmd(
-                        [
-                            "ssh", "-o", "StrictHostKeyChecking=no",
-                            f"{proxmox_ssh_user}@{proxmox_host}",
-                            f"pveum user token list {proxmox_pve_user} --output-format json"
-                        ],
-                        capture=True,
-                        check=False
-                    )
-                    if result.returncode == 0:
-                        tokens = json.loads(result.stdout)
-                        token_exists = any(t.get("tokenid", "") == proxmox_token_name for t in tokens)
-                        if not token_exists:
-                            log_warn(f"Token {current_token_id} not found on Proxmox, will create new one")
-                            token_needs_creation = True
-                        else:
-                            # Token exists, but we can't verify secret via SSH
-                            # Try a quick API call to validate the secret
-                            log_info("Token exists, validating secret via API...")
-                            try:
-                                resp = requests.get(
-                                    f"{pm_api_url}/version",
-                                    headers={"Authorization": f"PVEAPIToken={current_token_id}={current_token_secret}"},
-                                    timeout=5,
-                                    verify=read_tfvars("pm_tls_insecure") != "true"
-                                )
-                                if resp.status_code == 200:
-                                    log_info("Proxmox token validated successfully")
-                                else:
-                                    log_warn(f"Token validation returned status {resp.status_code}, will rotate")
-                                    token_needs_rotation = True
-                            except RequestException as e:
-                                if hasattr(e, 'response') and e.response is not None and e.response.status_code == 401:
-                                    log_warn("Token secret is invalid, will rotate to get new secret")
-                                    token_needs_rotation = True
-                                else:
-                                    log_warn(f"Could not validate token via API: {e}, will rotate to be safe")
-                                    token_needs_rotation = True
+                    if client.validate_token(proxmox_pve_user, proxmox_token_name):
+                        log_info("Proxmox token validated successfully")
+                        self.token_cache.record_valid(self.proxmox_token_key())
                     else:
-                        log_warn("Could not verify token, will try to create if needed")
-                        token_needs_creation = True
-                except Exception as e:
-                    log_warn(f"Could not verify token: {e}, will try to create if needed")
-                    token_needs_creation = True
-
-            # Rotate token if secret is invalid
-            if token_needs_rotation:
-                log_step("Rotating Proxmox token to get valid secret...")
+                        log_warn("Token secret is invalid or token is gone, will rotate to get new secret")
+                        token_needs_rotation = True
+                        # Still authenticates (e.g. another token than proxmox_token_name)?
+                        client.version()
+                        api_client = client
+                except ProxmoxAPIError as e:
+                    if not token_needs_rotation:
+                        # Transient (connection, 5xx): keep the token; a rejected one is
+                        # caught by terraform_apply's auth retry
+                        log_warn(f"Could not validate token via API: {e}, keeping it")
+
+            if api_client and self.rotate_proxmox_token_via_api(
+                api_client, proxmox_pve_user, proxmox_token_name, current_token_id
+            ):
+                return True
+
+            if token_needs_rotation or token_needs_creation:
+                if token_needs_rotation:
+                    log_step("Rotating Proxmox token over SSH to get valid secret...")
+                else:
+                    log_step("Creating Proxmox token...")
                 try:
-                    result = run_cmd(
-                        [
-                            sys.executable,
-                            str(self.project_root / "scripts" / "proxmox_token.py"),
-                            proxmox_host,
-                            proxmox_ssh_user,
-                            proxmox_pve_user,
-                            proxmox_token_name,
-                            "--rotate"
-                        ],
-                        capture=True,
-                        check=False
+                    token = create_token(
+                        proxmox_host, proxmox_ssh_user, proxmox_pve_user, proxmox_token_name,
+                        rotate=token_needs_rotation
                     )
-                    if result.returncode == 0:
-                        try:
-                            # Extract JSON line from output (last line with {)
-                            json_line = None
-                            for line in result.stdout.strip().split('\n'):
-                                if line.strip().startswith('{'):
-                                    json_line = line.strip()
-                            if not json_line:
-                                log_error(f"No JSON found in output: {result.stdout}")
-                                return False
-                            token_data = json.loads(json_line)
-                            token_id = token_data.get("token_id", "")
-                            token_secret = token_data.get("token_secret", "")
-                            if token_id and token_secret:
-                                write_tfvars("pm_api_token_id", token_id)
-                                write_tfvars("pm_api_token_secret", token_secret)
-                                log_info(f"Rotated and saved Proxmox token: {token_id}")
-                            else:
-                                log_error("Failed to parse rotated token")
-                                return False
-                        except json.JSONDecodeError as e:
-                            log_error(f"Rotated token output is not valid JSON: {e}")
-                            log_error(f"Output: {result.stdout}")
-                            return False
-                    else:
-                        log_error(f"Could not rotate token: {result.stdout}")
-                        return False
-                except Exception as e:
-                    log_error(f"Could not rotate Proxmox token: {e}")
+                except TokenError as e:
+                    log_error(f"Could not create Proxmox token automatically: {e}")
+                    log_error("Please create token manually:")
+                    log_error(f"  ssh {proxmox_ssh_user}@{proxmox_host} 'pveum user token add {proxmox_pve_user} {proxmox_token_name}'")
+                    log_error("Or set TF_VAR_pm_api_token_* environment variables")
                     return False
 
-            # Create token if needed
-            elif token_needs_creation:
-                log_step("Creating Proxmox token...")
-                try:
-                    result = run_cmd(
-                        [
-                            sys.executable,
-                            str(self.project_root / "scripts" / "proxmox_token.py"),
-                            proxmox_host,
-                            proxmox_ssh_user,
-                            proxmox_pve_user,
-                            proxmox_token_name
-                        ],
-                        capture=True,
-                        check=False
-                    )
-                    if result.returncode == 0:
-                        # Parse token from JSON output (extract JSON line)
-                        try:
-                            json_line = None
-                            for line in result.stdout.strip().split('\n'):
-                                if line.strip().startswith('{'):
-                                    json_line = line.strip()
-                            if not json_line:
-                                log_error(f"No JSON found in output: {result.stdout}")
-                                return False
-                            token_data = json.loads(json_line)
-                            token_id = token_data.get("token_id", "")
-                            token_secret = token_data.get("token_secret", "")
-                            if token_id and token_secret:
-                                # Update terraform.tfvars
-                                write_tfvars("pm_api_token_id", token_id)
-                                write_tfvars("pm_api_token_secret", token_secret)
-                                log_info(f"Created and saved Proxmox token: {token_id}")
-                            else:
-                                log_error("Failed to parse token from script output")
-                                log_error(f"Output: {result.stdout}")
-                                return False
-                        except json.JSONDecodeError:
-                            log_error(f"Script output is not valid JSON: {result.stdout}")
-                            return False
-                    else:
-                        # Check if token already exists error - try to rotate to get secret
-                        if "already exists" in result.stdout.lower() or "already exists" in (result.stderr or "").lower():
-                            log_warn("Token already exists but secret not available, rotating to get new secret...")
-                            # Try to rotate to get a new secret
-                            rotate_result = run_cmd(
-                                [
-                                    sys.executable,
-                                    str(self.project_root / "scripts" / "proxmox_token.py"),
-                                    proxmox_host,
-                                    proxmox_ssh_user,
-                                    proxmox_pve_user,
-                                    proxmox_token_name,
-                                    "--rotate"
-                                ],
-                                capture=True,
-                                check=False
-                            )
-                            if rotate_result.returncode == 0:
-                                try:
-                                    # Extract JSON line from output (logs go to stderr, JSON to stdout)
-                                    json_line = None
-                                    for line in rotate_result.stdout.strip().split('\n'):
-                                        if line.strip().startswith('{'):
-                                            json_line = line.strip()
-                                    if not json_line:
-                                        log_error(f"No JSON found in rotated token output: {rotate_result.stdout}")
-                                        return False
-                                    token_data = json.loads(json_line)
-                                    token_id = token_data.get("token_id", "")
-                                    token_secret = token_data.get("token_secret", "")
-                                    if token_id and token_secret:
-                                        write_tfvars("pm_api_token_id", token_id)
-                                        write_tfvars("pm_api_token_secret", token_secret)
-                                        log_info(f"Rotated and saved Proxmox token: {token_id}")
-                                    else:
-                                        log_error("Failed to parse rotated token")
-                                        return False
-                                except json.JSONDecodeError as e:
-                                    log_error(f"Rotated token output is not valid JSON: {e}")
-                                    log_error(f"Output: {rotate_result.stdout}")
-                                    return False
-                            else:
-                                log_error("Could not rotate existing token")
-                                log_error(f"Output: {rotate_result.stdout}")
-                                return False
-                        else:
-                            log_error("Could not create Proxmox token automatically")
-                            log_error(f"Script output: {result.stdout}")
-                            if result.stderr:
-                                log_error(f"Script error: {result.stderr}")
-                            log_error("Please create token manually:")
-                            log_error(f"  ssh {proxmox_ssh_user}@{proxmox_host} 'pveum user token add {proxmox_pve_user} {proxmox_token_name}'")
-                            log_error("Or set TF_VAR_pm_api_token_* environment variables")
-                            return False
-                except json.JSONDecodeError as e:
-                    log_error(f"Could not parse token JSON: {e}")
-                    return False
-                except Exception as e:
-                    log_error(f"Could not create Proxmox token: {e}")
-                    return False
+                self.save_proxmox_token(token)
+                action = "Rotated" if token_needs_rotation else "Created"
+                log_info(f"{action} and saved Proxmox token: {token.token_id}")
 
-        # Ensure SSH key
-        _, public_key = ensure_ssh_key()
+        return True
 
-        # Run linters
-        if not self.run_linters():
-            return False
+    def rotate_proxmox_token_via_api(
+        self,
+        client: ProxmoxClient,
+        pve_user: str,
+        token_name: str,
+        old_token_id: str
+    ) -> Optional[ProxmoxToken]:
+        """
+        Replace a token that still authenticates by creating the new one with it.
+
+        A stale token named token_name is removed first, as the SSH rotation does.
+
+        Returns:
+            The new token, or None if the API refused (the caller falls back to SSH)
+        """
+        log_step(f"Creating Proxmox token {pve_user}!{token_name} via API...")
+        try:
+            if any(t.get("tokenid") == token_name for t in client.list_tokens(pve_user)):
+                log_info(f"Rotating: removing old token: {pve_user}!{token_name}")
+                client.delete_token(pve_user, token_name)
+            token = ProxmoxToken(**client.create_token(pve_user, token_name))
+        except ProxmoxAPIError as e:
+            log_warn(f"Could not create token via API: {e}, falling back to SSH")
+            return None
+        self.save_proxmox_token(token)
+        log_info(f"Created and saved Proxmox token: {token.token_id}")
+
+        if old_token_id != token.token_id:
+            # It may be in use elsewhere: leave it to the user
+            log_info(f"Previous Proxmox token {old_token_id} left in place")
+        return token
+
+    def save_proxmox_token(self, token: ProxmoxToken) -> None:
+        """Write a new token to terraform.tfvars and mark it valid."""
+        update_tfvars({
+            "pm_api_token_id": token.token_id,
+            "pm_api_token_secret": token.token_secret,
+        })
+        # A freshly issued token is valid by construction
+        self.token_cache.record_valid(self.proxmox_token_key())
+
+    def proxmox_token_key(self) -> str:
+        """Verdict cache key for the Proxmox token currently in terraform.tfvars."""
+        return TokenVerdictCache.key(
+            read_tfvars("pm_api_url") or "",
+            read_tfvars("pm_api_token_id") or "",
+            read_tfvars("pm_api_token_secret") or ""
+        )
 
-        # Init Terraform
-        if not self.terraform_init():
-            return False
+    def docker_container_running(self) -> bool:
+        """
+        Whether the Docker LXC recorded in state still exists on Proxmox and runs.
 
-        # Get SSH users from config
-        docker_ssh_user = read_tfvars("docker_ssh_user")
-        proxmox_ssh_user = read_tfvars("proxmox_ssh_user")
-
-        if not docker_ssh_user:
-            log_error("docker_ssh_user not set in terraform.tfvars")
-            return False
-        if not proxmox_ssh_user:
-            log_error("proxmox_ssh_user not set in terraform.tfvars")
+        Outputs come from state, so they outlive a container deleted outside
+        Terraform; one API call checks the container itself.
+        """
+        ip = terraform_output("docker_container_ip")
+        container_id = terraform_output("docker_container_id")
+        pm_api_url = read_tfvars("pm_api_url")
+        if not ip or ip == "dhcp" or not container_id or not pm_api_url:
             return False
 
-        # Phase 1: Deploy LXC (always run to ensure container exists and get IP)
-        if not self.phase1():
+        # "<node>/lxc/<vmid>"
+        node, _, vmid = container_id.partition("/lxc/")
+        client = ProxmoxClient(
+            pm_api_url, read_tfvars("pm_api_token_id") or "", read_tfvars("pm_api_token_secret") or "",
+            verify=read_tfvars("pm_tls_insecure") != "true",
+            timeout=5
+        )
+        try:
+            status = client.lxc_status(node, vmid)
+        except ProxmoxAPIError as e:
+            log_warn(f"Docker LXC {container_id} not found on Proxmox ({e}), redoing phase1")
             return False
-
-        # Get docker host IP from Terraform output (obtained from Proxmox API)
-        docker_host = terraform_output("docker_container_ip")
-
-        if not docker_host or docker_host == "dhcp":
-            log_error("Could not obtain container IP from Proxmox API")
-            log_info("Check if container is running: ssh root@proxmox 'pct status <vmid>'")
+        if status != "running":
+            log_warn(f"Docker LXC {container_id} is {status or 'in an unknown state'}, redoing phase1")
             return False
+        return True
 
-        log_info(f"Docker host: {docker_host}")
+    def recover_proxmox_auth(self) -> bool:
+        """Forget the cached verdict for a token Proxmox rejected and re-check/rotate it."""
+        log_warn("Proxmox rejected the API token, re-validating it...")
+        self.token_cache.invalidate(self.proxmox_token_key())
+        return self.ensure_proxmox_token()
 
+    @traced()
+    def wait_for_docker_host(
+        self,
+        docker_host: str,
+        docker_ssh_user: str,
+        proxmox_ssh_user: str,
+        public_key: str
+    ) -> bool:
+        """Ensure SSH and Docker are reachable on the Docker host."""
         # Check SSH connectivity (quick check, no long wait)
         log_step(f"Checking SSH connectivity to {docker_host}...")
 
@@ -754,11 +1008,150 @@ class Deployer:
             return False
 
         log_info("Docker is available!")
+        return True
+
+    def tf_files_digest(self) -> str:
+        """Digest of every .tf file of the root module and the local modules."""
+        root = self.project_root
+        return hash_files([*root.glob("*.tf"), *(root / "modules").rglob("*.tf")], root)
+
+    def tfvars_digest(self) -> str:
+        return hash_files([self.project_root / "terraform.tfvars"], self.project_root)
+
+    def phase2_inputs(self, docker_host: str) -> str:
+        return fingerprint(self.tf_files_digest(), self.tfvars_digest(), docker_host)
+
+    def infisical_ready(self, docker_host: str) -> bool:
+        """Single probe of the Infisical API on the Docker host."""
+        try:
+            return InfisicalClient(docker_host, int(read_tfvars("infisical_port") or "8080")).is_ready()
+        except RequestException:
+            return False
+
+    def _journaled(
+        self,
+        step: str,
+        inputs: str,
+        action: Callable[[], bool],
+        still_holds: Optional[Callable[[], bool]] = None,
+        outputs: Optional[Callable[[], str]] = None
+    ) -> bool:
+        """Run an apply step through the journal (skipped if done with the same inputs)."""
+        ok, skipped = self.journal.run(step, inputs, action, still_holds, outputs)
+        if skipped:
+            log_info(f"Skipping {step}: completed in a previous run with the same inputs")
+        return ok
+
+    @traced()
+    def apply(self, from_step: Optional[str] = None, force: bool = False) -> bool:
+        """
+        Intelligent full deployment.
+
+        Steps completed by an earlier run with the same inputs are skipped
+        (from_step: redo that step and the ones after it; force: redo all).
+        """
+        print("\n" + "=" * 50)
+        print("  Selfhost Intelligent Deploy")
+        print("=" * 50 + "\n")
+
+        self.journal.force = force
+        if from_step:
+            if from_step not in APPLY_STEPS:
+                log_error(f"Unknown step for --from: {from_step} (steps: {', '.join(APPLY_STEPS)})")
+                return False
+            self.journal.discard_from(from_step)
+
+        # Rotate tfstate backups (keep last 3)
+        rotate_tfstate_backups(self.project_root, max_backups=3)
+
+        # Check tools
+        if not self.check_tools():
+            return False
+
+        # Ensure Proxmox token exists (create if missing or invalid); skipped
+        # only while the verdict cache still vouches for the token (TTL). Only a
+        # rotated token makes the later steps run again
+        if not self._journaled(
+            "proxmox_token", fingerprint(self.proxmox_token_key()), self.ensure_proxmox_token,
+            still_holds=lambda: self.token_cache.age(self.proxmox_token_key()) is not None,
+            outputs=self.proxmox_token_key
+        ):
+            return False
+
+        # Ensure SSH key
+        _, public_key = ensure_ssh_key()
+
+        # Run linters
+        tflint_config = hash_files([self.project_root / ".tflint.hcl"], self.project_root)
+        if not self._journaled("lint", fingerprint(self.tf_files_digest(), tflint_config), self.run_linters):
+            return False
+
+        # Init Terraform (an explicit --upgrade always runs, and so does everything after it)
+        if self.upgrade_providers:
+            self.journal.discard_from("init")
+        # (the lock file is left to is_initialized: the first init writes it after the journal's fingerprint)
+        if not self._journaled("init", self.init_sources(), self.terraform_init, still_holds=self.is_initialized):
+            return False
+
+        # Get SSH users from config
+        docker_ssh_user = read_tfvars("docker_ssh_user")
+        proxmox_ssh_user = read_tfvars("proxmox_ssh_user")
+
+        if not docker_ssh_user:
+            log_error("docker_ssh_user not set in terraform.tfvars")
+            return False
+        if not proxmox_ssh_user:
+            log_error("proxmox_ssh_user not set in terraform.tfvars")
+            return False
+
+        # On reruns the Docker host may already be up: pull images while phase 1 runs
+        # (unless phase 2 is journaled as done, then the images are there)
+        if self.get_enable_infisical():
+            previous_host = terraform_output("docker_container_ip")
+            if previous_host and previous_host != "dhcp" and not self.journal.is_done(
+                "phase2", self.phase2_inputs(previous_host)
+            ):
+                self.start_image_prepull(previous_host, docker_ssh_user)
+
+        # Phase 1: Deploy LXC (ensures container exists and gets its IP)
+        if not self._journaled(
+            "phase1", fingerprint(self.tf_files_digest(), self.tfvars_digest()), self.phase1,
+            still_holds=self.docker_container_running
+        ):
+            return False
+
+        # Get docker host IP from Terraform output (obtained from Proxmox API)
+        docker_host = terraform_output("docker_container_ip")
+
+        if not docker_host or docker_host == "dhcp":
+            log_error("Could not obtain container IP from Proxmox API")
+            log_info("Check if container is running: ssh root@proxmox 'pct status <vmid>'")
+            return False
+
+        log_info(f"Docker host: {docker_host}")
+
+        # Check SSH and Docker on the new container
+        if not self._journaled(
+            "docker_host", fingerprint(docker_host, docker_ssh_user),
+            lambda: self.wait_for_docker_host(docker_host, docker_ssh_user, proxmox_ssh_user, public_key),
+            still_holds=lambda: check_docker(docker_host, docker_ssh_user)
+        ):
+            return False
 
         # Phase 2-4: Only if Infisical is enabled
         if self.get_enable_infisical():
-            # Phase 2: Deploy Infisical containers
-            if not self.phase2(docker_host, docker_ssh_user):
+            # Docker is reachable: start the image pulls right away rather than
+            # from phase 2 (unless phase 2 is journaled as done, then the images
+            # are there); phase 2 waits for them before its apply
+            if not self.journal.is_done("phase2", self.phase2_inputs(docker_host)):
+                self.start_image_prepull(docker_host, docker_ssh_user)
+
+            # Phase 2: Deploy Infisical containers (waits for the pulls; no-op if already running)
+            if not self._journaled(
+                "phase2", self.phase2_inputs(docker_host),
+                lambda: self.phase2(docker_host, docker_ssh_user),
+                still_holds=lambda: self.infisical_ready(docker_host)
+            ):
                 return False
 
             # Phase 3: Bootstrap (also applies all Infisical resources)
@@ -778,51 +1171,196 @@ class Deployer:
         run_cmd(["terraform", "output"], cwd=str(self.project_root))
         return True
 
-    def destroy(self) -> bool:
-        """Destroy all infrastructure in correct order."""
-        log_step("Destroying infrastructure...")
-
-        # 1. Remove Infisical provider resources from state (avoid auth errors)
-        log_info("Removing Infisical resources from state...")
-        infisical_resources = [
-            "module.infisical.infisical_project_environment.production[0]",
-            "module.infisical.infisical_project.main[0]",
-            "module.infisical.infisical_identity_universal_auth_client_secret.terraform_controller[0]",
-            "module.infisical.infisical_identity_universal_auth.terraform_controller[0]",
-            "module.infisical.infisical_identity.terraform_controller[0]",
-            "module.infisical.null_resource.proxmox_token_cleanup[0]",
-        ]
-        for resource in infisical_resources:
-            run_cmd(
-                ["terraform", "state", "rm", resource],
-                cwd=str(self.project_root),
-                check=False,
-            )
-
-        # 2. Cleanup Docker resources via SSH
+    def _cleanup_docker_host(self) -> bool:
+        """Remove leftover Infisical Docker resources on the Docker host, if reachable."""
         docker_host = terraform_output("docker_container_ip")
         docker_ssh_user = read_tfvars("docker_ssh_user")
         if docker_host and docker_host != "dhcp" and docker_ssh_user and check_ssh(docker_host, docker_ssh_user):
             cleanup_docker_resources(docker_host, docker_ssh_user)
+        return True
 
-        # 3. Remove module.infisical from state
-        log_info("Removing Infisical module from state...")
-        run_cmd(
-            ["terraform", "state", "rm", "module.infisical"],
-            cwd=str(self.project_root),
-            check=False,
-        )
+    def _forget_secret_cache(self) -> bool:
+        """Drop locally cached Infisical secrets (the instance is going away)."""
+        DEFAULT_SECRET_CACHE_PATH.unlink(missing_ok=True)
+        return True
 
-        # 4. Destroy remaining infrastructure (LXC)
-        # Use -refresh=false to avoid trying to refresh Infisical resources
-        log_info("Destroying remaining infrastructure...")
-        if not self.terraform_destroy(refresh=False):
-            log_warn("Terraform destroy had errors, continuing cleanup...")
+    def _cleanup_proxmox_token(self) -> bool:
+        """Revoke the managed Proxmox token (REST API, SSH pveum as fallback)."""
+        pve_user = read_tfvars("proxmox_pve_user") or "root@pam"
+        token_name = read_tfvars("proxmox_token_name") or "terraform"
+        token_id = f"{pve_user}!{token_name}"
+        verdict_key = self.proxmox_token_key()
+        current_token_id = read_tfvars("pm_api_token_id")
+        current_token_secret = read_tfvars("pm_api_token_secret")
+        pm_api_url = read_tfvars("pm_api_url")
 
+        if pm_api_url and current_token_id and current_token_secret:
+            client = ProxmoxClient(
+                pm_api_url, current_token_id, current_token_secret,
+                verify=read_tfvars("pm_tls_insecure") != "true",
+                timeout=5
+            )
+            try:
+                client.delete_token(pve_user, token_name)
+                log_info(f"Revoked Proxmox token: {token_id}")
+                self.token_cache.invalidate(verdict_key)
+                return True
+            except ProxmoxAPIError as e:
+                if e.is_missing_token:
+                    log_info(f"Proxmox token {token_id} already removed")
+                    return True
+                log_warn(f"Could not revoke token via API: {e}, trying SSH")
+
+        proxmox_host = read_tfvars("pm_host")
+        proxmox_ssh_user = read_tfvars("proxmox_ssh_user")
+        if not proxmox_host or not proxmox_ssh_user:
+            log_warn(f"pm_host/proxmox_ssh_user not set, Proxmox token {token_id} left in place")
+            return False
+        if not remove_token(proxmox_host, proxmox_ssh_user, token_id):
+            log_warn(f"Could not revoke Proxmox token {token_id} over SSH")
+            return False
+        log_info(f"Revoked Proxmox token over SSH: {token_id}")
+        self.token_cache.invalidate(verdict_key)
+        return True
+
+    def teardown_plan(self, fast: bool = False) -> list[Stage]:
+        """
+        Build the destroy stages.
+
+        The fast plan skips the Docker cleanup (the LXC that holds the
+        containers is destroyed right after). The managed Proxmox token is
+        revoked alongside the Terraform stages, unless Terraform itself
+        authenticates with it: then it has to wait for terraform_destroy.
+        """
+        pve_user = read_tfvars("proxmox_pve_user") or "root@pam"
+        token_name = read_tfvars("proxmox_token_name") or "terraform"
+        terraform_token_id = os.getenv("TF_VAR_pm_api_token_id") or read_tfvars("pm_api_token_id")
+        token_in_use = terraform_token_id == f"{pve_user}!{token_name}"
+        return [
+            # Remove Infisical resources from state (avoid auth errors); the
+            # module address covers the provider and Docker resources in one operation
+            Stage("state_rm_infisical", lambda: self.terraform_state_rm(["module.infisical"])),
+            Stage(
+                "docker_cleanup", self._cleanup_docker_host,
+                after=("state_rm_infisical",),
+                skip_reason="LXC is destroyed by terraform_destroy" if fast else None
+            ),
+            # Use -refresh=false to avoid trying to refresh Infisical resources
+            Stage(
+                "terraform_destroy", lambda: self.terraform_destroy(refresh=False),
+                after=("state_rm_infisical", "docker_cleanup")
+            ),
+            # Replaces null_resource.proxmox_token_cleanup, which state_rm_infisical
+            # drops from state before its destroy-time provisioner could run
+            Stage(
+                "proxmox_token_cleanup", self._cleanup_proxmox_token,
+                after=("terraform_destroy",) if token_in_use else ()
+            ),
+            Stage("forget_secret_cache", self._forget_secret_cache),
+        ]
+
+    @traced()
+    def destroy(self, fast: bool = False) -> bool:
+        """Destroy all infrastructure in correct order (--fast: skip the redundant Docker cleanup)."""
+        log_step("Destroying infrastructure..." + (" (fast)" if fast else ""))
+        # Nothing recorded as deployed survives a destroy
+        self.journal.clear()
+        self.apply_cache.clear()
+
+        report = run_plan(self.teardown_plan(fast), concurrent=fast)
+        report.log()
+        if not report.ok:
+            log_warn("Teardown had errors, see stages above")
 
         log_info("Destroy complete!")
         return True
 
+    def watch(self, port: int = DEFAULT_WATCH_PORT, interval: float = DEFAULT_WATCH_INTERVAL) -> bool:
+        """Probe Infisical, Postgres and Redis until interrupted, serving Prometheus metrics."""
+        docker_host = terraform_output("docker_container_ip")
+        docker_ssh_user = read_tfvars("docker_ssh_user")
+        if not docker_host or docker_host == "dhcp" or not docker_ssh_user:
+            log_error("Could not get Docker host IP or docker_ssh_user (deploy first)")
+            return False
+
+        infisical_port = int(read_tfvars("infisical_port") or "8080")
+        probes, shells = infisical_stack_probes(docker_host, docker_ssh_user, infisical_port)
+        monitor = HealthMonitor(probes, interval)
+        server = serve_metrics(monitor, port)
+        log_step(f"Watching {docker_host} every {interval:.0f}s, metrics on http://127.0.0.1:{port}/metrics")
+
+        try:
+            monitor.run()
+        except KeyboardInterrupt:
+            log_info("Stopped")
+        finally:
+            server.shutdown()
+            for shell in shells:
+                shell.close()
+        return True
+
+    def bench(self, target: str) -> bool:
+        """Benchmark a component (bench infisical [--local] | bench deploy)."""
+        if target == "deploy":
+            return self.bench_deploy()
+        if target != "infisical":
+            log_error(f"Unknown bench target: {target!r} (available: infisical, deploy)")
+            return False
+
+        readers = int(option_value("--readers", "8"))
+        writers = int(option_value("--writers", "2" if "--local" in sys.argv else "0"))
+        duration = float(option_value("--duration", "10"))
+
+        if "--local" in sys.argv:
+            report = run_local_infisical_bench(
+                readers, writers, duration, latency=float(option_value("--latency-ms", "0")) / 1000
+            )
+        else:
+            docker_host = terraform_output("docker_container_ip")
+            client_id = terraform_output("infisical_client_id")
+            client_secret = terraform_output("infisical_client_secret")
+            project_id = terraform_output("infisical_project_id")
+            if not all((docker_host, client_id, client_secret, project_id)) or docker_host == "dhcp":
+                log_error("Infisical is not deployed (need Docker host IP, Machine Identity and project)")
+                return False
+            if writers:
+                log_warn(f"Writers update {BENCH_SECRET_PREFIX}* secrets in the production environment")
+            report = run_infisical_bench(
+                docker_host, int(read_tfvars("infisical_port") or "8080"),
+                client_id, client_secret, project_id,
+                readers=readers, writers=writers, duration=duration
+            )
+
+        if not report:
+            return False
+        report.log()
+        return True
+
+    def bench_deploy(self) -> bool:
+        """Run apply, bootstrap and destroy offline with fake tools and API stand-ins."""
+        try:
+            latencies = HarnessLatencies.parse(option_value("--latency", ""))
+        except ValueError as e:
+            log_error(str(e))
+            return False
+
+        report = DeployHarness(latencies).run()
+        report.log()
+        json_path = option_value("--json")
+        if json_path:
+            Path(json_path).write_text(json.dumps(report.to_dict(), indent=2), encoding="utf-8")
+            log_info(f"Report written: {json_path}")
+        return report.ok
+
+
+def option_value(flag: str, default: Optional[str] = None) -> Optional[str]:
+    """Value following a command-line flag (e.g. --port 9477), or default."""
+    if flag in sys.argv:
+        index = sys.argv.index(flag) + 1
+        if index < len(sys.argv):
+            return sys.argv[index]
+    return default
+
 
 def main():
     """Main entry point."""
@@ -838,15 +1376,24 @@ def main():
         sys.exit(0 if success else 1)
 
     deployer = Deployer()
+    deployer.trust_apply_cache = "--trust-cache" in sys.argv
+    deployer.upgrade_providers = "--upgrade" in sys.argv
 
     # Change to project root
     os.chdir(str(deployer.project_root))
 
     commands = {
-        "apply": deployer.apply,
+        "apply": lambda: deployer.apply(from_step=option_value("--from"), force="--force" in sys.argv),
         "bootstrap": deployer.bootstrap,
-        "destroy": deployer.destroy,
+        "init": deployer.terraform_init,
+        "destroy": lambda: deployer.destroy(fast="--fast" in sys.argv),
         "phase1": deployer.phase1,
+        "bench": lambda: deployer.bench(sys.argv[2] if len(sys.argv) > 2 else ""),
+        "watch": lambda: deployer.watch(
+            int(option_value("--port", str(DEFAULT_WATCH_PORT))),
+            float(option_value("--interval", str(DEFAULT_WATCH_INTERVAL)))
+        ),
+        "template": lambda: deployer.template(sys.argv[2] if len(sys.argv) > 2 else ""),
         "phase2": lambda: deployer.phase2(
             terraform_output("docker_container_ip") or "",
             read_tfvars("docker_ssh_user") or ""
@@ -859,6 +1406,26 @@ def main():
         sys.exit(1)
 
     success = commands[command]()
+
+    # Timing report (commands such as bench and watch record no spans)
+    tracer = get_tracer()
+    if tracer.spans:
+        trace_files = tracer.write(
+            deployer.project_root / "traces",
+            command,
+            chrome="--chrome-trace" in sys.argv
+        )
+        print_summary()
+        for trace_file in trace_files:
+            log_info(f"Trace written: {trace_file.relative_to(deployer.project_root)}")
+
+    ssh_session = get_ssh_session()
+    if ssh_session.handshakes:
+        log_info(
+            f"SSH: {ssh_session.handshakes} handshake(s), "
+            f"{ssh_session.handshakes_saved} saved by connection reuse"
+        )
+    ssh_session.close_all()
     sys.exit(0 if success else 1)
 
 
@@ -0,0 +1,191 @@
+"""Docker Engine API client over an SSH-forwarded Unix socket."""
+
+import http.client
+import json
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import quote, urlencode
+
+from scripts.ssh_session import get_ssh_session
+
+DOCKER_SOCKET = "/var/run/docker.sock"
+
+
+class DockerAPIError(Exception):
+    """A Docker Engine API call failed."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: Path, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(str(self.socket_path))
+
+
+@dataclass
+class DockerCleanupResult:
+    """What a cleanup removed and what it could not."""
+    removed_containers: list[str] = field(default_factory=list)
+    removed_network: bool = False
+    removed_volumes: list[str] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+class DockerClient:
+    """Minimal Docker Engine API client (one connection per request, safe across threads)."""
+
+    def __init__(self, socket_path: Path, timeout: float = 30):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    @classmethod
+    def over_ssh(cls, host: str, user: str, timeout: float = 30) -> Optional["DockerClient"]:
+        """Connect to the Docker daemon of host through the shared SSH master connection."""
+        local = get_ssh_session().forward_unix_socket(user, host, DOCKER_SOCKET)
+        return cls(local, timeout) if local else None
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict] = None,
+        body: Optional[dict] = None
+    ) -> tuple[int, Any]:
+        """Send a request; returns (status, decoded JSON body or None)."""
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        conn = _UnixHTTPConnection(self.socket_path, self.timeout)
+        try:
+            if body is None:
+                conn.request(method, path)
+            else:
+                conn.request(method, path, json.dumps(body), {"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            raw = resp.read()
+        except OSError as e:
+            raise DockerAPIError(f"{method} {path}: {e}") from e
+        finally:
+            conn.close()
+        is_json = resp.getheader("Content-Type", "").startswith("application/json")
+        return resp.status, json.loads(raw) if raw and is_json else None
+
+    def _call(self, method: str, path: str, **kwargs) -> tuple[bool, Optional[str]]:
+        """
+        Run a removal-type call.
+
+        Returns:
+            (done, error): done is False if the object did not exist
+        """
+        try:
+            status, data = self.request(method, path, **kwargs)
+        except DockerAPIError as e:
+            return False, str(e)
+        if status in (200, 204):
+            return True, None
+        if status == 404:
+            return False, None
+        message = data.get("message", "") if isinstance(data, dict) else ""
+        return False, f"{method} {path}: {status} {message}".strip()
+
+    def ping(self) -> bool:
+        try:
+            return self.request("GET", "/_ping")[0] == 200
+        except DockerAPIError:
+            return False
+
+    def inspect_network(self, name: str) -> Optional[dict]:
+        status, data = self.request("GET", f"/networks/{quote(name, safe='')}")
+        return data if status == 200 else None
+
+    def list_containers(self) -> list[dict]:
+        """All containers, including stopped ones."""
+        status, data = self.request("GET", "/containers/json", {"all": 1})
+        if status != 200:
+            raise DockerAPIError(f"GET /containers/json: {status}", status)
+        return data or []
+
+    def remove_container(self, container: str) -> tuple[bool, Optional[str]]:
+        """Force-remove a container (running ones are killed)."""
+        return self._call("DELETE", f"/containers/{quote(container, safe='')}", params={"force": 1})
+
+    def remove_network(self, name: str) -> tuple[bool, Optional[str]]:
+        return self._call("DELETE", f"/networks/{quote(name, safe='')}")
+
+    def disconnect_network(self, network: str, container: str) -> tuple[bool, Optional[str]]:
+        """Force-disconnect a (possibly stale) endpoint from a network."""
+        return self._call(
+            "POST", f"/networks/{quote(network, safe='')}/disconnect",
+            body={"Container": container, "Force": True}
+        )
+
+    def remove_volume(self, name: str) -> tuple[bool, Optional[str]]:
+        return self._call("DELETE", f"/volumes/{quote(name, safe='')}", params={"force": 1})
+
+    def cleanup(
+        self,
+        network: str,
+        container_names: list[str],
+        volumes: list[str],
+        max_workers: int = 8
+    ) -> DockerCleanupResult:
+        """
+        Remove a network, its containers, named containers and volumes.
+
+        State is inspected once; containers and volumes are removed
+        concurrently with force, so no separate stop is needed.
+        """
+        start = time.monotonic()
+        result = DockerCleanupResult()
+
+        net = self.inspect_network(network)
+        attached = set((net or {}).get("Containers") or {})
+        wanted = set(container_names)
+        targets = {}
+        for c in self.list_containers():
+            names = {n.lstrip("/") for n in c.get("Names") or []}
+            if c["Id"] in attached or names & wanted:
+                targets[c["Id"]] = sorted(names)[0] if names else c["Id"][:12]
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="docker") as pool:
+            for name, (done, error) in zip(targets.values(), pool.map(self.remove_container, targets)):
+                if error:
+                    result.errors.append(error)
+                elif done:
+                    result.removed_containers.append(name)
+
+            if net is not None:
+                done, error = self.remove_network(network)
+                if error:
+                    # Stale endpoints (containers gone, endpoints left behind): detach and retry once
+                    current = self.inspect_network(network) or {}
+                    list(pool.map(lambda ep: self.disconnect_network(network, ep), current.get("Containers") or {}))
+                    done, error = self.remove_network(network)
+                if error:
+                    result.errors.append(error)
+                result.removed_network = done
+
+            for volume, (done, error) in zip(volumes, pool.map(self.remove_volume, volumes)):
+                if error:
+                    result.errors.append(error)
+                elif done:
+                    result.removed_volumes.append(volume)
+
+        result.seconds = time.monotonic() - start
+        return result
@@ -0,0 +1,44 @@
+"""Atomic file writes and tolerant JSON reads for the on-disk caches and terraform.tfvars."""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+
+def write_atomic(path: Path, text: str, mode: Optional[int] = None) -> None:
+    """
+    Write a file atomically: temp file in the same directory, fsync, rename.
+
+    The temp file comes from mkstemp (unique per call, mode 0600 unless mode
+    is given), so concurrent writers, e.g. deploys sharing the tree, never
+    share it.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def write_json(path: Path, data: dict, indent: Optional[int] = 2) -> None:
+    """Write JSON atomically (see write_atomic)."""
+    write_atomic(path, json.dumps(data, indent=indent))
+
+
+def read_json(path: Path) -> dict:
+    """Read a JSON object; a missing or corrupt file reads as empty."""
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
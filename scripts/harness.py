@@ -0,0 +1,222 @@
+"""Offline benchmark harness for the deploy orchestrator.
+
+Runs `deploy.py apply`, `bootstrap` and `destroy` end to end against a sandbox
+copy of the project, with recording stand-ins for ssh, terraform, tflint and
+which on PATH (harness_tools.py) and local stand-ins for the Infisical,
+Proxmox and Docker APIs (standin.py). Each stand-in has a configurable
+latency. Per command it reports the external processes spawned, the HTTP
+requests per API and the wall time per phase (from the run's trace), so
+regressions in process count or serial waits show up without real hardware.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from scripts.ssh_session import CONTROL_DIR_ENV
+from scripts.standin import DockerStandIn, InfisicalStandIn, ProxmoxStandIn
+from scripts.tfvars import tfvars_transaction
+from scripts.utils import PROJECT_ROOT_ENV, get_project_root, log_info, log_step, log_warn
+
+FAKE_TOOLS = ("ssh", "terraform", "tflint", "which")
+DEFAULT_COMMANDS = ("apply", "bootstrap", "destroy")
+
+
+@dataclass
+class HarnessLatencies:
+    """Simulated latency per call, in seconds."""
+    ssh: float = 0.02
+    terraform: float = 0.3
+    tflint: float = 0.1
+    which: float = 0.0
+    http: float = 0.005
+
+    @classmethod
+    def parse(cls, spec: str) -> "HarnessLatencies":
+        """Parse "ssh=20,terraform=300" (milliseconds) over the defaults."""
+        latencies = cls()
+        for item in filter(None, spec.split(",")):
+            name, _, ms = item.partition("=")
+            if not hasattr(latencies, name.strip()):
+                raise ValueError(f"Unknown latency {name!r} (known: {', '.join(latencies.__dict__)})")
+            setattr(latencies, name.strip(), float(ms) / 1000)
+        return latencies
+
+
+@dataclass
+class CommandReport:
+    """What one deploy.py command did."""
+    command: str
+    ok: bool
+    wall_time: float
+    processes: Counter = field(default_factory=Counter)
+    http_requests: dict[str, int] = field(default_factory=dict)
+    phases: list[tuple[str, float]] = field(default_factory=list)
+    output_tail: list[str] = field(default_factory=list)
+
+
+@dataclass
+class HarnessReport:
+    """Reports of all commands of a harness run."""
+    latencies: HarnessLatencies
+    commands: list[CommandReport] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return all(c.ok for c in self.commands)
+
+    def to_dict(self) -> dict:
+        return {
+            "latencies": self.latencies.__dict__,
+            "commands": [
+                {
+                    "command": c.command,
+                    "ok": c.ok,
+                    "wall_time": c.wall_time,
+                    "processes": dict(c.processes),
+                    "http_requests": c.http_requests,
+                    "phases": dict(c.phases),
+                }
+                for c in self.commands
+            ],
+        }
+
+    def log(self) -> None:
+        log_step("Orchestrator harness (fake ssh/terraform/tflint, local API stand-ins)")
+        for c in self.commands:
+            processes = ", ".join(f"{tool} {n}" for tool, n in sorted(c.processes.items())) or "none"
+            requests = ", ".join(f"{api} {n}" for api, n in c.http_requests.items() if n) or "none"
+            log_info(f"{c.command}: {'ok' if c.ok else 'FAILED'} in {c.wall_time:.2f}s")
+            log_info(f"  processes: {sum(c.processes.values())} ({processes})")
+            log_info(f"  http requests: {sum(c.http_requests.values())} ({requests})")
+            for name, seconds in c.phases:
+                log_info(f"  {name:<32} {seconds:7.2f}s")
+            if not c.ok:
+                for line in c.output_tail:
+                    log_warn(f"  | {line}")
+
+
+class DeployHarness:
+    """Sets up the sandbox and stand-ins, then runs deploy.py commands in it."""
+
+    def __init__(self, latencies: Optional[HarnessLatencies] = None, commands: tuple[str, ...] = DEFAULT_COMMANDS):
+        self.latencies = latencies or HarnessLatencies()
+        self.commands = commands
+
+    @staticmethod
+    def _copy_project(source: Path, sandbox: Path) -> None:
+        """Copy the Terraform configuration (no state, caches, traces or secrets)."""
+        sandbox.mkdir()
+        for path in source.glob("*.tf"):
+            shutil.copy2(path, sandbox / path.name)
+        shutil.copytree(source / "modules", sandbox / "modules")
+        shutil.copy2(source / "terraform.tfvars.example", sandbox / "terraform.tfvars")
+
+    def _write_tools(self, bin_dir: Path) -> None:
+        bin_dir.mkdir()
+        tools = Path(__file__).parent / "harness_tools.py"
+        for tool in FAKE_TOOLS:
+            wrapper = bin_dir / tool
+            wrapper.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{tools}" {tool} "$@"\n')
+            wrapper.chmod(0o755)
+
+    def run(self) -> HarnessReport:
+        report = HarnessReport(self.latencies)
+        with tempfile.TemporaryDirectory(prefix="selfhost-harness-") as tmp:
+            tmp = Path(tmp)
+            sandbox = tmp / "project"
+            self._copy_project(get_project_root(), sandbox)
+            self._write_tools(tmp / "bin")
+            ssh_dir = tmp / "home" / ".ssh"
+            ssh_dir.mkdir(parents=True)
+            (ssh_dir / "id_ed25519").write_text("harness\n")
+            (ssh_dir / "id_ed25519.pub").write_text("ssh-ed25519 AAAAharness harness@selfhost\n")
+
+            latency = self.latencies.http
+            infisical = InfisicalStandIn(latency=latency).start()
+            proxmox = ProxmoxStandIn(latency=latency).start()
+            docker = DockerStandIn(tmp / "docker.sock", latency=latency).start()
+            apis = {"infisical": infisical, "proxmox": proxmox, "docker": docker}
+            try:
+                with tfvars_transaction(sandbox / "terraform.tfvars") as doc:
+                    doc.update({
+                        "pm_api_url": proxmox.api_url,
+                        "pm_api_token_id": proxmox.token_id,
+                        "pm_api_token_secret": proxmox.token_secret,
+                        "pm_host": "127.0.0.1",
+                        "enable_infisical": True,
+                        "infisical_port": infisical.port,
+                    })
+
+                env = {k: v for k, v in os.environ.items() if not k.startswith("TF_VAR_") and k != CONTROL_DIR_ENV}
+                env.update({
+                    "PATH": f"{tmp / 'bin'}{os.pathsep}{env.get('PATH', '')}",
+                    "HOME": str(tmp / "home"),
+                    PROJECT_ROOT_ENV: str(sandbox),
+                    "SELFHOST_HARNESS_LOG": str(tmp / "calls.jsonl"),
+                    "SELFHOST_HARNESS_LATENCY": json.dumps({
+                        tool: getattr(self.latencies, tool) for tool in FAKE_TOOLS
+                    }),
+                    "SELFHOST_HARNESS_OUTPUTS": json.dumps({
+                        "docker_container_ip": "127.0.0.1",
+                        "docker_container_id": "proxmox/lxc/100",
+                        "infisical_url": f"http://127.0.0.1:{infisical.port}",
+                        "infisical_admin_password": "harness-admin-password",
+                        "infisical_project_id": "harness-project",
+                        "infisical_client_id": infisical.client_id,
+                        "infisical_client_secret": infisical.client_secret,
+                    }),
+                    "SELFHOST_HARNESS_DOCKER_SOCKET": str(docker.unix_socket),
+                })
+
+                for command in self.commands:
+                    report.commands.append(self._run_command(command, sandbox, env, tmp / "calls.jsonl", apis))
+            finally:
+                for api in apis.values():
+                    api.stop()
+        return report
+
+    def _run_command(self, command: str, sandbox: Path, env: dict, calls: Path, apis: dict) -> CommandReport:
+        calls_before = len(calls.read_text().splitlines()) if calls.exists() else 0
+        requests_before = {name: api.requests for name, api in apis.items()}
+
+        start = time.monotonic()
+        result = subprocess.run(
+            [sys.executable, str(Path(__file__).parent / "deploy.py"), *command.split()],
+            cwd=str(sandbox), env=env, capture_output=True, text=True, check=False
+        )
+        wall_time = time.monotonic() - start
+
+        records = [json.loads(line) for line in calls.read_text().splitlines()[calls_before:]] if calls.exists() else []
+        processes = Counter(record["tool"] for record in records)
+        # The deploy.py process itself
+        processes["python"] += 1
+        output = (result.stdout + result.stderr).splitlines()
+        return CommandReport(
+            command=command,
+            ok=result.returncode == 0,
+            wall_time=wall_time,
+            processes=processes,
+            http_requests={name: api.requests - requests_before[name] for name, api in apis.items()},
+            phases=self._phases(sandbox, command.split()[0]),
+            output_tail=output[-20:],
+        )
+
+    @staticmethod
+    def _phases(sandbox: Path, label: str) -> list[tuple[str, float]]:
+        """Direct children of the run's root span, from the newest trace of the command."""
+        traces = sorted((sandbox / "traces").glob(f"{label}-*.json"), key=lambda p: p.stat().st_mtime)
+        traces = [t for t in traces if not t.name.endswith(".chrome.json")]
+        if not traces:
+            return []
+        spans = json.loads(traces[-1].read_text())["spans"]
+        roots = {s["span_id"] for s in spans if s["parent_id"] is None}
+        return [(s["name"], s["duration"]) for s in spans if s["parent_id"] in roots]
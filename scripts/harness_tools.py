@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Recording stand-ins for ssh, terraform, tflint and which, used by the offline harness.
+
+Usage (through the wrappers the harness puts on PATH):
+    python harness_tools.py <tool> [args...]
+
+Every call appends one JSON line to $SELFHOST_HARNESS_LOG, sleeps the
+latency configured for the tool in $SELFHOST_HARNESS_LATENCY (JSON map of
+tool -> seconds) and answers like the real tool would for the calls the
+scripts make. Fake Terraform state lives in .harness_state.json in the
+working directory; outputs come from $SELFHOST_HARNESS_OUTPUTS.
+
+Standard library only: the tools run once per call and must start fast.
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+STATE_FILE = ".harness_state.json"
+
+LXC_RESOURCES = ["module.docker_lxc.proxmox_lxc.docker[0]", "data.http.container_interfaces"]
+LXC_OUTPUTS = ["docker_container_ip", "docker_container_id"]
+INFISICAL_RESOURCES = [
+    "module.infisical.docker_network.infisical[0]",
+    "module.infisical.docker_volume.postgres_data[0]",
+    "module.infisical.docker_volume.redis_data[0]",
+    "module.infisical.docker_container.postgres[0]",
+    "module.infisical.docker_container.redis[0]",
+    "module.infisical.docker_container.infisical[0]",
+]
+INFISICAL_OUTPUTS = ["infisical_url", "infisical_admin_password"]
+IDENTITY_RESOURCES = [
+    "module.infisical.infisical_project.main[0]",
+    "module.infisical.infisical_identity.terraform[0]",
+]
+IDENTITY_OUTPUTS = ["infisical_project_id", "infisical_client_id", "infisical_client_secret"]
+
+
+def _load_state() -> dict:
+    try:
+        return json.loads(Path(STATE_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"resources": [], "outputs": {}}
+
+
+def _save_state(state: dict) -> None:
+    """Save the fake state; like Terraform, bump the serial of terraform.tfstate if it changed."""
+    if state == _load_state() and Path("terraform.tfstate").exists():
+        return
+    Path(STATE_FILE).write_text(json.dumps(state), encoding="utf-8")
+    try:
+        tfstate = json.loads(Path("terraform.tfstate").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        tfstate = {"version": 4, "lineage": os.urandom(8).hex(), "serial": 0}
+    tfstate["serial"] += 1
+    Path("terraform.tfstate").write_text(json.dumps(tfstate), encoding="utf-8")
+
+
+def _apply_stages(targets: list[str]) -> list[tuple[list[str], list[str]]]:
+    """(resources, outputs) an apply with these targets manages."""
+    stages = []
+    if not targets or "module.docker_lxc" in targets:
+        stages.append((LXC_RESOURCES, LXC_OUTPUTS))
+    if not targets or "module.infisical" in targets:
+        stages.append((INFISICAL_RESOURCES, INFISICAL_OUTPUTS))
+    if not targets and os.getenv("TF_VAR_infisical_admin_token"):
+        stages.append((IDENTITY_RESOURCES, IDENTITY_OUTPUTS))
+    return stages
+
+
+def terraform(args: list[str]) -> int:
+    command = args[0] if args else ""
+    state = _load_state()
+    outputs = json.loads(os.getenv("SELFHOST_HARNESS_OUTPUTS", "{}"))
+
+    if command == "init":
+        Path(".terraform").mkdir(exist_ok=True)
+        lock_file = Path(".terraform.lock.hcl")
+        if not lock_file.exists() or "-upgrade" in args:
+            kind = "upgraded" if "-upgrade" in args else "initial"
+            lock_file.write_text(f"# harness lock file ({kind})\n", encoding="utf-8")
+        print("Terraform has been successfully initialized!")
+        return 0
+
+    targets = [args[i + 1] for i, a in enumerate(args) if a == "-target" and i + 1 < len(args)]
+
+    if command == "plan":
+        missing = [
+            r for resources, _ in _apply_stages(targets) for r in resources if r not in state["resources"]
+        ]
+        for resource in missing:
+            print(f"  # {resource} will be created")
+        print(f"Plan: {len(missing)} to add, 0 to change, 0 to destroy." if missing else "No changes.")
+        # -detailed-exitcode: 0 = no changes, 2 = changes
+        return 2 if missing and "-detailed-exitcode" in args else 0
+
+    if command == "apply":
+        added = 0
+        for resources, names in _apply_stages(targets):
+            for resource in resources:
+                if resource not in state["resources"]:
+                    state["resources"].append(resource)
+                    added += 1
+                    print(f"{resource}: Creation complete after 0s")
+            state["outputs"].update({name: outputs[name] for name in names if name in outputs})
+        _save_state(state)
+        print(f"Apply complete! Resources: {added} added, 0 changed, 0 destroyed.")
+        return 0
+
+    if command == "destroy":
+        destroyed = len(state["resources"])
+        _save_state({"resources": [], "outputs": {}})
+        print(f"Destroy complete! Resources: {destroyed} destroyed.")
+        return 0
+
+    if command == "output":
+        if "-json" in args:
+            print(json.dumps({name: {"value": value} for name, value in state["outputs"].items()}))
+        else:
+            for name, value in state["outputs"].items():
+                print(f'{name} = "{value}"')
+        return 0
+
+    if command == "state" and args[1:2] == ["list"]:
+        print("\n".join(state["resources"]))
+        return 0
+
+    if command == "state" and args[1:2] == ["rm"]:
+        addresses = args[2:]
+        kept = [
+            r for r in state["resources"]
+            if not any(r == a or r.startswith(f"{a}.") for a in addresses)
+        ]
+        print(f"Successfully removed {len(state['resources']) - len(kept)} resource instance(s).")
+        state["resources"] = kept
+        _save_state(state)
+        return 0
+
+    if command == "version":
+        print("Terraform v1.9.0")
+        return 0
+
+    print(f"harness terraform: unsupported command {args}", file=sys.stderr)
+    return 1
+
+
+def _option(args: list[str], name: str) -> str:
+    """Value of `-o Name=value` in an ssh argv."""
+    for i, arg in enumerate(args):
+        if arg == "-o" and i + 1 < len(args) and args[i + 1].startswith(f"{name}="):
+            return args[i + 1].split("=", 1)[1]
+    return ""
+
+
+def ssh(args: list[str]) -> int:
+    control_path = _option(args, "ControlPath")
+    if "-M" in args:
+        # Master connection: the control socket only has to exist
+        if control_path:
+            Path(control_path).touch()
+        return 0
+
+    if "-O" in args:
+        op = args[args.index("-O") + 1]
+        if op == "exit" and control_path:
+            Path(control_path).unlink(missing_ok=True)
+        elif op == "forward":
+            local, _, _ = args[args.index("-L") + 1].partition(":")
+            docker_socket = os.getenv("SELFHOST_HARNESS_DOCKER_SOCKET")
+            if not docker_socket:
+                return 255
+            Path(local).unlink(missing_ok=True)
+            Path(local).symlink_to(docker_socket)
+        return 0
+
+    # Skip options to find destination and remote command
+    i = 0
+    while i < len(args) and args[i].startswith("-"):
+        i += 2 if args[i] in ("-o", "-i", "-p", "-l", "-L", "-R", "-O") else 1
+    command = " ".join(args[i + 1:])
+
+    if "docker pull" in command:
+        image = command.split("docker pull -q ", 1)[-1].split()[0].strip("'")
+        print(f"{image.split(':')[0]}@sha256:{'0' * 64}")
+    elif command.startswith("docker image inspect"):
+        # Every image pulled earlier is still there
+        for image in command.split("}}' ", 1)[-1].split():
+            print(f"{image.strip(chr(39)).split(':')[0]}@sha256:{'0' * 64}")
+    elif command.startswith("docker version"):
+        print("Server: Docker Engine - Community\n Version: 27.0.0")
+    return 0
+
+
+def tflint(_args: list[str]) -> int:
+    return 0
+
+
+def which(args: list[str]) -> int:
+    for name in args:
+        print(f"/usr/bin/{name}")
+    return 0
+
+
+TOOLS = {"ssh": ssh, "terraform": terraform, "tflint": tflint, "which": which}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in TOOLS:
+        print(__doc__, file=sys.stderr)
+        sys.exit(2)
+
+    tool, args = sys.argv[1], sys.argv[2:]
+    start = time.time()
+    latency = json.loads(os.getenv("SELFHOST_HARNESS_LATENCY", "{}")).get(tool, 0)
+    if latency:
+        time.sleep(latency)
+    code = TOOLS[tool](args)
+
+    log = os.getenv("SELFHOST_HARNESS_LOG")
+    if log:
+        record = json.dumps({"tool": tool, "args": args, "start": start, "seconds": time.time() - start})
+        # O_APPEND: concurrent calls never interleave a line
+        fd = os.open(log, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, (record + "\n").encode())
+        finally:
+            os.close(fd)
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Concurrent pre-pull of Docker images on the Docker host via SSH."""
+
+import shlex
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Optional
+
+from scripts.utils import log_info, log_warn, log_error
+from scripts.ssh_session import ssh_run
+from scripts.tracing import Span, get_tracer
+
+
+@dataclass
+class PullResult:
+    """Outcome of pulling one image."""
+    image: str
+    ok: bool
+    seconds: float
+    digest: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ImagePrepull:
+    """Pulls a set of images concurrently in the background."""
+
+    def __init__(self, host: str, user: str, images: list[str], container_id: str = ""):
+        self.host = host
+        self.user = user
+        self.images = images
+        # Docker LXC the pulls ran on: a container recreated at the same IP has none of them
+        self.container_id = container_id
+        self._executor = ThreadPoolExecutor(max_workers=max(len(images), 1), thread_name_prefix="prepull")
+        self._futures: dict[str, Future] = {}
+
+    def start(self) -> "ImagePrepull":
+        """Start pulling all images (returns immediately)."""
+        log_info(f"Pre-pulling images on {self.host}: {', '.join(self.images)}")
+        # Nest the pulls under the phase that started them, not at the top level
+        parent = get_tracer().current()
+        for image in self.images:
+            self._futures[image] = self._executor.submit(self._pull, image, parent)
+        self._executor.shutdown(wait=False)
+        return self
+
+    def _pull(self, image: str, parent: Optional[Span]) -> PullResult:
+        start = time.monotonic()
+        with get_tracer().span("prepull_image", parent=parent, image=image) as span:
+            quoted = shlex.quote(image)
+            result = ssh_run(
+                self.host, self.user,
+                f"docker pull -q {quoted} >/dev/null && "
+                f"docker image inspect --format '{{{{index .RepoDigests 0}}}}' {quoted}"
+            )
+            elapsed = time.monotonic() - start
+            if result.returncode != 0:
+                error = result.stderr.strip() or f"exit {result.returncode}"
+                span.status = "failed"
+                log_warn(f"Pre-pull of {image} failed after {elapsed:.1f}s: {error}")
+                return PullResult(image, False, elapsed, error=error)
+
+            digest = result.stdout.strip()
+            span.attrs["digest"] = digest
+            log_info(f"Pulled {image} in {elapsed:.1f}s ({digest.rsplit('@', 1)[-1][:19]})")
+            return PullResult(image, True, elapsed, digest=digest)
+
+    def wait(self, timeout: Optional[float] = None) -> list[PullResult]:
+        """Wait for all pulls; images still pulling at the timeout are reported as failed."""
+        pending = [f for f in self._futures.values() if not f.done()]
+        if pending:
+            log_info(f"Waiting for {len(pending)} image pull(s) to finish...")
+        wait(list(self._futures.values()), timeout=timeout)
+
+        results = []
+        for image, future in self._futures.items():
+            if future.done():
+                results.append(future.result())
+            else:
+                results.append(PullResult(image, False, timeout or 0.0, error="timed out"))
+        return results
+
+    def present_digests(self) -> set[str]:
+        """Repo digests of the images currently on the host (one SSH roundtrip)."""
+        quoted = " ".join(shlex.quote(image) for image in self.images)
+        # Exits non-zero if any image is missing, but still prints the others
+        result = ssh_run(self.host, self.user, f"docker image inspect --format '{{{{index .RepoDigests 0}}}}' {quoted}")
+        return {line.strip() for line in result.stdout.splitlines() if line.strip()}
+
+    def verify(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for all pulls and check every image is present on the host with its pulled digest.
+
+        The check asks the host rather than trusting the pull results, which
+        may come from a container that has been recreated since.
+        """
+        results = self.wait(timeout)
+        missing = [r for r in results if not r.ok or not r.digest]
+        pulled = [r for r in results if r not in missing]
+        if pulled:
+            present = self.present_digests()
+            for r in pulled:
+                if r.digest not in present:
+                    r.ok, r.error = False, "no longer on the host"
+                    missing.append(r)
+        for r in missing:
+            log_error(f"Image not available on {self.host}: {r.image} ({r.error or 'no digest'})")
+        return not missing
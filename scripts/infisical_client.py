@@ -1,61 +1,277 @@
 """Infisical API client for bootstrap and configuration."""
 
+import os
+import threading
 import time
+from pathlib import Path
 from typing import Optional
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
 
-from .utils import log_info, log_error
+from .utils import log_info, log_warn, log_error, get_project_root
+from .probe import tcp_connect, wait_until
+from .secret_cache import CachedSecrets, SecretCache
+from .tracing import get_tracer
+
+# Local secret cache: freshness in seconds (0 = disabled) and location
+SECRET_CACHE_TTL_ENV = "SELFHOST_SECRET_CACHE_TTL"
+DEFAULT_SECRET_CACHE_PATH = get_project_root() / ".cache" / "infisical_secrets.json"
 
 
 class InfisicalClient:
     """Client for interacting with Infisical API."""
 
-    def __init__(self, host: str, port: int):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        cache_ttl: Optional[float] = None,
+        cache_path: Optional[Path] = None
+    ):
+        self.host = host
+        self.port = port
         self.base_url = f"http://{host}:{port}"
         self.admin_token: Optional[str] = None
         self.org_id: Optional[str] = None
+        # Keep-alive session: probes and API calls reuse one TCP connection.
+        # Transient gateway errors (Infisical restarting behind a proxy) are retried.
+        self.session = requests.Session()
+        retry = Retry(total=3, connect=0, read=0, backoff_factor=0.2, status_forcelist=(502, 503, 504))
+        self.session.mount("http://", HTTPAdapter(max_retries=retry))
+        self.session.mount("https://", HTTPAdapter(max_retries=retry))
+        # Universal-auth credentials and the cached access token
+        self._client_id: Optional[str] = None
+        self._client_secret: Optional[str] = None
+        self._access_token: Optional[str] = None
+        self._token_expires_at = 0.0
+        # Secrets per (project, environment, path), as fetched by list_secrets()
+        self._secrets: dict[tuple[str, str, str], dict[str, str]] = {}
+        # Bumped by every invalidation: a fetch started under an older generation
+        # (e.g. a background refresh racing set_secret) must not store its result
+        self._generations: dict[tuple[str, str, str], int] = {}
+        self._generation_lock = threading.Lock()
+        # Encrypted on-disk cache, enabled by login() (its key comes from the client secret)
+        self.cache_ttl = cache_ttl if cache_ttl is not None else float(os.getenv(SECRET_CACHE_TTL_ENV, "0"))
+        self.cache_path = cache_path or DEFAULT_SECRET_CACHE_PATH
+        self.cache: Optional[SecretCache] = None
+
+    def is_ready(self) -> bool:
+        """Single readiness probe: TCP connect pre-check, then GET /api/status."""
+        if not tcp_connect(self.host, self.port, timeout=1.0):
+            return False
+        resp = self.session.get(f"{self.base_url}/api/status", timeout=5)
+        return resp.status_code == 200
 
-    def wait_for_api(self, max_retries: int = 60, interval: int = 2) -> bool:
-        """Wait for Infisical API to be ready."""
+    def wait_for_api(self, timeout: float = 120.0) -> bool:
+        """Wait for Infisical API to be ready (backoff from 50ms up to 2s, overall deadline)."""
         log_info(f"Waiting for Infisical API at {self.base_url}...")
 
-        for i in range(max_retries):
-            try:
-                resp = requests.get(
-                    f"{self.base_url}/api/status",
-                    timeout=5
+        with get_tracer().span("wait_for_api", url=self.base_url) as span:
+            result = wait_until(
+                self.is_ready,
+                timeout=timeout,
+                on_progress=lambda attempts, elapsed: log_info(
+                    f"Still waiting... ({elapsed:.0f}s/{timeout:.0f}s, {attempts} probes)"
                 )
-                if resp.status_code == 200:
-                    log_info("Infisical API is ready!")
-                    return True
-            except RequestException:
-                pass
+            )
+            span.attrs.update(ready=result.ready, attempts=result.attempts)
 
-            if i % 10 == 0 and i > 0:
-                log_info(f"Still waiting... ({i}/{max_retries})")
-            time.sleep(interval)
+        if result.ready:
+            log_info(f"Infisical API is ready! (after {result.elapsed:.2f}s, {result.attempts} probes)")
+            return True
 
-        log_error("Infisical API not ready after timeout")
+        log_error(f"Infisical API not ready after {timeout:.0f}s")
+        if result.last_error:
+            log_error(f"Last error: {result.last_error}")
         return False
 
-    def get_secret(self, project_id: str, env_slug: str, secret_name: str, access_token: str) -> Optional[str]:
-        """Get a secret value from Infisical."""
+    def login(self, client_id: str, client_secret: str) -> Optional[str]:
+        """
+        Log in with machine identity (universal auth) credentials.
+
+        The access token is cached until shortly before it expires and renewed
+        transparently by access_token(). With a cache TTL configured, this also
+        enables the encrypted local secret cache.
+        """
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self._access_token = None
+        if self.cache_ttl > 0:
+            self.cache = SecretCache(self.cache_path, client_secret, ttl=self.cache_ttl)
+        return self.access_token()
+
+    def access_token(self) -> Optional[str]:
+        """Get a valid access token, logging in again if the cached one expired."""
+        if self._access_token and time.monotonic() < self._token_expires_at:
+            return self._access_token
+        if not self._client_id or not self._client_secret:
+            return None
+
+        try:
+            resp = self.session.post(
+                f"{self.base_url}/api/v1/auth/universal-auth/login",
+                json={"clientId": self._client_id, "clientSecret": self._client_secret},
+                timeout=10
+            )
+        except RequestException as e:
+            log_error(f"Infisical login failed: {e}")
+            return None
+        if resp.status_code != 200:
+            log_error(f"Infisical login failed: {resp.status_code} - {resp.text}")
+            return None
+
+        data = resp.json()
+        self._access_token = data.get("accessToken")
+        # Renew a little early so a token never expires mid-request
+        expires_in = float(data.get("expiresIn") or 0)
+        self._token_expires_at = time.monotonic() + max(expires_in - 30, 0)
+        return self._access_token
+
+    def list_secrets(
+        self,
+        project_id: str,
+        env_slug: str,
+        secret_path: str = "/",
+        access_token: Optional[str] = None
+    ) -> Optional[dict[str, str]]:
+        """
+        Fetch all secrets of an environment/path in one request.
+
+        The result is kept and serves later get_secret() lookups. With the local
+        cache enabled, a fresh cached copy is returned without any request, and
+        a stale one is returned immediately while it is refreshed in the background.
+
+        Returns:
+            {name: value}, or None if the request failed
+        """
+        key = (project_id, env_slug, secret_path)
+        if self.cache:
+            cached = self.cache.get(*key)
+            if cached:
+                self._secrets[key] = cached.secrets
+                if not self.cache.is_fresh(cached):
+                    threading.Thread(
+                        target=self._fetch_secrets, args=(key, access_token, cached), daemon=True
+                    ).start()
+                return cached.secrets
+        return self._fetch_secrets(key, access_token)
+
+    def _fetch_secrets(
+        self,
+        key: tuple[str, str, str],
+        access_token: Optional[str] = None,
+        cached: Optional[CachedSecrets] = None
+    ) -> Optional[dict[str, str]]:
+        """GET the secrets of key; with a cached copy, revalidate it by ETag."""
+        with self._generation_lock:
+            generation = self._generations.get(key, 0)
+        token = access_token or self.access_token()
+        if not token:
+            log_error("No Infisical access token (call login() or pass access_token)")
+            return None
+
+        project_id, env_slug, secret_path = key
+        headers = {"Authorization": f"Bearer {token}"}
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
         try:
-            headers = {"Authorization": f"Bearer {access_token}"}
-            resp = requests.get(
-                f"{self.base_url}/api/v3/secrets/{secret_name}",
+            resp = self.session.get(
+                f"{self.base_url}/api/v3/secrets/raw",
                 headers=headers,
                 params={
                     "workspaceId": project_id,
-                    "environment": env_slug
+                    "environment": env_slug,
+                    "secretPath": secret_path
                 },
                 timeout=10
             )
-            if resp.status_code == 200:
-                data = resp.json()
-                secret = data.get("secret", {})
-                return secret.get("secretValue") or secret.get("value")
+        except RequestException as e:
+            (log_warn if cached else log_error)(f"Failed to list secrets: {e}")
             return None
-        except RequestException:
+
+        if resp.status_code == 304 and cached:
+            with self._generation_lock:
+                if self._generations.get(key, 0) == generation:
+                    self.cache.touch(project_id, env_slug, secret_path, cached)
+            return cached.secrets
+        if resp.status_code != 200:
+            (log_warn if cached else log_error)(f"Failed to list secrets: {resp.status_code} - {resp.text}")
             return None
+
+        items = resp.json().get("secrets", [])
+        secrets = {s.get("secretKey"): s.get("secretValue") for s in items}
+        with self._generation_lock:
+            # Invalidated while the request ran: the answer may predate a write
+            if self._generations.get(key, 0) != generation:
+                return secrets
+            self._secrets[key] = secrets
+            if self.cache:
+                versions = {s.get("secretKey"): s.get("version") for s in items if s.get("version") is not None}
+                self.cache.put(project_id, env_slug, secret_path, secrets, resp.headers.get("ETag"), versions)
+        return secrets
+
+    def invalidate_secrets(self, project_id: str, env_slug: str, secret_path: str = "/") -> None:
+        """Forget secrets of an environment/path (in memory and in the local cache)."""
+        key = (project_id, env_slug, secret_path)
+        with self._generation_lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._secrets.pop(key, None)
+            if self.cache:
+                self.cache.invalidate(project_id, env_slug, secret_path)
+
+    def set_secret(
+        self,
+        project_id: str,
+        env_slug: str,
+        secret_name: str,
+        secret_value: str,
+        secret_path: str = "/",
+        access_token: Optional[str] = None
+    ) -> bool:
+        """Create or update a secret, invalidating cached copies of its environment/path."""
+        token = access_token or self.access_token()
+        if not token:
+            log_error("No Infisical access token (call login() or pass access_token)")
+            return False
+
+        url = f"{self.base_url}/api/v3/secrets/raw/{secret_name}"
+        body = {
+            "workspaceId": project_id,
+            "environment": env_slug,
+            "secretPath": secret_path,
+            "secretValue": secret_value
+        }
+        headers = {"Authorization": f"Bearer {token}"}
+        # Invalidate first: even a failed write may have reached the server
+        self.invalidate_secrets(project_id, env_slug, secret_path)
+        try:
+            resp = self.session.patch(url, json=body, headers=headers, timeout=10)
+            if resp.status_code in (400, 404):
+                # Secret does not exist yet
+                resp = self.session.post(url, json=body, headers=headers, timeout=10)
+        except RequestException as e:
+            log_error(f"Failed to write secret {secret_name}: {e}")
+            return False
+        finally:
+            # And again after: a fetch that started during the write may hold the old value
+            self.invalidate_secrets(project_id, env_slug, secret_path)
+        if resp.status_code != 200:
+            log_error(f"Failed to write secret {secret_name}: {resp.status_code} - {resp.text}")
+            return False
+        return True
+
+    def get_secret(
+        self,
+        project_id: str,
+        env_slug: str,
+        secret_name: str,
+        access_token: Optional[str] = None,
+        secret_path: str = "/"
+    ) -> Optional[str]:
+        """Get a secret value from Infisical (one bulk fetch per environment/path)."""
+        secrets = self._secrets.get((project_id, env_slug, secret_path))
+        if secrets is None:
+            secrets = self.list_secrets(project_id, env_slug, secret_path, access_token)
+        return secrets.get(secret_name) if secrets else None
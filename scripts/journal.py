@@ -0,0 +1,132 @@
+"""Journal of completed deploy steps, keyed by a fingerprint of their inputs.
+
+A rerun skips a step when the journal holds the same fingerprint and the
+step's post-condition still holds. Once a step actually runs, every later
+step runs too: its inputs may have changed in ways no fingerprint captures.
+Steps that can tell what they produce (outputs) only do so when that changed.
+
+ApplyCache applies the same idea to single `terraform apply` runs.
+"""
+
+import hashlib
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from scripts.fileio import read_json, write_json
+
+
+def fingerprint(*parts: str) -> str:
+    """Stable digest of input values."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def hash_files(paths: Iterable[Path], root: Optional[Path] = None) -> str:
+    """Digest of file names and contents (missing files count as empty)."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(str(path.relative_to(root) if root else path).encode() + b"\0")
+        try:
+            digest.update(path.read_bytes())
+        except OSError:
+            pass
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class DeployJournal:
+    """Completed steps of `deploy.py apply`, persisted between runs."""
+
+    def __init__(self, path: Path, steps: tuple[str, ...], force: bool = False):
+        self.path = path
+        self.steps = steps
+        self.force = force
+        # Set once a step ran in this process: later steps can't be trusted to be done
+        self.ran_step = False
+
+    def _load(self) -> dict:
+        return read_json(self.path)
+
+    def _save(self, entries: dict) -> None:
+        write_json(self.path, entries)
+
+    def is_done(self, step: str, inputs: str) -> bool:
+        """Whether step completed in an earlier run with the same inputs."""
+        if self.force or self.ran_step:
+            return False
+        return self._load().get(step, {}).get("fingerprint") == inputs
+
+    def record(self, step: str, inputs: str) -> None:
+        entries = self._load()
+        entries[step] = {"fingerprint": inputs, "completed_at": time.time()}
+        self._save(entries)
+
+    def discard_from(self, step: str) -> None:
+        """Forget step and every step after it (--from)."""
+        later = self.steps[self.steps.index(step):]
+        entries = {name: entry for name, entry in self._load().items() if name not in later}
+        self._save(entries)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+    def run(
+        self,
+        step: str,
+        inputs: str,
+        action: Callable[[], bool],
+        still_holds: Optional[Callable[[], bool]] = None,
+        outputs: Optional[Callable[[], str]] = None
+    ) -> tuple[bool, bool]:
+        """
+        Run action unless the step is already done and still_holds().
+
+        outputs, if given, digests what the step produces: a run that leaves
+        it unchanged (e.g. a token that turned out valid) doesn't force the
+        later steps to run.
+
+        Returns:
+            (ok, skipped)
+        """
+        if self.is_done(step, inputs) and (still_holds is None or still_holds()):
+            return True, True
+        before = outputs() if outputs else None
+        ok = action()
+        if not ok or outputs is None or outputs() != before:
+            self.ran_step = True
+        if ok:
+            self.record(step, inputs)
+        return ok, False
+
+
+class ApplyCache:
+    """
+    Inputs of the last successful `terraform apply` per target scope.
+
+    An apply is a no-op candidate when its scope was last applied with the
+    same inputs and the state serial is still the one our last successful
+    apply left behind, i.e. nothing (us included) changed the state since.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def _load(self) -> dict:
+        return read_json(self.path)
+
+    def is_unchanged(self, scope: str, inputs: str, serial: str) -> bool:
+        entries = self._load()
+        return bool(serial) and entries.get("serial") == serial and entries.get("scopes", {}).get(scope) == inputs
+
+    def record(self, scope: str, inputs: str, serial: str) -> None:
+        entries = self._load()
+        entries.setdefault("scopes", {})[scope] = inputs
+        entries["serial"] = serial
+        write_json(self.path, entries)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,82 @@
+"""Readiness probing with exponential backoff, jitter and an overall deadline."""
+
+import random
+import socket
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+class ProbeAborted(Exception):
+    """Raised by a check to stop waiting immediately (the condition can never hold)."""
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of waiting for a condition."""
+    ready: bool
+    elapsed: float
+    attempts: int
+    last_error: Optional[str] = None
+
+
+def backoff_delays(
+    initial: float = 0.05,
+    maximum: float = 2.0,
+    factor: float = 2.0,
+    jitter: float = 0.5
+):
+    """Yield exponentially growing delays with +/- jitter (as a fraction of the delay)."""
+    delay = initial
+    while True:
+        yield delay * (1 + random.uniform(-jitter, jitter))
+        delay = min(delay * factor, maximum)
+
+
+def wait_until(
+    check: Callable[[], bool],
+    timeout: float,
+    initial_delay: float = 0.05,
+    max_delay: float = 2.0,
+    on_progress: Optional[Callable[[int, float], None]] = None
+) -> ProbeResult:
+    """
+    Call check() until it returns True or the deadline passes.
+
+    Exceptions raised by check() count as a failed attempt; the last one is
+    reported in the result. ProbeAborted stops waiting right away.
+    on_progress(attempts, elapsed) is called roughly every 10 seconds.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    attempts = 0
+    last_error = None
+    next_progress = start + 10
+    delays = backoff_delays(initial_delay, max_delay)
+
+    while True:
+        attempts += 1
+        try:
+            if check():
+                return ProbeResult(True, time.monotonic() - start, attempts)
+        except ProbeAborted as e:
+            return ProbeResult(False, time.monotonic() - start, attempts, str(e))
+        except Exception as e:
+            last_error = str(e)
+
+        now = time.monotonic()
+        if now >= deadline:
+            return ProbeResult(False, now - start, attempts, last_error)
+        if on_progress and now >= next_progress:
+            on_progress(attempts, now - start)
+            next_progress = now + 10
+        time.sleep(min(next(delays), deadline - now))
+
+
+def tcp_connect(host: str, port: int, timeout: float = 1.0) -> bool:
+    """Check whether a TCP connection can be opened (cheap pre-check before HTTP)."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
@@ -0,0 +1,172 @@
+"""Proxmox VE REST API client (token management over a keep-alive HTTPS session)
+and a local cache of token-validity verdicts."""
+
+import hashlib
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+import requests
+import urllib3
+from requests.exceptions import RequestException
+
+from scripts.fileio import read_json, write_json
+
+
+class ProxmoxAPIError(Exception):
+    """A Proxmox API call failed (status_code is None for connection errors)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def is_auth_error(self) -> bool:
+        return self.status_code == 401
+
+    @property
+    def is_missing_token(self) -> bool:
+        # Proxmox answers 500 with "no such token" in the status line for unknown tokens
+        return self.status_code == 500 and "no such token" in str(self).lower()
+
+
+class ProxmoxClient:
+    """Client for the Proxmox VE API authenticated with an API token."""
+
+    def __init__(
+        self,
+        api_url: str,
+        token_id: str,
+        token_secret: str,
+        verify: bool = True,
+        timeout: float = 10
+    ):
+        # api_url as in terraform.tfvars, e.g. https://pve:8006/api2/json
+        self.api_url = api_url.rstrip("/")
+        self.token_id = token_id
+        self.timeout = timeout
+        # Keep-alive session: every call after the first reuses the TLS connection
+        self.session = requests.Session()
+        self.session.verify = verify
+        self.session.headers["Authorization"] = f"PVEAPIToken={token_id}={token_secret}"
+        if not verify:
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    def _request(self, method: str, path: str, **kwargs):
+        """Call the API and return the "data" member of the response."""
+        try:
+            resp = self.session.request(method, f"{self.api_url}{path}", timeout=self.timeout, **kwargs)
+        except RequestException as e:
+            raise ProxmoxAPIError(f"{method} {path}: {e}") from e
+        if resp.status_code != 200:
+            raise ProxmoxAPIError(f"{method} {path}: {resp.status_code} {resp.reason}", resp.status_code)
+        return resp.json().get("data")
+
+    @staticmethod
+    def _token_path(pve_user: str, token_name: str = "") -> str:
+        path = f"/access/users/{quote(pve_user, safe='')}/token"
+        return f"{path}/{quote(token_name, safe='')}" if token_name else path
+
+    def version(self) -> dict:
+        """Get the Proxmox VE version (any valid token can read it)."""
+        return self._request("GET", "/version")
+
+    def list_tokens(self, pve_user: str) -> list[dict]:
+        """List the API tokens of a user (dicts with 'tokenid', 'privsep', 'expire', ...)."""
+        return self._request("GET", self._token_path(pve_user)) or []
+
+    def get_token(self, pve_user: str, token_name: str) -> dict:
+        """Get one API token of a user (raises ProxmoxAPIError if it does not exist)."""
+        return self._request("GET", self._token_path(pve_user, token_name)) or {}
+
+    def create_token(self, pve_user: str, token_name: str, privsep: bool = False) -> dict:
+        """
+        Create an API token.
+
+        Returns:
+            dict with 'token_id' and 'token_secret' keys
+        """
+        data = self._request(
+            "POST", self._token_path(pve_user, token_name), data={"privsep": int(privsep)}
+        ) or {}
+        return {"token_id": data.get("full-tokenid", ""), "token_secret": data.get("value", "")}
+
+    def delete_token(self, pve_user: str, token_name: str) -> None:
+        """Delete an API token."""
+        self._request("DELETE", self._token_path(pve_user, token_name))
+
+    def lxc_status(self, node: str, vmid: str) -> str:
+        """Current status of an LXC ("running", "stopped"); raises ProxmoxAPIError if it doesn't exist."""
+        path = f"/nodes/{quote(node, safe='')}/lxc/{quote(str(vmid), safe='')}/status/current"
+        return (self._request("GET", path) or {}).get("status", "")
+
+    def validate_token(self, pve_user: str, token_name: str) -> bool:
+        """
+        Check in one roundtrip that the token authenticates and exists.
+
+        Returns:
+            False if the secret is rejected (401) or the token is gone (500
+            "no such token"); connection errors and other server errors (e.g.
+            502/503 while pveproxy restarts) raise ProxmoxAPIError
+        """
+        try:
+            self.get_token(pve_user, token_name)
+            return True
+        except ProxmoxAPIError as e:
+            if e.status_code == 403:
+                # Authenticated, just not allowed to read token metadata
+                return True
+            if e.status_code == 401:
+                return False
+            if e.is_missing_token:
+                return False
+            raise
+
+
+class TokenVerdictCache:
+    """
+    Remembers recently validated tokens so warm runs can skip verification.
+
+    Entries are keyed by a hash of API URL, token id and secret (the secret
+    itself is never written) and expire after ttl seconds.
+    """
+
+    def __init__(self, path: Path, ttl: float):
+        self.path = path
+        self.ttl = ttl
+
+    @staticmethod
+    def key(api_url: str, token_id: str, token_secret: str) -> str:
+        return hashlib.sha256(f"{api_url}\0{token_id}\0{token_secret}".encode()).hexdigest()
+
+    def _load(self) -> dict[str, float]:
+        return read_json(self.path)
+
+    def _save(self, entries: dict[str, float]) -> None:
+        write_json(self.path, entries, indent=None)
+
+    def age(self, key: str) -> Optional[float]:
+        """Seconds since the token was last validated, or None if unknown/expired."""
+        validated_at = self._load().get(key)
+        if validated_at is None or self.ttl <= 0:
+            return None
+        age = time.time() - validated_at
+        return age if 0 <= age < self.ttl else None
+
+    def record_valid(self, key: str) -> None:
+        if self.ttl <= 0:
+            return
+        now = time.time()
+        entries = {k: t for k, t in self._load().items() if now - t < self.ttl}
+        entries[key] = now
+        self._save(entries)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Forget one token's verdict (or all of them)."""
+        entries = self._load()
+        if key is None:
+            entries.clear()
+        elif entries.pop(key, None) is None:
+            return
+        self._save(entries)
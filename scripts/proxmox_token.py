@@ -3,7 +3,8 @@
 Proxmox Token Management Script
 
 Creates or rotates Proxmox API tokens via SSH (pveum command).
-Used by Terraform to auto-manage Proxmox tokens.
+This is the bootstrap path, used when no working token is available; checks of
+an existing token go through the REST API (see proxmox_client.py).
 
 Usage:
     python scripts/proxmox_token.py <proxmox_host> <ssh_user> <pve_user> <token_name> [--rotate]
@@ -11,26 +12,22 @@ Usage:
 
 import sys
 import json
-import subprocess
+from dataclasses import dataclass
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from scripts.utils import log_info, log_warn, log_error, run_cmd
+from scripts.utils import log_info, log_warn, log_error
+from scripts.ssh_session import ssh_run
 
 
 def list_tokens(proxmox_host: str, ssh_user: str, pve_user: str) -> list:
     """List all tokens for a Proxmox user."""
     try:
-        cmd = [
-            "ssh",
-            "-o", "StrictHostKeyChecking=no",
-            "-o", "BatchMode=yes",
-            "-o", "ConnectTimeout=10",
-            f"{ssh_user}@{proxmox_host}",
+        result = ssh_run(
+            proxmox_host, ssh_user,
             f"pveum user token list {pve_user} --output-format json"
-        ]
-        result = run_cmd(cmd, capture=True, check=False)
+        )
         if result.returncode == 0 and result.stdout.strip():
             return json.loads(result.stdout)
         return []
@@ -51,33 +48,42 @@ def remove_token(proxmox_host: str, ssh_user: str, token_id: str) -> bool:
         pve_user = parts[0]
         token_name = parts[1]
 
-        cmd = [
-            "ssh",
-            "-o", "StrictHostKeyChecking=no",
-            "-o", "BatchMode=yes",
-            "-o", "ConnectTimeout=10",
-            f"{ssh_user}@{proxmox_host}",
-            f"pveum user token delete {pve_user} {token_name}"
-        ]
-        result = run_cmd(cmd, capture=True, check=False)
+        result = ssh_run(proxmox_host, ssh_user, f"pveum user token delete {pve_user} {token_name}")
         return result.returncode == 0
     except Exception as e:
         log_error(f"Failed to remove token: {e}")
         return False
 
 
+@dataclass
+class ProxmoxToken:
+    """A Proxmox API token and its secret."""
+    token_id: str
+    token_secret: str
+
+    def to_dict(self) -> dict:
+        return {"token_id": self.token_id, "token_secret": self.token_secret}
+
+
+class TokenError(Exception):
+    """Token creation or rotation failed."""
+
+
 def create_token(
     proxmox_host: str,
     ssh_user: str,
     pve_user: str,
     token_name: str,
     rotate: bool = False
-) -> dict:
+) -> ProxmoxToken:
     """
     Create a new Proxmox API token.
 
-    Returns:
-        dict with 'token_id' and 'token_secret' keys
+    An existing token with the same name is rotated (removed and recreated)
+    to obtain a new secret.
+
+    Raises:
+        TokenError: if the token could not be created
     """
     # If rotating, remove old token first
     if rotate:
@@ -93,54 +99,34 @@ def create_token(
     # Create new token (pveum will fail if token exists and we're not rotating)
     # --privsep=0 gives the token full privileges of the user (no separate ACLs needed)
     log_info(f"Creating Proxmox token: {pve_user}!{token_name}")
-    try:
-        cmd = [
-            "ssh",
-            "-o", "StrictHostKeyChecking=no",
-            "-o", "BatchMode=yes",
-            "-o", "ConnectTimeout=10",
-            f"{ssh_user}@{proxmox_host}",
-            f"pveum user token add {pve_user} {token_name} --privsep 0 --output-format json"
-        ]
-        result = run_cmd(cmd, capture=True, check=True)
-
-        # Parse JSON output
-        output = json.loads(result.stdout)
-        # pveum returns "full-tokenid" not "tokenid"
-        token_id = output.get("full-tokenid", "") or output.get("tokenid", "")
-        token_secret = output.get("value", "")
-
-        if not token_id or not token_secret:
-            log_error(f"Failed to parse token output. Got: {result.stdout}")
-            raise ValueError("Token creation failed: missing token_id or secret")
-
-        log_info(f"Token created successfully: {token_id}")
-        return {
-            "token_id": token_id,
-            "token_secret": token_secret
-        }
-    except subprocess.CalledProcessError as e:
+    result = ssh_run(
+        proxmox_host, ssh_user,
+        f"pveum user token add {pve_user} {token_name} --privsep 0 --output-format json"
+    )
+
+    if result.returncode != 0:
+        output = f"{result.stdout}\n{result.stderr}".strip()
         # If token already exists, try to rotate it
-        if "already exists" in (e.stderr or "").lower() or "already exists" in (e.stdout or "").lower():
+        if "already exists" in output.lower():
             if not rotate:
                 log_warn(f"Token {pve_user}!{token_name} already exists, rotating to get new secret...")
-                # Recursively call with rotate=True
                 return create_token(proxmox_host, ssh_user, pve_user, token_name, rotate=True)
-            else:
-                log_error("Failed to rotate token (may have been removed but creation failed)")
-                sys.exit(1)
-        log_error(f"Failed to create token: {e}")
-        if e.stdout:
-            log_error(f"Output: {e.stdout}")
-        if e.stderr:
-            log_error(f"Error: {e.stderr}")
-        sys.exit(1)
+            raise TokenError("Failed to rotate token (may have been removed but creation failed)")
+        raise TokenError(f"pveum exited with {result.returncode}: {output}")
+
+    try:
+        output = json.loads(result.stdout)
     except json.JSONDecodeError as e:
-        log_error(f"Failed to parse token output: {e}")
-        sys.exit(1)
-    except Exception as e:
-        log_error(f"Unexpected error: {e}")
-        sys.exit(1)
+        raise TokenError(f"Failed to parse token output: {e}") from e
+
+    # pveum returns "full-tokenid" not "tokenid"
+    token_id = output.get("full-tokenid", "") or output.get("tokenid", "")
+    token_secret = output.get("value", "")
+    if not token_id or not token_secret:
+        raise TokenError(f"Token output is missing token_id or secret: {result.stdout}")
+
+    log_info(f"Token created successfully: {token_id}")
+    return ProxmoxToken(token_id, token_secret)
 
 
 def main():
@@ -161,12 +147,14 @@ def main():
     token_name = sys.argv[4]
     rotate = "--rotate" in sys.argv or rotate_env
 
-    # Create or rotate token
-    # If token exists and we're not rotating, create_token will fail with clear error
-    token_data = create_token(proxmox_host, ssh_user, pve_user, token_name, rotate)
+    try:
+        token = create_token(proxmox_host, ssh_user, pve_user, token_name, rotate)
+    except TokenError as e:
+        log_error(f"Failed to create token: {e}")
+        sys.exit(1)
 
     # Output JSON for Terraform
-    print(json.dumps(token_data))
+    print(json.dumps(token.to_dict()))
 
 
 if __name__ == "__main__":
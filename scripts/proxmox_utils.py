@@ -1,13 +1,29 @@
 """Proxmox utility functions for LXC management via SSH."""
 
 import sys
-import time
+import json
+import shlex
+import hashlib
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Optional
 
 sys_path = Path(__file__).parent.parent
 sys.path.insert(0, str(sys_path))
 
-from scripts.utils import log_info, log_error, run_cmd
+from scripts.utils import log_info, log_error
+from scripts.ssh_session import ssh_run, ssh_stream
+from scripts.probe import ProbeAborted, wait_until
+
+# Exit code used by the readiness script when waiting is pointless
+_NOT_RECOVERABLE = 3
+
+# Host-side apk package cache (one subdirectory per Alpine release and arch)
+APK_CACHE_DIR = "/var/cache/selfhost/apk"
+
+# Wall-clock limits for long remote operations (seconds)
+DOWNLOAD_TIMEOUT = 1800
+PROVISION_TIMEOUT = 900
 
 
 def download_template(proxmox_host: str, ssh_user: str, storage: str, template_name: str) -> bool:
@@ -27,11 +43,7 @@ def download_template(proxmox_host: str, ssh_user: str, storage: str, template_n
 
     # Check if template exists
     check_cmd = f"pveam list {storage} | grep -q '{template_name}'"
-    result = run_cmd(
-        ["ssh", "-o", "StrictHostKeyChecking=no", f"{ssh_user}@{proxmox_host}", check_cmd],
-        capture=True,
-        check=False
-    )
+    result = ssh_run(proxmox_host, ssh_user, check_cmd)
 
     if result.returncode == 0:
         log_info(f"Template '{template_name}' already exists")
@@ -40,117 +52,562 @@ def download_template(proxmox_host: str, ssh_user: str, storage: str, template_n
     # Download template
     log_info(f"Downloading template '{template_name}'...")
     download_cmd = f"pveam download {storage} {template_name}"
-    result = run_cmd(
-        ["ssh", "-o", "StrictHostKeyChecking=no", f"{ssh_user}@{proxmox_host}", download_cmd],
-        capture=True,
-        check=False
-    )
+    result = ssh_stream(proxmox_host, ssh_user, download_cmd, prefix="[pveam]", timeout=DOWNLOAD_TIMEOUT)
 
     if result.returncode == 0:
         log_info(f"Template '{template_name}' downloaded successfully")
         return True
 
-    log_error(f"Failed to download template '{template_name}': {result.stderr}")
+    reason = f"timed out after {DOWNLOAD_TIMEOUT}s" if result.timed_out else "\n".join(result.tail[-20:])
+    log_error(f"Failed to download template '{template_name}': {reason}")
+    return False
+
+
+def container_readiness_script(container_id: str) -> str:
+    """Shell script (run on the Proxmox host) that checks an LXC is usable.
+
+    Prints the reason and exits non-zero when the container is not ready yet.
+    """
+    inner = (
+        'ip -4 route show default 2>/dev/null | grep -q . || { echo "no default route"; exit 1; }; '
+        '[ -s /etc/resolv.conf ] || { echo "no DNS servers configured"; exit 1; }; '
+        'command -v apk >/dev/null 2>&1 || { echo "apk not available"; exit 1; }; '
+        '[ ! -e /lib/apk/db/lock ] || ! fuser /lib/apk/db/lock >/dev/null 2>&1 || '
+        '{ echo "apk database is locked"; exit 1; }'
+    )
+    return (
+        f"STATUS=$(pct status {container_id} 2>&1) || "
+        f"{{ echo \"$STATUS\"; exit {_NOT_RECOVERABLE}; }}; "
+        f"case \"$STATUS\" in *running*) ;; *) echo \"container $STATUS\"; exit 1;; esac; "
+        f"pct exec {container_id} -- sh -c '{inner}'"
+    )
+
+
+def wait_for_container(
+    proxmox_host: str,
+    ssh_user: str,
+    container_id: str,
+    timeout: float = 120.0
+) -> bool:
+    """
+    Wait until an LXC container is running with networking and apk usable.
+
+    Args:
+        proxmox_host: Proxmox host IP or hostname
+        ssh_user: SSH user for Proxmox host
+        container_id: LXC container ID (VMID)
+        timeout: Overall deadline in seconds
+
+    Returns:
+        True as soon as the container is ready, False on timeout or if the
+        container does not exist
+    """
+    script = container_readiness_script(container_id)
+    last_reason = ["unknown"]
+
+    def check() -> bool:
+        result = ssh_run(proxmox_host, ssh_user, script)
+        if result.returncode == 0:
+            return True
+        reason = (result.stdout.strip() or result.stderr.strip() or f"exit {result.returncode}")
+        last_reason[0] = reason
+        if result.returncode == _NOT_RECOVERABLE:
+            raise ProbeAborted(reason)
+        raise RuntimeError(reason)
+
+    log_info(f"Waiting for container {container_id} to be ready...")
+    result = wait_until(
+        check,
+        timeout=timeout,
+        initial_delay=0.2,
+        on_progress=lambda attempts, elapsed: log_info(
+            f"Container {container_id} not ready yet ({elapsed:.0f}s): {last_reason[0]}"
+        )
+    )
+
+    if result.ready:
+        log_info(f"Container {container_id} ready after {result.elapsed:.1f}s")
+        return True
+
+    log_error(
+        f"Container {container_id} not ready after {result.elapsed:.1f}s "
+        f"({result.attempts} checks): {result.last_error}"
+    )
     return False
 
 
+# POSIX sh (busybox ash) prelude for provisioning scripts run inside the container.
+# Each step is skipped when its post-condition already holds and reports one JSON line:
+#   {"step": "<name>", "status": "ok|skipped|failed", "ms": <elapsed>}
+_PROVISION_PRELUDE = r'''
+set -u
+now_ms() {
+    read -r up _ < /proc/uptime
+    cs=${up#*.}; cs=${cs#0}
+    echo $(( ${up%.*} * 1000 + cs * 10 ))
+}
+step() {
+    name=$1; check=$2; action=$3
+    t0=$(now_ms)
+    if eval "$check" >/dev/null 2>&1; then
+        status=skipped
+    elif out=$(eval "$action" 2>&1); then
+        status=ok
+    else
+        status=failed
+    fi
+    printf '{"step": "%s", "status": "%s", "ms": %d}\n' "$name" "$status" $(( $(now_ms) - t0 ))
+    if [ "$status" = failed ]; then
+        printf '%s\n' "$out" | tail -n 20 >&2
+        exit 1
+    fi
+}
+'''
+
+
+def build_provision_script(packages: list[str], authorized_keys: list[str]) -> str:
+    """
+    Build an idempotent provisioning script for an Alpine Docker LXC.
+
+    The Proxmox host key is not embedded: it is read on the host and passed in
+    through the PVE_KEY environment variable (see provision_container).
+    """
+    pkgs = " ".join(packages)
+    # With a seeded /etc/apk/cache (see apk_cache_command) a recent cached index
+    # and cached packages are used without touching the mirrors
+    install = (
+        f"if [ -d /etc/apk/cache ]; then "
+        f"apk add --cache-max-age 1440 {pkgs} || {{ apk update && apk add {pkgs}; }}; "
+        f"else apk update && apk add --no-cache {pkgs}; fi"
+    )
+    lines = [
+        _PROVISION_PRELUDE,
+        f"step packages 'apk info -e {pkgs}' '{install}'",
+        "step services_enabled "
+        "'rc-update show boot | grep -qw docker && rc-update show boot | grep -qw sshd' "
+        "'rc-update add docker boot && rc-update add sshd boot'",
+        "step ssh_host_keys 'ls /etc/ssh/ssh_host_*_key' 'ssh-keygen -A'",
+        "step docker_started 'rc-service docker status' 'rc-service docker start'",
+        "step sshd_started 'rc-service sshd status' 'rc-service sshd start'",
+        "step ssh_dir '[ -d /root/.ssh ]' 'mkdir -p /root/.ssh && chmod 700 /root/.ssh'",
+        'step proxmox_key \'[ -z "${PVE_KEY:-}" ] || grep -qxF "$PVE_KEY" /root/.ssh/authorized_keys\' '
+        '\'printf "%s\\n" "$PVE_KEY" >> /root/.ssh/authorized_keys && chmod 600 /root/.ssh/authorized_keys\'',
+    ]
+    for i, key in enumerate(authorized_keys):
+        lines.append(f"KEY_{i}={shlex.quote(key)}")
+        lines.append(
+            f'step local_key_{i} \'grep -qxF "$KEY_{i}" /root/.ssh/authorized_keys\' '
+            f'\'printf "%s\\n" "$KEY_{i}" >> /root/.ssh/authorized_keys && '
+            f'chmod 600 /root/.ssh/authorized_keys\''
+        )
+    return "\n".join(lines) + "\n"
+
+
+@dataclass
+class ApkCacheReport:
+    """Outcome of a provisioning run that used the host apk cache."""
+    cache_dir: str
+    hits: list[str] = field(default_factory=list)
+    misses: list[str] = field(default_factory=list)
+    evicted: list[str] = field(default_factory=list)
+    size_bytes: int = 0
+
+
+def apk_cache_command(container_id: str, inner_cmd: str) -> str:
+    """
+    Wrap a host-side command with apk cache seeding and harvesting.
+
+    Before inner_cmd runs, the host cache for the container's Alpine release
+    and arch is copied into /etc/apk/cache inside the container; afterwards new
+    downloads are copied back and the container cache is removed again. The
+    cache state is printed as "@cache-*" / "@installed" lines for
+    parse_apk_cache_output().
+    """
+    in_ct = f"pct exec {container_id} --"
+    release = "'. /etc/os-release; echo \"${VERSION_ID%.*}-$(apk --print-arch)\"'"
+    return (
+        f"CACHE={APK_CACHE_DIR}/$({in_ct} sh -c {release} </dev/null); "
+        "mkdir -p \"$CACHE\"; "
+        "echo \"@cache-dir $CACHE\"; "
+        "ls \"$CACHE\" | sed 's/^/@cache-before /'; "
+        f"tar -C \"$CACHE\" -cf - . | {in_ct} sh -c 'mkdir -p /etc/apk/cache && tar -C /etc/apk/cache -xf -'; "
+        f"{inner_cmd}; RC=$?; "
+        f"{in_ct} sh -c 'tar -C /etc/apk/cache -cf - . && rm -rf /etc/apk/cache' </dev/null "
+        "| tar -C \"$CACHE\" -xf -; "
+        "find \"$CACHE\" -maxdepth 1 -type f -printf '@cache-entry %T@ %s %f\\n'; "
+        f"{in_ct} apk info -v </dev/null 2>/dev/null | sed 's/^/@installed /'; "
+        "exit $RC"
+    )
+
+
+def _apk_is_cache_name(filename: str) -> bool:
+    """Whether a package file carries apk's checksum suffix ('name-ver.1a2b3c4d.apk').
+
+    Only such files are cache hits for apk; plain 'name-ver.apk' files
+    (e.g. from `apk fetch`) are never used.
+    """
+    stem = filename[:-len(".apk")] if filename.endswith(".apk") else filename
+    _, dot, checksum = stem.rpartition(".")
+    return bool(dot) and len(checksum) == 8 and all(c in "0123456789abcdef" for c in checksum)
+
+
+def _apk_pkgver(filename: str) -> str:
+    """Cache file 'docker-27.3.1-r1.1a2b3c4d.apk' (or 'docker-27.3.1-r1.apk') -> 'docker-27.3.1-r1'."""
+    stem = filename[:-len(".apk")] if filename.endswith(".apk") else filename
+    return stem.rsplit(".", 1)[0] if _apk_is_cache_name(filename) else stem
+
+
+def parse_apk_cache_output(stdout: str, max_bytes: int) -> tuple[ApkCacheReport, list[str]]:
+    """
+    Compute hits/misses and the LRU eviction list from apk_cache_command output.
+
+    Returns:
+        (report, files to touch as recently used)
+    """
+    report = ApkCacheReport(cache_dir="")
+    before: set[str] = set()
+    installed: set[str] = set()
+    entries: list[tuple[float, int, str]] = []
+    for line in stdout.splitlines():
+        tag, _, rest = line.partition(" ")
+        if tag == "@cache-dir":
+            report.cache_dir = rest.strip()
+        elif tag == "@cache-before":
+            before.add(rest.strip())
+        elif tag == "@installed":
+            installed.add(rest.strip())
+        elif tag == "@cache-entry":
+            mtime, size, name = rest.split(" ", 2)
+            entries.append((float(mtime), int(size), name.strip()))
+
+    packages = [e for e in entries if e[2].endswith(".apk")]
+    used = {name for _, _, name in packages if _apk_is_cache_name(name) and _apk_pkgver(name) in installed}
+    report.hits = sorted(name for name in used if name in before)
+    report.misses = sorted(name for _, _, name in packages if name not in before)
+
+    # Files without checksum suffix are never used by apk: always evicted
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in packages:
+        if not _apk_is_cache_name(name):
+            report.evicted.append(name)
+            total -= size
+
+    # LRU: files used by this container count as most recent; evict oldest first
+    recent = used | set(report.misses)
+    for _, size, name in sorted(packages, key=lambda e: (e[2] in recent, e[0])):
+        if total <= max_bytes:
+            break
+        if name in report.evicted:
+            continue
+        report.evicted.append(name)
+        total -= size
+    report.size_bytes = total
+    return report, sorted(recent - set(report.evicted))
+
+
+def provision_container(
+    proxmox_host: str,
+    ssh_user: str,
+    container_id: str,
+    script: str,
+    apk_cache_max_mb: int = 0
+) -> Optional[list[dict]]:
+    """
+    Run a provisioning script inside an LXC in a single SSH roundtrip.
+
+    The script is streamed over stdin into `pct exec <id> -- sh -s`; the
+    Proxmox host's own public key is passed along as PVE_KEY. With
+    apk_cache_max_mb > 0, packages are served from (and added to) a cache on
+    the Proxmox host, limited to that size with LRU eviction.
+
+    Returns:
+        Per-step results (step, status, ms), or None if provisioning failed
+    """
+    remote_cmd = (
+        "PVE_KEY=$(cat /root/.ssh/id_ed25519.pub 2>/dev/null); "
+        f"pct exec {container_id} -- env PVE_KEY=\"$PVE_KEY\" sh -s"
+    )
+    if apk_cache_max_mb > 0:
+        remote_cmd = apk_cache_command(container_id, remote_cmd)
+
+    # Step results are logged as soon as each step finishes; apk cache markers
+    # are collected for the cache report; everything else is streamed as-is
+    steps = []
+    cache_lines = []
+
+    def on_line(line: str) -> None:
+        if line.startswith("@"):
+            cache_lines.append(line)
+            return
+        if not line.startswith("{"):
+            return
+        try:
+            step = json.loads(line)
+        except json.JSONDecodeError:
+            return
+        steps.append(step)
+        log = log_error if step.get("status") == "failed" else log_info
+        log(f"  {step.get('step'):<18} {step.get('status'):<8} {step.get('ms', 0) / 1000:.2f}s")
+
+    result = ssh_stream(
+        proxmox_host, ssh_user, remote_cmd,
+        prefix=f"[ct {container_id}]",
+        echo=lambda line: not line.startswith(("@", "{")),
+        on_line=on_line,
+        timeout=PROVISION_TIMEOUT,
+        stdin_data=script
+    )
+
+    if apk_cache_max_mb > 0:
+        report, used = parse_apk_cache_output("\n".join(cache_lines), apk_cache_max_mb * 1024 * 1024)
+        if report.cache_dir:
+            maintain_apk_cache(proxmox_host, ssh_user, report, used)
+
+    if result.returncode != 0:
+        reason = f"timed out after {PROVISION_TIMEOUT}s" if result.timed_out else f"exit {result.returncode}"
+        log_error(f"Provisioning failed ({reason})")
+        for line in result.tail[-20:]:
+            if not line.startswith(("@", "{")):
+                log_error(f"  {line}")
+        return None
+    return steps
+
+
+def maintain_apk_cache(proxmox_host: str, ssh_user: str, report: ApkCacheReport, used: list[str]) -> None:
+    """Mark used packages as recent, evict over-limit ones and log the hit/miss report."""
+    cmds = []
+    if used:
+        cmds.append("touch -c -- " + " ".join(shlex.quote(name) for name in used))
+    if report.evicted:
+        cmds.append("rm -f -- " + " ".join(shlex.quote(name) for name in report.evicted))
+    if cmds:
+        ssh_run(proxmox_host, ssh_user, f"cd {shlex.quote(report.cache_dir)} && " + " && ".join(cmds))
+
+    log_info(
+        f"apk cache {report.cache_dir}: {len(report.hits)} hit(s), {len(report.misses)} miss(es), "
+        f"{len(report.evicted)} evicted, {report.size_bytes / 1024 / 1024:.1f} MB"
+    )
+    if report.misses:
+        log_info(f"  downloaded: {', '.join(_apk_pkgver(name) for name in report.misses)}")
+
+
 def install_docker(
     proxmox_host: str,
     ssh_user: str,
     container_id: str,
-    install_compose: bool = True
+    install_compose: bool = True,
+    apk_cache_max_mb: int = 0
 ) -> bool:
     """
     Install Docker and SSH on Alpine LXC container.
 
+    All steps (packages, services, SSH keys) run in one idempotent script over
+    a single SSH session; steps that are already satisfied are skipped.
+
     Args:
         proxmox_host: Proxmox host IP or hostname
         ssh_user: SSH user for Proxmox host
         container_id: LXC container ID (VMID)
         install_compose: Whether to install Docker Compose
+        apk_cache_max_mb: Size limit of the host apk cache in MB (0 = no cache)
 
     Returns:
         True if installation was successful
     """
     log_info(f"Installing Docker on container {container_id}...")
 
-    # Wait for container to be ready
-    time.sleep(10)
+    # Wait for container to be ready (running, networking and apk usable)
+    if not wait_for_container(proxmox_host, ssh_user, container_id):
+        return False
 
     # Build package list
-    packages = "docker docker-cli openssh"
+    packages = ["docker", "docker-cli", "openssh"]
     if install_compose:
-        packages += " docker-compose"
-
-    # Install Docker and SSH
-    install_cmd = f'''
-        apk update && \
-        apk add --no-cache {packages} && \
-        rc-update add docker boot && \
-        rc-update add sshd boot && \
-        ssh-keygen -A && \
-        service docker start && \
-        service sshd start
-    '''
-
-    result = run_cmd(
-        [
-            "ssh", "-o", "StrictHostKeyChecking=no",
-            f"{ssh_user}@{proxmox_host}",
-            f"pct exec {container_id} -- sh -c '{install_cmd}'"
-        ],
-        capture=True,
-        check=False
+        packages.append("docker-compose")
+
+    # Local machine's public key, if available (ed25519 only)
+    authorized_keys = []
+    local_key_path = Path.home() / ".ssh" / "id_ed25519.pub"
+    if local_key_path.exists():
+        authorized_keys.append(local_key_path.read_text().strip())
+
+    script = build_provision_script(packages, authorized_keys)
+    if provision_container(proxmox_host, ssh_user, container_id, script, apk_cache_max_mb) is None:
+        return False
+
+    log_info("Docker installation and SSH setup completed")
+    return True
+
+
+def warm_apk_cache(
+    proxmox_host: str,
+    ssh_user: str,
+    container_id: str,
+    packages: list[str],
+    apk_cache_max_mb: int
+) -> bool:
+    """
+    Prefill the host apk cache with packages (and dependencies) via a running container.
+
+    Packages are only downloaded into the cache, not installed. `apk cache
+    download` stores them under apk's checksummed cache names, so later
+    installs find them (`apk fetch` output is never a cache hit).
+    """
+    log_info(f"Warming apk cache with: {' '.join(packages)}")
+    fetch = f"apk update && apk cache download --add-dependencies {' '.join(packages)}"
+    cache_lines = []
+    result = ssh_stream(
+        proxmox_host, ssh_user,
+        apk_cache_command(container_id, f"pct exec {container_id} -- sh -c '{fetch}' </dev/null"),
+        prefix=f"[ct {container_id}]",
+        echo=lambda line: not line.startswith("@"),
+        on_line=lambda line: cache_lines.append(line) if line.startswith("@") else None,
+        timeout=PROVISION_TIMEOUT
     )
+    report, used = parse_apk_cache_output("\n".join(cache_lines), apk_cache_max_mb * 1024 * 1024)
+    # Fetched packages are not installed: everything new counts as recently used
+    used = sorted(set(used) | set(report.misses) - set(report.evicted))
+    if report.cache_dir:
+        maintain_apk_cache(proxmox_host, ssh_user, report, used)
+    if result.returncode != 0:
+        reason = f"timed out after {PROVISION_TIMEOUT}s" if result.timed_out else f"exit {result.returncode}"
+        log_error(f"apk cache warmup failed ({reason})")
+        return False
+    return True
+
+
+# Golden templates are LXC templates named "<prefix>-<version>"
+GOLDEN_TEMPLATE_PREFIX = "selfhost-docker"
+
+# Storage types on which Proxmox can create linked clones of LXC templates
+LINKED_CLONE_STORAGE_TYPES = {"zfspool", "lvmthin", "rbd", "btrfs"}
+
+# Run inside the template container before converting it: host keys are
+# regenerated per clone by sshd on first start (and by the provisioning script)
+_TEMPLATE_CLEANUP = (
+    "rc-service docker stop >/dev/null 2>&1; "
+    "rm -f /etc/ssh/ssh_host_*; "
+    "rm -rf /var/cache/apk/* /tmp/*; "
+    "rm -f /root/.ash_history"
+)
 
+
+def golden_template_version(ostemplate: str, script: str) -> str:
+    """Version of a golden template: hash of the base template and provisioning script."""
+    return hashlib.sha256(f"{ostemplate}\n{script}".encode()).hexdigest()[:12]
+
+
+def find_golden_template(proxmox_host: str, ssh_user: str, name: str) -> Optional[str]:
+    """Find the VMID of an LXC template by name."""
+    result = ssh_run(proxmox_host, ssh_user, "pvesh get /cluster/resources --type vm --output-format json")
+    if result.returncode != 0:
+        return None
+    try:
+        resources = json.loads(result.stdout)
+    except json.JSONDecodeError:
+        return None
+    for res in resources:
+        if res.get("type") == "lxc" and res.get("template") == 1 and res.get("name") == name:
+            return str(res.get("vmid"))
+    return None
+
+
+def storage_supports_linked_clone(proxmox_host: str, ssh_user: str, storage: str) -> bool:
+    """Check whether a storage supports linked clones (ZFS, LVM-thin, RBD, btrfs)."""
+    result = ssh_run(proxmox_host, ssh_user, f"pvesm status --storage {storage}")
     if result.returncode != 0:
-        log_error(f"Failed to install Docker: {result.stderr}")
         return False
+    # Output: header line, then "<name> <type> <status> ..."
+    for line in result.stdout.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) > 1 and fields[0] == storage:
+            return fields[1] in LINKED_CLONE_STORAGE_TYPES
+    return False
 
-    log_info("Docker installed successfully")
-
-    # Setup SSH directory
-    setup_ssh_cmd = "mkdir -p /root/.ssh && chmod 700 /root/.ssh"
-    run_cmd(
-        [
-            "ssh", "-o", "StrictHostKeyChecking=no",
-            f"{ssh_user}@{proxmox_host}",
-            f"pct exec {container_id} -- sh -c '{setup_ssh_cmd}'"
-        ],
-        capture=True,
-        check=False
-    )
 
-    # Copy Proxmox host public key to container (ed25519 only)
-    copy_key_cmd = f"cat /root/.ssh/id_ed25519.pub | pct exec {container_id} -- sh -c 'cat >> /root/.ssh/authorized_keys && chmod 600 /root/.ssh/authorized_keys'"
-    run_cmd(
-        [
-            "ssh", "-o", "StrictHostKeyChecking=no",
-            f"{ssh_user}@{proxmox_host}",
-            copy_key_cmd
-        ],
-        capture=True,
-        check=False
-    )
+def build_golden_template(
+    proxmox_host: str,
+    ssh_user: str,
+    ostemplate: str,
+    rootfs_storage: str,
+    network_bridge: str,
+    install_compose: bool = True,
+    apk_cache_max_mb: int = 0
+) -> Optional[str]:
+    """
+    Build (or reuse) a versioned golden LXC template with Docker preinstalled.
+
+    A temporary container is created from the base ostemplate, provisioned
+    with the same script as install_docker, cleaned and converted into a
+    Proxmox template named "selfhost-docker-<version>".
+
+    Args:
+        proxmox_host: Proxmox host IP or hostname
+        ssh_user: SSH user for Proxmox host
+        ostemplate: Base template (e.g., 'local:vztmpl/alpine-3.22-default_20250617_amd64.tar.xz')
+        rootfs_storage: Storage for the template rootfs (clones live on the same storage)
+        network_bridge: Bridge used while provisioning (needs internet access)
+        install_compose: Whether to install Docker Compose
+        apk_cache_max_mb: Size limit of the host apk cache in MB (0 = no cache)
 
-    # Copy local machine's public key if available (ed25519 only)
+    Returns:
+        VMID of the golden template, or None on failure
+    """
+    packages = ["docker", "docker-cli", "openssh"]
+    if install_compose:
+        packages.append("docker-compose")
+    authorized_keys = []
     local_key_path = Path.home() / ".ssh" / "id_ed25519.pub"
     if local_key_path.exists():
-        local_key = local_key_path.read_text().strip()
-        add_key_cmd = f"pct exec {container_id} -- sh -c 'echo \"{local_key}\" >> /root/.ssh/authorized_keys'"
-        run_cmd(
-            [
-                "ssh", "-o", "StrictHostKeyChecking=no",
-                f"{ssh_user}@{proxmox_host}",
-                add_key_cmd
-            ],
-            capture=True,
-            check=False
+        authorized_keys.append(local_key_path.read_text().strip())
+    script = build_provision_script(packages, authorized_keys)
+
+    name = f"{GOLDEN_TEMPLATE_PREFIX}-{golden_template_version(ostemplate, script)}"
+    existing = find_golden_template(proxmox_host, ssh_user, name)
+    if existing:
+        log_info(f"Golden template '{name}' already exists (VMID {existing})")
+        return existing
+
+    result = ssh_run(proxmox_host, ssh_user, "pvesh get /cluster/nextid")
+    vmid = result.stdout.strip()
+    if result.returncode != 0 or not vmid.isdigit():
+        log_error(f"Could not allocate a VMID: {result.stderr.strip()}")
+        return None
+
+    log_info(f"Building golden template '{name}' (VMID {vmid}) from {ostemplate}...")
+    create_cmd = (
+        f"pct create {vmid} {ostemplate} --hostname {name} --unprivileged 1 "
+        f"--features nesting=1 --rootfs {rootfs_storage}:4 --cores 1 --memory 512 "
+        f"--net0 name=eth0,bridge={network_bridge},ip=dhcp --start 1"
+    )
+    result = ssh_run(proxmox_host, ssh_user, create_cmd)
+    if result.returncode != 0:
+        log_error(f"Failed to create template container: {result.stderr.strip()}")
+        return None
+
+    ok = (
+        wait_for_container(proxmox_host, ssh_user, vmid)
+        and provision_container(proxmox_host, ssh_user, vmid, script, apk_cache_max_mb) is not None
+    )
+    if ok:
+        ssh_run(proxmox_host, ssh_user, f"pct exec {vmid} -- sh -c '{_TEMPLATE_CLEANUP}'")
+        result = ssh_run(
+            proxmox_host, ssh_user,
+            f"pct shutdown {vmid} --timeout 60 || pct stop {vmid}; "
+            f"pct set {vmid} --description 'selfhost golden Docker template {name}' && "
+            f"pct template {vmid}"
         )
-        log_info("Local SSH key added to container")
+        ok = result.returncode == 0
+        if not ok:
+            log_error(f"Failed to convert container to template: {result.stderr.strip()}")
 
-    log_info("Docker installation and SSH setup completed")
-    return True
+    if not ok:
+        log_error(f"Golden template build failed, removing container {vmid}")
+        ssh_run(proxmox_host, ssh_user, f"pct stop {vmid} >/dev/null 2>&1; pct destroy {vmid} --purge")
+        return None
+
+    log_info(f"Golden template '{name}' ready (VMID {vmid})")
+    return vmid
 
 
 def main():
@@ -158,7 +615,9 @@ def main():
     if len(sys.argv) < 2:
         print("Usage:")
         print("  download_template <proxmox_host> <ssh_user> <storage> <template_name>")
-        print("  install_docker <proxmox_host> <ssh_user> <container_id> [install_compose]")
+        print("  install_docker <proxmox_host> <ssh_user> <container_id> [install_compose] [apk_cache_max_mb]")
+        print("  warm_apk_cache <proxmox_host> <ssh_user> <container_id> <apk_cache_max_mb> [install_compose]")
+        print("  build_template <proxmox_host> <ssh_user> <ostemplate> <rootfs_storage> <bridge> [install_compose]")
         sys.exit(1)
 
     command = sys.argv[1]
@@ -172,12 +631,35 @@ def main():
 
     elif command == "install_docker":
         if len(sys.argv) < 5:
-            print("Usage: install_docker <proxmox_host> <ssh_user> <container_id> [install_compose]")
+            print("Usage: install_docker <proxmox_host> <ssh_user> <container_id> [install_compose] [apk_cache_max_mb]")
             sys.exit(1)
         install_compose = sys.argv[5].lower() == "true" if len(sys.argv) > 5 else True
-        success = install_docker(sys.argv[2], sys.argv[3], sys.argv[4], install_compose)
+        apk_cache_max_mb = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+        success = install_docker(sys.argv[2], sys.argv[3], sys.argv[4], install_compose, apk_cache_max_mb)
+        sys.exit(0 if success else 1)
+
+    elif command == "warm_apk_cache":
+        if len(sys.argv) < 6:
+            print("Usage: warm_apk_cache <proxmox_host> <ssh_user> <container_id> <apk_cache_max_mb> [install_compose]")
+            sys.exit(1)
+        packages = ["docker", "docker-cli", "openssh"]
+        if len(sys.argv) <= 6 or sys.argv[6].lower() == "true":
+            packages.append("docker-compose")
+        success = warm_apk_cache(sys.argv[2], sys.argv[3], sys.argv[4], packages, int(sys.argv[5]))
         sys.exit(0 if success else 1)
 
+    elif command == "build_template":
+        if len(sys.argv) < 7:
+            print("Usage: build_template <proxmox_host> <ssh_user> <ostemplate> <rootfs_storage> <bridge> [install_compose]")
+            sys.exit(1)
+        install_compose = sys.argv[7].lower() == "true" if len(sys.argv) > 7 else True
+        vmid = build_golden_template(
+            sys.argv[2], sys.argv[3], sys.argv[4], sys.argv[5], sys.argv[6], install_compose
+        )
+        if vmid:
+            print(vmid)
+        sys.exit(0 if vmid else 1)
+
     else:
         print(f"Unknown command: {command}")
         sys.exit(1)
@@ -0,0 +1,139 @@
+"""Encrypted on-disk cache of Infisical secrets.
+
+Entries are encrypted with AES-256-GCM (cryptography) under keys derived
+from the machine identity client secret with HKDF, so the cache is useless
+without the credentials that produced it. Entry names are keyed hashes, so
+not even project or environment ids are stored in clear.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from secrets import token_bytes
+from typing import Optional
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from scripts.fileio import read_json, write_json
+
+_NONCE_SIZE = 12
+
+
+def _derive(secret: str, purpose: str) -> bytes:
+    return HKDF(
+        algorithm=hashes.SHA256(), length=32, salt=None, info=f"selfhost/secret-cache/{purpose}".encode()
+    ).derive(secret.encode())
+
+
+@dataclass
+class CachedSecrets:
+    """Secrets of one (project, environment, path) as last fetched."""
+    secrets: dict[str, str]
+    fetched_at: float
+    etag: Optional[str] = None
+    versions: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class SecretCache:
+    """
+    Encrypted file cache with per-entry TTL and a stale-while-revalidate window.
+
+    Entries younger than ttl are fresh; entries up to ttl + stale_ttl old may
+    still be served while a refresh runs; older entries are ignored.
+    """
+
+    def __init__(self, path: Path, key_material: str, ttl: float = 300, stale_ttl: float = 3600):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._aead = AESGCM(_derive(key_material, "enc"))
+        self._id_key = _derive(key_material, "id")
+        self._lock = threading.Lock()
+
+    def _entry_id(self, project_id: str, env_slug: str, secret_path: str) -> str:
+        return hmac.new(
+            self._id_key, f"{project_id}\0{env_slug}\0{secret_path}".encode(), hashlib.sha256
+        ).hexdigest()
+
+    def _encrypt(self, plaintext: bytes, entry_id: str) -> str:
+        nonce = token_bytes(_NONCE_SIZE)
+        # The entry id is authenticated too: a blob can't be moved to another entry
+        return base64.b64encode(nonce + self._aead.encrypt(nonce, plaintext, entry_id.encode())).decode()
+
+    def _decrypt(self, blob: str, entry_id: str) -> Optional[bytes]:
+        try:
+            raw = base64.b64decode(blob)
+        except ValueError:
+            return None
+        try:
+            return self._aead.decrypt(raw[:_NONCE_SIZE], raw[_NONCE_SIZE:], entry_id.encode())
+        except (InvalidTag, ValueError):
+            # Wrong key (rotated client secret), tampering or an old cache format: a miss
+            return None
+
+    def _load(self) -> dict:
+        return read_json(self.path)
+
+    def _save(self, entries: dict) -> None:
+        write_json(self.path, entries, indent=None)
+
+    def get(self, project_id: str, env_slug: str, secret_path: str = "/") -> Optional[CachedSecrets]:
+        """Get an entry that is still usable (fresh or within the stale window)."""
+        entry_id = self._entry_id(project_id, env_slug, secret_path)
+        entry = self._load().get(entry_id)
+        if not entry:
+            return None
+        plaintext = self._decrypt(entry.get("data", ""), entry_id)
+        if plaintext is None:
+            return None
+        cached = CachedSecrets(**json.loads(plaintext))
+        if cached.age > self.ttl + self.stale_ttl:
+            return None
+        return cached
+
+    def is_fresh(self, cached: CachedSecrets) -> bool:
+        return cached.age <= self.ttl
+
+    def put(
+        self,
+        project_id: str,
+        env_slug: str,
+        secret_path: str,
+        values: dict[str, str],
+        etag: Optional[str] = None,
+        versions: Optional[dict[str, int]] = None
+    ) -> None:
+        """Store (or refresh) an entry."""
+        cached = CachedSecrets(values, time.time(), etag, versions or {})
+        entry_id = self._entry_id(project_id, env_slug, secret_path)
+        with self._lock:
+            entries = self._load()
+            entries[entry_id] = {"data": self._encrypt(json.dumps(cached.__dict__).encode(), entry_id)}
+            self._save(entries)
+
+    def touch(self, project_id: str, env_slug: str, secret_path: str, cached: CachedSecrets) -> None:
+        """Mark an entry as fresh again (the server confirmed it is unchanged)."""
+        self.put(project_id, env_slug, secret_path, cached.secrets, cached.etag, cached.versions)
+
+    def invalidate(self, project_id: str, env_slug: str, secret_path: str = "/") -> None:
+        """Drop an entry (after a write, or when its contents are known to be wrong)."""
+        with self._lock:
+            entries = self._load()
+            if entries.pop(self._entry_id(project_id, env_slug, secret_path), None) is not None:
+                self._save(entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.path.unlink(missing_ok=True)
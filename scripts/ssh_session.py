@@ -0,0 +1,302 @@
+"""Shared, multiplexed SSH sessions for remote commands.
+
+Every remote call in the scripts goes through a single SSH master connection
+per (user, host) using OpenSSH ControlMaster sockets. The first call to a host
+pays the TCP + key exchange handshake; every later call (including calls made
+by child processes such as Terraform local-exec provisioners, which inherit
+the control directory through the environment) reuses that connection.
+"""
+
+import atexit
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+from scripts.streaming import StreamResult, stream_cmd
+
+# Environment variable used to share the control directory with child processes
+CONTROL_DIR_ENV = "SELFHOST_SSH_CONTROL_DIR"
+
+# Safety net: masters exit on their own if the owning process dies without cleanup
+CONTROL_PERSIST = "15m"
+
+
+class SSHSessionManager:
+    """Keeps one persistent, multiplexed SSH master connection per (user, host)."""
+
+    def __init__(self, connect_timeout: int = 10):
+        self.connect_timeout = connect_timeout
+        self.handshakes = 0
+        self.commands = 0
+        self._lock = threading.Lock()
+        # One lock per (user, host): handshakes to different hosts run in parallel
+        self._host_locks: dict[tuple[str, str], threading.Lock] = {}
+        # Masters checked alive by this process (a socket on disk may be stale)
+        self._verified: set[tuple[str, str]] = set()
+
+        inherited = os.getenv(CONTROL_DIR_ENV)
+        if inherited and Path(inherited).is_dir():
+            self.control_dir = Path(inherited)
+            self._owner = False
+        else:
+            # Keep the path short: unix socket paths are limited to ~104 chars
+            self.control_dir = Path(tempfile.mkdtemp(prefix="selfhost-ssh-"))
+            os.environ[CONTROL_DIR_ENV] = str(self.control_dir)
+            self._owner = True
+            atexit.register(self.close_all)
+
+    @property
+    def handshakes_saved(self) -> int:
+        """Number of remote commands that reused an existing master connection."""
+        return max(self.commands - self.handshakes, 0)
+
+    def control_path(self, user: str, host: str) -> Path:
+        """Get the ControlPath socket for a (user, host) pair."""
+        return self.control_dir / f"{user}@{host}"
+
+    def _base_opts(self, user: str, host: str, connect_timeout: Optional[int]) -> list[str]:
+        timeout = connect_timeout if connect_timeout is not None else self.connect_timeout
+        return [
+            "-o", "StrictHostKeyChecking=no",
+            "-o", "BatchMode=yes",
+            "-o", f"ConnectTimeout={timeout}",
+            "-o", f"ControlPath={self.control_path(user, host)}",
+        ]
+
+    def is_connected(self, user: str, host: str) -> bool:
+        """Check whether a master connection is alive for (user, host)."""
+        if not self.control_path(user, host).exists():
+            return False
+        result = subprocess.run(
+            ["ssh", "-o", f"ControlPath={self.control_path(user, host)}",
+             "-O", "check", f"{user}@{host}"],
+            capture_output=True, text=True, check=False
+        )
+        return result.returncode == 0
+
+    def _host_lock(self, user: str, host: str) -> threading.Lock:
+        with self._lock:
+            return self._host_locks.setdefault((user, host), threading.Lock())
+
+    def connect(
+        self,
+        user: str,
+        host: str,
+        connect_timeout: Optional[int] = None
+    ) -> subprocess.CompletedProcess:
+        """
+        Ensure a live master connection exists, starting one if needed.
+
+        A control socket left by a killed master, or by a master to a host
+        that has been replaced since, is removed and the handshake redone.
+        """
+        with self._host_lock(user, host):
+            control_path = self.control_path(user, host)
+            if (user, host) in self._verified and control_path.exists():
+                return subprocess.CompletedProcess([], 0, "", "")
+            if self.is_connected(user, host):
+                self._verified.add((user, host))
+                return subprocess.CompletedProcess([], 0, "", "")
+            # Stale master: its socket and the forwards it carried are dead
+            control_path.unlink(missing_ok=True)
+            for forward in self.control_dir.glob(f"fwd-*-{user}@{host}"):
+                forward.unlink(missing_ok=True)
+
+            cmd = [
+                "ssh", "-M", "-N", "-f",
+                *self._base_opts(user, host, connect_timeout),
+                "-o", f"ControlPersist={CONTROL_PERSIST}",
+                f"{user}@{host}",
+            ]
+            # -f backgrounds the master after authentication; detach its stdio so
+            # captured callers never wait on a pipe held open by the master.
+            result = subprocess.run(
+                cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+                check=False
+            )
+            if result.returncode == 0:
+                with self._lock:
+                    self.handshakes += 1
+                self._verified.add((user, host))
+            return result
+
+    def _check_result(self, user: str, host: str, returncode: int) -> None:
+        """After ssh exits 255 (connection error), check the master again before the next use."""
+        if returncode == 255:
+            with self._lock:
+                self._verified.discard((user, host))
+
+    def ssh_cmd(self, user: str, host: str, connect_timeout: Optional[int] = None) -> list[str]:
+        """Build an ssh argv prefix that runs over the shared master connection."""
+        return [
+            "ssh",
+            *self._base_opts(user, host, connect_timeout),
+            "-o", "ControlMaster=no",
+            f"{user}@{host}",
+        ]
+
+    def run(
+        self,
+        user: str,
+        host: str,
+        command: str,
+        capture: bool = True,
+        check: bool = False,
+        connect_timeout: Optional[int] = None,
+        stdin_data: Optional[str] = None
+    ) -> subprocess.CompletedProcess:
+        """Run a remote command over the shared connection for (user, host).
+
+        stdin_data, if given, is streamed to the remote command's stdin.
+        """
+        cmd = self.ssh_cmd(user, host, connect_timeout) + [command]
+
+        master = self.connect(user, host, connect_timeout)
+        if master.returncode != 0:
+            # The command would fail the same way; don't pay the handshake twice
+            if check:
+                raise subprocess.CalledProcessError(master.returncode, cmd, "", master.stderr)
+            return subprocess.CompletedProcess(cmd, master.returncode, "", master.stderr)
+
+        with self._lock:
+            self.commands += 1
+        try:
+            result = subprocess.run(
+                cmd,
+                capture_output=capture,
+                text=True,
+                check=check,
+                input=stdin_data,
+                stdin=subprocess.DEVNULL if stdin_data is None else None
+            )
+        except subprocess.CalledProcessError as e:
+            self._check_result(user, host, e.returncode)
+            raise
+        self._check_result(user, host, result.returncode)
+        return result
+
+    def stream(
+        self,
+        user: str,
+        host: str,
+        command: str,
+        connect_timeout: Optional[int] = None,
+        **kwargs
+    ) -> StreamResult:
+        """Run a remote command over the shared connection with live output.
+
+        Keyword arguments (prefix, on_line, timeout, stdin_data, ...) are passed
+        to stream_cmd.
+        """
+        cmd = self.ssh_cmd(user, host, connect_timeout) + [command]
+
+        master = self.connect(user, host, connect_timeout)
+        if master.returncode != 0:
+            return StreamResult(cmd, master.returncode, master.stderr.strip().splitlines())
+
+        with self._lock:
+            self.commands += 1
+        kwargs.setdefault("prefix", f"[{host}]")
+        result = stream_cmd(cmd, **kwargs)
+        self._check_result(user, host, result.returncode)
+        return result
+
+    def forward_unix_socket(
+        self,
+        user: str,
+        host: str,
+        remote_path: str,
+        connect_timeout: Optional[int] = None
+    ) -> Optional[Path]:
+        """
+        Forward a remote Unix socket to a local one over the master connection.
+
+        The forward lives as long as the master connection. Returns the local
+        socket path, or None if the forward could not be set up.
+        """
+        master = self.connect(user, host, connect_timeout)
+        if master.returncode != 0:
+            return None
+
+        digest = hashlib.sha1(remote_path.encode()).hexdigest()[:8]
+        local = self.control_dir / f"fwd-{digest}-{user}@{host}"
+        with self._host_lock(user, host):
+            if local.exists():
+                return local
+            result = subprocess.run(
+                ["ssh", "-o", f"ControlPath={self.control_path(user, host)}",
+                 "-O", "forward", "-L", f"{local}:{remote_path}", f"{user}@{host}"],
+                capture_output=True, text=True, check=False
+            )
+        return local if result.returncode == 0 else None
+
+    def close(self, user: str, host: str) -> None:
+        """Tear down the master connection for (user, host)."""
+        path = self.control_path(user, host)
+        if not path.exists():
+            return
+        subprocess.run(
+            ["ssh", "-o", f"ControlPath={path}", "-O", "exit", f"{user}@{host}"],
+            capture_output=True, text=True, check=False
+        )
+
+    def close_all(self) -> None:
+        """Tear down every master connection (including ones started by children)."""
+        if not self.control_dir.exists():
+            return
+        for path in self.control_dir.iterdir():
+            user, _, host = path.name.partition("@")
+            if host and not user.startswith("fwd-"):
+                self.close(user, host)
+        if self._owner:
+            shutil.rmtree(self.control_dir, ignore_errors=True)
+            if os.environ.get(CONTROL_DIR_ENV) == str(self.control_dir):
+                del os.environ[CONTROL_DIR_ENV]
+
+
+_session: Optional[SSHSessionManager] = None
+
+
+def get_ssh_session() -> SSHSessionManager:
+    """Get the process-wide SSH session manager."""
+    global _session  # pylint: disable=global-statement
+    if _session is None:
+        _session = SSHSessionManager()
+    return _session
+
+
+def ssh_run(
+    host: str,
+    user: str,
+    command: str,
+    capture: bool = True,
+    check: bool = False,
+    connect_timeout: Optional[int] = None,
+    stdin_data: Optional[str] = None
+) -> subprocess.CompletedProcess:
+    """Run a remote command over the shared SSH session for (user, host)."""
+    return get_ssh_session().run(
+        user, host, command,
+        capture=capture, check=check, connect_timeout=connect_timeout,
+        stdin_data=stdin_data
+    )
+
+
+def ssh_stream(
+    host: str,
+    user: str,
+    command: str,
+    connect_timeout: Optional[int] = None,
+    **kwargs
+) -> StreamResult:
+    """Run a remote command over the shared SSH session with live, prefixed output."""
+    return get_ssh_session().stream(user, host, command, connect_timeout=connect_timeout, **kwargs)
@@ -0,0 +1,277 @@
+"""Local stand-ins for the HTTP APIs the scripts talk to, for offline benchmarks and tests.
+
+Each stand-in implements only the endpoints the corresponding client uses,
+keeps its state in memory, counts requests and can add a fixed latency per
+request to simulate a remote server:
+
+- InfisicalStandIn: status, admin bootstrap/login, universal-auth login and
+  the raw secrets endpoints (list with ETag, create, update)
+- ProxmoxStandIn: version, API token list/lookup/create/delete and LXC status
+- DockerStandIn: the Engine API calls of DockerClient.cleanup, on a Unix socket
+"""
+
+import hashlib
+import json
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Optional, Union
+from urllib.parse import parse_qs, unquote, urlparse
+
+# (status or (status, reason), JSON body or None, extra headers)
+Response = tuple[Union[int, tuple[int, str]], Any, dict]
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class StandInServer:
+    """Threaded HTTP server on 127.0.0.1 (or a Unix socket) that dispatches to handle()."""
+
+    def __init__(self, port: int = 0, latency: float = 0.0, unix_socket: Optional[Path] = None):
+        self.latency = latency
+        self.unix_socket = unix_socket
+        self.requests = 0
+        self._lock = threading.Lock()
+        if unix_socket:
+            unix_socket.unlink(missing_ok=True)
+            self._server = _UnixHTTPServer(str(unix_socket), self._handler())
+        else:
+            self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+            self._server.daemon_threads = True
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self.unix_socket:
+            self.unix_socket.unlink(missing_ok=True)
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def handle(self, method: str, path: str, query: dict, headers, body: dict) -> Response:
+        raise NotImplementedError
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real servers
+            # Headers and body are separate writes: without this, Nagle + delayed ACK adds ~40ms
+            disable_nagle_algorithm = standin.unix_socket is None
+
+            def log_message(self, format, *args):
+                pass
+
+            def address_string(self) -> str:
+                return "local"  # Unix sockets have no peer address
+
+            def _dispatch(self) -> None:
+                standin.count_request()
+                if standin.latency:
+                    time.sleep(standin.latency)
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                raw_body = self.rfile.read(length) if length else b""
+                try:
+                    body = json.loads(raw_body) if raw_body else {}
+                except ValueError:
+                    body = {}  # form-encoded (e.g. Proxmox POSTs)
+                status, payload, headers = standin.handle(self.command, url.path, query, self.headers, body)
+                raw = json.dumps(payload).encode() if payload is not None else b""
+                status, reason = status if isinstance(status, tuple) else (status, None)
+                self.send_response(status, reason)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(raw)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+        return Handler
+
+
+class InfisicalStandIn(StandInServer):
+    """In-memory Infisical API (port 0 picks a free port)."""
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.0,
+        client_id: str = "standin-client",
+        client_secret: str = "standin-secret"
+    ):
+        super().__init__(port, latency)
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.access_token = hashlib.sha256(f"{client_id}:{client_secret}".encode()).hexdigest()
+        # Admin (email, password) once /api/v1/admin/bootstrap was called
+        self.admin: Optional[tuple[str, str]] = None
+        self.org_id = "standin-org"
+        self.admin_token = hashlib.sha256(b"standin-admin").hexdigest()
+        # (project, environment, path) -> {name: (value, version)}
+        self.secrets: dict[tuple[str, str, str], dict[str, tuple[str, int]]] = {}
+
+    def seed(self, project_id: str, env_slug: str, values: dict[str, str], secret_path: str = "/") -> None:
+        with self._lock:
+            folder = self.secrets.setdefault((project_id, env_slug, secret_path), {})
+            for name, value in values.items():
+                folder[name] = (value, folder.get(name, ("", 0))[1] + 1)
+
+    @staticmethod
+    def _etag(folder: dict[str, tuple[str, int]]) -> str:
+        versions = ",".join(f"{name}:{version}" for name, (_, version) in sorted(folder.items()))
+        return f'"{hashlib.sha256(versions.encode()).hexdigest()[:16]}"'
+
+    def handle(self, method: str, path: str, query: dict, headers, body: dict) -> Response:
+        if path == "/api/status":
+            return 200, {"message": "Ok"}, {}
+        if path == "/api/v1/admin/bootstrap" and method == "POST":
+            return self._bootstrap(body)
+        if path == "/api/v1/auth/login" and method == "POST":
+            if self.admin != (body.get("email"), body.get("password")):
+                return 400, {"message": "Invalid credentials"}, {}
+            return 200, {"token": self.admin_token}, {}
+        if path == "/api/v1/organization" and method == "GET":
+            if headers.get("Authorization") != f"Bearer {self.admin_token}":
+                return 401, {"message": "Invalid token"}, {}
+            return 200, {"organizations": [{"id": self.org_id}]}, {}
+        if path == "/api/v1/auth/universal-auth/login" and method == "POST":
+            if (body.get("clientId"), body.get("clientSecret")) != (self.client_id, self.client_secret):
+                return 401, {"message": "Invalid credentials"}, {}
+            return 200, {"accessToken": self.access_token, "expiresIn": 7200}, {}
+
+        prefix = "/api/v3/secrets/raw"
+        if not path.startswith(prefix):
+            return 404, {"message": "Not found"}, {}
+        if headers.get("Authorization") != f"Bearer {self.access_token}":
+            return 401, {"message": "Invalid token"}, {}
+        if path == prefix and method == "GET":
+            return self._list(query, headers)
+        if path.startswith(f"{prefix}/") and method in ("POST", "PATCH"):
+            return self._write(unquote(path[len(prefix) + 1:]), body, create=method == "POST")
+        return 404, {"message": "Not found"}, {}
+
+    def _bootstrap(self, body: dict) -> Response:
+        with self._lock:
+            if self.admin is not None:
+                return 400, {"message": "Instance has already been set up"}, {}
+            self.admin = (body.get("email"), body.get("password"))
+        return 200, {
+            "identity": {"credentials": {"token": self.admin_token}},
+            "organization": {"id": self.org_id},
+        }, {}
+
+    def _list(self, query: dict, headers) -> Response:
+        key = (query.get("workspaceId", ""), query.get("environment", ""), query.get("secretPath", "/"))
+        with self._lock:
+            folder = dict(self.secrets.get(key, {}))
+        etag = self._etag(folder)
+        if headers.get("If-None-Match") == etag:
+            return 304, None, {"ETag": etag}
+        items = [
+            {"secretKey": name, "secretValue": value, "version": version}
+            for name, (value, version) in sorted(folder.items())
+        ]
+        return 200, {"secrets": items}, {"ETag": etag}
+
+    def _write(self, name: str, body: dict, create: bool) -> Response:
+        key = (body.get("workspaceId", ""), body.get("environment", ""), body.get("secretPath", "/"))
+        with self._lock:
+            folder = self.secrets.setdefault(key, {})
+            # Infisical answers 400 for both "already exists" and "not found"
+            if create == (name in folder):
+                return 400, {"message": "Secret already exists" if create else "Secret not found"}, {}
+            version = folder.get(name, ("", 0))[1] + 1
+            folder[name] = (body.get("secretValue", ""), version)
+        return 200, {"secret": {"secretKey": name, "version": version}}, {}
+
+
+class ProxmoxStandIn(StandInServer):
+    """Proxmox VE API that knows the tokens it was given or created; every LXC asked about is running."""
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.0,
+        token_id: str = "root@pam!terraform",
+        token_secret: str = "standin-token-secret"
+    ):
+        super().__init__(port, latency)
+        self.token_id = token_id
+        self.token_secret = token_secret
+        self.tokens = {token_id: token_secret}
+
+    @property
+    def api_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api2/json"
+
+    def handle(self, method: str, path: str, query: dict, headers, body: dict) -> Response:
+        token_id, _, secret = headers.get("Authorization", "").removeprefix("PVEAPIToken=").partition("=")
+        with self._lock:
+            if not secret or self.tokens.get(token_id) != secret:
+                return 401, {"data": None}, {}
+        if path == "/api2/json/version":
+            return 200, {"data": {"version": "8.2.4", "release": "8.2"}}, {}
+        if path.startswith("/api2/json/nodes/") and path.endswith("/status/current") and "/lxc/" in path:
+            return 200, {"data": {"status": "running"}}, {}
+        parts = unquote(path).split("/")
+        if parts[:5] == ["", "api2", "json", "access", "users"] and len(parts) == 7 and parts[6] == "token":
+            with self._lock:
+                names = [t.partition("!")[2] for t in self.tokens if t.partition("!")[0] == parts[5]]
+            return 200, {"data": [{"tokenid": name, "privsep": 0, "expire": 0} for name in names]}, {}
+        if parts[:5] == ["", "api2", "json", "access", "users"] and len(parts) == 8 and parts[6] == "token":
+            return self._token(method, parts[5], parts[7])
+        return 404, {"data": None}, {}
+
+    def _token(self, method: str, user: str, name: str) -> Response:
+        full_id = f"{user}!{name}"
+        with self._lock:
+            exists = full_id in self.tokens
+            if method == "POST":
+                if exists:
+                    return (400, f"Token already exists: {full_id}"), {"data": None}, {}
+                self.tokens[full_id] = hashlib.sha256(f"{full_id}{time.time()}".encode()).hexdigest()[:36]
+                return 200, {"data": {"full-tokenid": full_id, "value": self.tokens[full_id]}}, {}
+            if not exists:
+                # Like Proxmox: 500 with the reason in the status line
+                return (500, f"no such token '{name}' for user '{user}'"), {"data": None}, {}
+            if method == "DELETE":
+                del self.tokens[full_id]
+                return 200, {"data": None}, {}
+        return 200, {"data": {"privsep": 0, "expire": 0}}, {}
+
+
+class DockerStandIn(StandInServer):
+    """Docker Engine API on a Unix socket, with no containers, networks or volumes."""
+
+    def __init__(self, unix_socket: Path, latency: float = 0.0):
+        super().__init__(latency=latency, unix_socket=unix_socket)
+        os.chmod(unix_socket, 0o600)
+
+    def handle(self, method: str, path: str, query: dict, headers, body: dict) -> Response:
+        if path == "/_ping":
+            return 200, None, {}
+        if path == "/containers/json":
+            return 200, [], {}
+        return 404, {"message": "No such object"}, {}
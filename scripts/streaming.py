@@ -0,0 +1,186 @@
+"""Streaming subprocess runner: live output, bounded capture, timeouts."""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional, Union
+
+# Dim prefix so streamed tool output stands apart from our own log lines
+_PREFIX_COLOR = '\033[2m'
+_NC = '\033[0m'
+
+
+@dataclass
+class StreamResult:
+    """Outcome of a streamed command (only the last lines of output are kept)."""
+    cmd: list[str]
+    returncode: int
+    tail: list[str] = field(default_factory=list)
+    timed_out: bool = False
+    duration: float = 0.0
+
+    @property
+    def output(self) -> str:
+        return "\n".join(self.tail)
+
+    def check(self) -> "StreamResult":
+        """Raise CalledProcessError (with the output tail) if the command failed."""
+        if self.returncode != 0:
+            raise subprocess.CalledProcessError(self.returncode, self.cmd, self.output)
+        return self
+
+
+class CommandStream:
+    """
+    Run a command and yield its output lines as they arrive.
+
+    stderr is merged into stdout. Every line is echoed to our stderr with a
+    prefix (echo may be a predicate to echo only some lines), passed to on_line,
+    and kept in a ring buffer of the last tail_lines lines.
+
+    Once timeout seconds have passed the process gets SIGTERM, and SIGKILL only
+    if it is still running kill_grace seconds later. On Ctrl+C the command gets
+    SIGINT and is waited for, so tools like terraform can release state locks
+    and flush state before exiting; a second Ctrl+C kills it.
+    """
+
+    def __init__(
+        self,
+        cmd: list[str],
+        cwd: Optional[str] = None,
+        prefix: Optional[str] = None,
+        echo: Union[bool, Callable[[str], bool]] = True,
+        on_line: Optional[Callable[[str], None]] = None,
+        tail_lines: int = 200,
+        timeout: Optional[float] = None,
+        stdin_data: Optional[str] = None,
+        kill_grace: float = 30.0
+    ):
+        self.cmd = cmd
+        self.cwd = cwd
+        self.prefix = prefix if prefix is not None else f"[{cmd[0]}]"
+        self.echo = echo
+        self.on_line = on_line
+        self.timeout = timeout
+        self.stdin_data = stdin_data
+        self.kill_grace = kill_grace
+        self.tail: deque[str] = deque(maxlen=tail_lines)
+        self.result: Optional[StreamResult] = None
+        self._timed_out = False
+        self._grace_timer: Optional[threading.Timer] = None
+
+    def _signal(self, proc: subprocess.Popen, sig: int) -> None:
+        # With a timeout the command runs in its own process group, so children
+        # that inherited stdout (e.g. `sh -c` pipelines) get the signal as well
+        try:
+            if self.timeout:
+                os.killpg(proc.pid, sig)
+            else:
+                proc.send_signal(sig)
+        except ProcessLookupError:
+            pass
+
+    def _kill(self, proc: subprocess.Popen) -> None:
+        if proc.poll() is None:
+            self._signal(proc, signal.SIGKILL)
+
+    def _expire(self, proc: subprocess.Popen) -> None:
+        self._timed_out = True
+        self._signal(proc, signal.SIGTERM)
+        self._grace_timer = threading.Timer(self.kill_grace, self._kill, [proc])
+        self._grace_timer.daemon = True
+        self._grace_timer.start()
+
+    def _interrupt(self, proc: subprocess.Popen) -> None:
+        """Forward Ctrl+C and wait for the command to wind down, still echoing its output."""
+        # In its own session the command never saw the terminal's SIGINT
+        if self.timeout:
+            self._signal(proc, signal.SIGINT)
+        try:
+            # Keep reading: closing the pipe now would kill it with SIGPIPE
+            for raw in proc.stdout:
+                line = raw.rstrip("\n")
+                self.tail.append(line)
+                print(f"{_PREFIX_COLOR}{self.prefix}{_NC} {line}", file=sys.stderr, flush=True)
+            proc.wait()
+        except KeyboardInterrupt:
+            self._kill(proc)
+            raise
+
+    def _feed_stdin(self, proc: subprocess.Popen) -> None:
+        try:
+            proc.stdin.write(self.stdin_data)
+            proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    def __iter__(self) -> Iterator[str]:
+        start = time.monotonic()
+        proc = subprocess.Popen(
+            self.cmd,
+            cwd=self.cwd,
+            stdin=subprocess.PIPE if self.stdin_data is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            errors="replace",
+            start_new_session=bool(self.timeout)
+        )
+        timer = threading.Timer(self.timeout, self._expire, [proc]) if self.timeout else None
+        if timer:
+            timer.daemon = True
+            timer.start()
+        if self.stdin_data is not None:
+            threading.Thread(target=self._feed_stdin, args=(proc,), daemon=True).start()
+
+        drained = interrupted = False
+        try:
+            for raw in proc.stdout:
+                line = raw.rstrip("\n")
+                self.tail.append(line)
+                if self.echo is True or (callable(self.echo) and self.echo(line)):
+                    print(f"{_PREFIX_COLOR}{self.prefix}{_NC} {line}", file=sys.stderr, flush=True)
+                if self.on_line:
+                    self.on_line(line)
+                yield line
+            drained = True
+        except KeyboardInterrupt:
+            interrupted = True
+            raise
+        finally:
+            try:
+                if interrupted and proc.poll() is None:
+                    self._interrupt(proc)
+                # Consumer stopped early (break/exception): don't leave the child running
+                elif not drained:
+                    self._kill(proc)
+            finally:
+                proc.stdout.close()
+                returncode = proc.wait()
+                if timer:
+                    timer.cancel()
+                if self._grace_timer:
+                    self._grace_timer.cancel()
+            self.result = StreamResult(
+                self.cmd, returncode, list(self.tail), self._timed_out, time.monotonic() - start
+            )
+
+    def run(self) -> StreamResult:
+        """Consume the whole stream and return the result."""
+        for _ in self:
+            pass
+        return self.result
+
+
+def stream_cmd(cmd: list[str], check: bool = False, **kwargs) -> StreamResult:
+    """Run a command with live, prefixed output and a bounded tail (see CommandStream)."""
+    result = CommandStream(cmd, **kwargs).run()
+    if result.timed_out:
+        result.tail.append(f"Timed out after {kwargs.get('timeout')}s")
+    return result.check() if check else result
@@ -0,0 +1,98 @@
+"""Teardown plans: named stages with dependencies, run sequentially or concurrently."""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from scripts.utils import log_info, log_warn, log_step
+from scripts.tracing import Span, get_tracer
+
+
+@dataclass
+class Stage:
+    """One teardown step; it starts once every stage in `after` has finished."""
+    name: str
+    action: Callable[[], bool]
+    after: tuple[str, ...] = ()
+    # Set when a later stage makes this one redundant (the stage is not run)
+    skip_reason: Optional[str] = None
+
+
+@dataclass
+class StageResult:
+    """Outcome of one stage."""
+    name: str
+    status: str  # ok | failed | skipped
+    seconds: float = 0.0
+    detail: str = ""
+
+
+@dataclass
+class TeardownReport:
+    """Outcome of a whole plan."""
+    results: list[StageResult] = field(default_factory=list)
+    wall_time: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(r.status != "failed" for r in self.results)
+
+    def log(self) -> None:
+        log_step(f"Teardown: {self.wall_time:.1f}s wall time")
+        for r in self.results:
+            log = log_warn if r.status == "failed" else log_info
+            suffix = f" ({r.detail})" if r.detail else ""
+            log(f"  {r.name:<22} {r.status:<8} {r.seconds:6.2f}s{suffix}")
+
+
+def _run_stage(stage: Stage, parent: Optional[Span]) -> StageResult:
+    start = time.monotonic()
+    with get_tracer().span(f"teardown:{stage.name}", parent=parent) as span:
+        try:
+            ok = stage.action()
+            detail = ""
+        except Exception as e:  # a failed stage must not abort the others
+            ok, detail = False, f"{type(e).__name__}: {e}"
+        if not ok:
+            span.status = "failed"
+    return StageResult(stage.name, "ok" if ok else "failed", time.monotonic() - start, detail)
+
+
+def run_plan(stages: list[Stage], concurrent: bool = True) -> TeardownReport:
+    """
+    Run stages respecting their dependencies.
+
+    With concurrent=True every stage whose dependencies are done is started
+    right away on a thread pool; otherwise stages run one at a time in list
+    order. A failed dependency does not block dependents: teardown is best
+    effort, as in the sequential destroy.
+    """
+    start = time.monotonic()
+    parent = get_tracer().current()
+    results: dict[str, StageResult] = {}
+    for stage in stages:
+        if stage.skip_reason:
+            results[stage.name] = StageResult(stage.name, "skipped", detail=stage.skip_reason)
+
+    pending = [s for s in stages if s.name not in results]
+    workers = max(len(pending), 1) if concurrent else 1
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="teardown") as pool:
+        running: dict[Future, Stage] = {}
+        while pending or running:
+            for stage in list(pending):
+                if all(dep in results for dep in stage.after):
+                    pending.remove(stage)
+                    running[pool.submit(_run_stage, stage, parent)] = stage
+                    if not concurrent:
+                        break
+            if not running:
+                # Unknown dependency names: run what is left in order
+                stage = pending.pop(0)
+                running[pool.submit(_run_stage, stage, parent)] = stage
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                results[stage.name] = future.result()
+
+    return TeardownReport([results[s.name] for s in stages], time.monotonic() - start)
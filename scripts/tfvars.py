@@ -0,0 +1,342 @@
+"""Parsed, cached terraform.tfvars documents with atomic batched writes.
+
+The document keeps the original text so comments and formatting survive
+updates; only the value expression of a changed key is rewritten.
+"""
+
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from scripts.fileio import write_atomic
+
+_KEY_RE = re.compile(r'[ \t]*([A-Za-z_][A-Za-z0-9_-]*)[ \t]*=(?!=)[ \t]*')
+_HEREDOC_RE = re.compile(r'<<-?([A-Za-z_][A-Za-z0-9_]*)[ \t]*\n')
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '"': '"', '\\': '\\'}
+
+
+@dataclass
+class _Entry:
+    """Location of a top-level `key = value` assignment in the document text."""
+    key: str
+    value_start: int
+    value_end: int
+
+
+def _skip_string(text: str, i: int) -> int:
+    """Return the index just past the quoted string starting at text[i]."""
+    i += 1
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c in '$%' and text.startswith('{', i + 1):
+            # Template interpolation: skip to the matching close brace
+            depth = 0
+            i += 1
+            while i < n:
+                if text[i] == '{':
+                    depth += 1
+                elif text[i] == '}':
+                    depth -= 1
+                    if depth == 0:
+                        break
+                elif text[i] == '"':
+                    i = _skip_string(text, i) - 1
+                i += 1
+        elif c == '"':
+            return i + 1
+        elif c == '\n':
+            return i
+        i += 1
+    return n
+
+
+def _strip_comments(text: str) -> str:
+    """Remove comments that are outside string literals."""
+    out = []
+    i = 0
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == '"':
+            end = _skip_string(text, i)
+            out.append(text[i:end])
+            i = end
+            continue
+        if text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            i = end + 2 if end != -1 else n
+            continue
+        if c == '#' or text.startswith('//', i):
+            end = text.find('\n', i)
+            i = end if end != -1 else n
+            continue
+        out.append(c)
+        i += 1
+    return ''.join(out)
+
+
+def _scan_expr(text: str, i: int, stop: str = '') -> int:
+    """Return the end index of the expression starting at text[i].
+
+    The expression ends at a newline or comment at bracket depth 0, or, when
+    `stop` is given (used to split list items), only at one of those characters.
+    """
+    n = len(text)
+    depth = 0
+    while i < n:
+        c = text[i]
+        if c == '"':
+            i = _skip_string(text, i)
+            continue
+        if text.startswith('<<', i):
+            heredoc = _HEREDOC_RE.match(text, i)
+            if heredoc:
+                marker = re.compile(rf'^[ \t]*{heredoc.group(1)}[ \t]*$', re.MULTILINE)
+                end = marker.search(text, heredoc.end())
+                i = end.end() if end else n
+                continue
+        if text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            i = end + 2 if end != -1 else n
+            continue
+        if c == '#' or text.startswith('//', i):
+            if depth == 0:
+                break
+            end = text.find('\n', i)
+            i = end if end != -1 else n
+            continue
+        if depth == 0 and (c in stop if stop else c == '\n'):
+            break
+        if c in '[{(':
+            depth += 1
+        elif c in ']})':
+            depth -= 1
+        i += 1
+    return i
+
+
+def _parse(text: str) -> dict[str, _Entry]:
+    """Find all top-level assignments in tfvars text."""
+    entries: dict[str, _Entry] = {}
+    pos = 0
+    n = len(text)
+    while pos < n:
+        match = _KEY_RE.match(text, pos)
+        if match:
+            start = match.end()
+            end = _scan_expr(text, start)
+            # Trailing whitespace and comments are not part of the value
+            value_end = start + len(text[start:end].rstrip())
+            entries[match.group(1)] = _Entry(match.group(1), start, value_end)
+            pos = end
+        elif text.startswith('/*', pos):
+            end = text.find('*/', pos + 2)
+            pos = end + 2 if end != -1 else n
+            continue
+
+        newline = text.find('\n', pos)
+        pos = newline + 1 if newline != -1 else n
+    return entries
+
+
+def _unquote(raw: str) -> str:
+    """Decode an HCL quoted string literal (without interpolation evaluation)."""
+    out = []
+    i = 1
+    end = len(raw) - 1
+    while i < end:
+        c = raw[i]
+        if c == '\\' and i + 1 < end:
+            nxt = raw[i + 1]
+            if nxt == 'u' and i + 5 < len(raw):
+                out.append(chr(int(raw[i + 2:i + 6], 16)))
+                i += 6
+                continue
+            out.append(_ESCAPES.get(nxt, nxt))
+            i += 2
+            continue
+        if raw.startswith('$${', i) or raw.startswith('%%{', i):
+            # Escaped template sequence: drop the doubled marker
+            i += 1
+            continue
+        out.append(c)
+        i += 1
+    return ''.join(out)
+
+
+def _is_single_string(raw: str) -> bool:
+    return raw.startswith('"') and _skip_string(raw, 0) == len(raw)
+
+
+def _decode(raw: str) -> Any:
+    """Decode an HCL value expression into a Python value where possible."""
+    if _is_single_string(raw):
+        return _unquote(raw)
+    if raw in ("true", "false"):
+        return raw == "true"
+    if re.fullmatch(r'-?\d+', raw):
+        return int(raw)
+    if re.fullmatch(r'-?\d+\.\d*([eE][-+]?\d+)?', raw):
+        return float(raw)
+    if raw.startswith('[') and raw.endswith(']'):
+        items = []
+        body = _strip_comments(raw[1:-1])
+        i = 0
+        while i < len(body):
+            end = _scan_expr(body, i, stop=',')
+            item = body[i:end].strip()
+            if item:
+                items.append(_decode(item))
+            i = end + 1
+        return items
+    # Maps, heredocs and expressions are returned as raw HCL
+    return raw
+
+
+def _quote(value: str) -> str:
+    escaped = (
+        value.replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+        .replace('\t', '\\t')
+        .replace('${', '$${')
+        .replace('%{', '%%{')
+    )
+    return f'"{escaped}"'
+
+
+def render_value(value: Any) -> str:
+    """Render a Python value as an HCL expression."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(render_value(v) for v in value) + "]"
+    return _quote(str(value))
+
+
+class TfvarsDocument:
+    """A terraform.tfvars file parsed into a key -> value map."""
+
+    def __init__(self, path: Path, text: str = ""):
+        self.path = Path(path)
+        self.text = text
+        self.dirty = False
+        self._entries = _parse(text)
+
+    @classmethod
+    def read(cls, path: Path) -> "TfvarsDocument":
+        """Parse a tfvars file (empty document if it does not exist)."""
+        path = Path(path)
+        text = path.read_text(encoding='utf-8') if path.exists() else ""
+        return cls(path, text)
+
+    def keys(self) -> list[str]:
+        return list(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def raw(self, key: str) -> Optional[str]:
+        """Get the raw HCL expression for a key."""
+        entry = self._entries.get(key)
+        return self.text[entry.value_start:entry.value_end] if entry else None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a decoded value (str, bool, int, float, list, or raw HCL)."""
+        raw = self.raw(key)
+        return _decode(raw) if raw is not None else default
+
+    def get_str(self, key: str) -> Optional[str]:
+        """Get a value as a string: decoded for string literals, raw HCL otherwise."""
+        raw = self.raw(key)
+        if raw is None:
+            return None
+        if _is_single_string(raw):
+            return _unquote(raw)
+        return raw
+
+    def set(self, key: str, value: Any) -> None:
+        """Set a key, replacing only its value expression if it already exists."""
+        rendered = render_value(value)
+        entry = self._entries.get(key)
+        if entry:
+            if self.text[entry.value_start:entry.value_end] == rendered:
+                return
+            self.text = self.text[:entry.value_start] + rendered + self.text[entry.value_end:]
+        else:
+            if self.text and not self.text.endswith('\n'):
+                self.text += '\n'
+            self.text += f'{key} = {rendered}\n'
+        self._entries = _parse(self.text)
+        self.dirty = True
+
+    def update(self, values: dict[str, Any]) -> None:
+        for key, value in values.items():
+            self.set(key, value)
+
+    def save(self) -> None:
+        """Write the document atomically (temp file in the same directory + rename)."""
+        mode = self.path.stat().st_mode & 0o777 if self.path.exists() else 0o600
+        write_atomic(self.path, self.text, mode)
+        self.dirty = False
+
+
+# Cache of parsed documents keyed by path, validated against (mtime_ns, size)
+_cache: dict[Path, tuple[tuple[int, int], TfvarsDocument]] = {}
+_cache_lock = threading.Lock()
+
+
+def _stat_key(path: Path) -> Optional[tuple[int, int]]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def load_tfvars(path: Path) -> TfvarsDocument:
+    """Get the parsed document for a tfvars file, re-parsing only if it changed on disk."""
+    path = Path(path).resolve()
+    with _cache_lock:
+        stat_key = _stat_key(path)
+        cached = _cache.get(path)
+        if stat_key is not None and cached and cached[0] == stat_key:
+            return cached[1]
+        doc = TfvarsDocument.read(path)
+        if stat_key is not None:
+            _cache[path] = (stat_key, doc)
+        else:
+            _cache.pop(path, None)
+        return doc
+
+
+@contextmanager
+def tfvars_transaction(path: Path) -> Iterator[TfvarsDocument]:
+    """Set many keys on a private copy of the document, then flush once atomically."""
+    path = Path(path).resolve()
+    doc = TfvarsDocument(path, load_tfvars(path).text)
+    yield doc
+    if doc.dirty:
+        with _cache_lock:
+            doc.save()
+            stat_key = _stat_key(path)
+            if stat_key is not None:
+                _cache[path] = (stat_key, TfvarsDocument(path, doc.text))
+
+
+def terraform_variable_default(tf_file: Path, name: str) -> Optional[str]:
+    """Read the default of a `variable "<name>"` block from a .tf file."""
+    text = Path(tf_file).read_text(encoding='utf-8')
+    match = re.search(rf'^variable\s+"{re.escape(name)}"\s*\{{(.*?)^\}}', text, re.MULTILINE | re.DOTALL)
+    if not match:
+        return None
+    return TfvarsDocument(Path(tf_file), match.group(1)).get_str("default")
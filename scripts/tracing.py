@@ -0,0 +1,191 @@
+"""Nested timing spans for deploy runs, with JSON / Chrome trace export."""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+
+@dataclass
+class Span:
+    """A single timed step."""
+    span_id: int
+    name: str
+    parent_id: Optional[int]
+    depth: int
+    thread: str
+    start: float
+    duration: float = 0.0
+    status: str = "ok"
+    attrs: dict[str, Any] = field(default_factory=dict)
+
+
+class Tracer:
+    """Collects nested spans for one run."""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self.started_at = datetime.now()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._next_id = 0
+
+    def _stack(self) -> list[Span]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self) -> Optional[Span]:
+        """The innermost open span on this thread."""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attrs: Any) -> Iterator[Span]:
+        """
+        Time a block; spans opened inside it (on the same thread) become children.
+
+        Work handed to another thread can pass parent=tracer.current() from the
+        submitting thread to stay nested under it.
+        """
+        stack = self._stack()
+        if parent is None:
+            parent = stack[-1] if stack else None
+        with self._lock:
+            span = Span(
+                span_id=self._next_id,
+                name=name,
+                parent_id=parent.span_id if parent else None,
+                depth=parent.depth + 1 if parent else 0,
+                thread=threading.current_thread().name,
+                start=time.perf_counter() - self._t0,
+                attrs=dict(attrs),
+            )
+            self._next_id += 1
+            self.spans.append(span)
+
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attrs["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - self._t0 - span.start
+            stack.pop()
+
+    def roots(self) -> list[Span]:
+        return [s for s in self.spans if s.parent_id is None]
+
+    def children(self, span: Span) -> list[Span]:
+        return [s for s in self.spans if s.parent_id == span.span_id]
+
+    def to_dict(self) -> dict:
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_time": time.perf_counter() - self._t0,
+            "spans": [asdict(s) for s in self.spans],
+        }
+
+    def to_chrome_trace(self) -> dict:
+        """Convert spans to Chrome trace-event format (chrome://tracing, Perfetto)."""
+        threads: dict[str, int] = {}
+        events = []
+        for s in self.spans:
+            tid = threads.setdefault(s.thread, len(threads) + 1)
+            events.append({
+                "name": s.name,
+                "ph": "X",
+                "ts": round(s.start * 1e6),
+                "dur": round(s.duration * 1e6),
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {"status": s.status, **s.attrs},
+            })
+        for name, tid in threads.items():
+            events.append({
+                "name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                "args": {"name": name},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, trace_dir: Path, label: str, chrome: bool = False) -> list[Path]:
+        """Write the JSON trace (and optionally a Chrome trace) to trace_dir."""
+        trace_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{label}-{self.started_at.strftime('%Y%m%d-%H%M%S')}"
+        paths = [trace_dir / f"{stem}.json"]
+        paths[0].write_text(json.dumps(self.to_dict(), indent=2, default=str), encoding="utf-8")
+        if chrome:
+            paths.append(trace_dir / f"{stem}.chrome.json")
+            paths[1].write_text(json.dumps(self.to_chrome_trace(), default=str), encoding="utf-8")
+        return paths
+
+    def summary(self, slowest: int = 5) -> str:
+        """Format a table of wall time per phase and the slowest steps."""
+        lines = []
+        for root in self.roots():
+            total = root.duration or 1e-9
+            lines.append(f"{root.name}: {root.duration:.2f}s ({root.status})")
+            lines.append(f"  {'Phase':<32} {'Time':>9} {'Share':>7}")
+            for child in self.children(root):
+                lines.append(
+                    f"  {child.name:<32} {child.duration:>8.2f}s {child.duration / total:>6.1%}"
+                    + ("  !" if child.status != "ok" else "")
+                )
+
+        steps = sorted((s for s in self.spans if s.parent_id is not None),
+                       key=lambda s: s.duration, reverse=True)[:slowest]
+        if steps:
+            lines.append("Slowest steps:")
+            for s in steps:
+                path = self._path(s)
+                lines.append(f"  {s.duration:>8.2f}s  {path}")
+        return "\n".join(lines)
+
+    def _path(self, span: Span) -> str:
+        by_id = {s.span_id: s for s in self.spans}
+        names = [span.name]
+        while span.parent_id is not None:
+            span = by_id[span.parent_id]
+            names.append(span.name)
+        return " > ".join(reversed(names))
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer."""
+    return _tracer
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator: run the function inside a span (bool results are recorded)."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _tracer.span(span_name) as span:
+                result = func(*args, **kwargs)
+                if isinstance(result, bool):
+                    span.attrs["result"] = result
+                    if not result:
+                        span.status = "failed"
+                return result
+        return wrapper
+    return decorator
+
+
+def print_summary(slowest: int = 5) -> None:
+    """Print the timing summary to stderr."""
+    print(f"\n{_tracer.summary(slowest)}\n", file=sys.stderr)
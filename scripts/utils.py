@@ -3,10 +3,14 @@
 import subprocess
 import sys
 import os
-import re
+import json
 from pathlib import Path
 from typing import Optional, Tuple
 
+from scripts.docker_api import DockerClient
+from scripts.ssh_session import ssh_run
+from scripts.tfvars import load_tfvars, tfvars_transaction
+
 # ANSI Colors
 class Colors:
     RED = '\033[0;31m'
@@ -52,60 +56,31 @@ def run_cmd(
     )
 
 
+# Runs the scripts against another checkout (the offline harness uses a sandbox copy)
+PROJECT_ROOT_ENV = "SELFHOST_PROJECT_ROOT"
+
+
 def get_project_root() -> Path:
     """Get the project root directory."""
-    return Path(__file__).parent.parent
+    override = os.getenv(PROJECT_ROOT_ENV)
+    return Path(override) if override else Path(__file__).parent.parent
 
 
 def read_tfvars(key: str) -> Optional[str]:
-    """Read a value from terraform.tfvars."""
-    tfvars_path = get_project_root() / "terraform.tfvars"
-    if not tfvars_path.exists():
-        return None
-
-    with open(tfvars_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Match key = "value" or key = value
-    pattern = rf'^{key}\s*=\s*"?([^"\n]+)"?'
-    match = re.search(pattern, content, re.MULTILINE)
-    return match.group(1).strip() if match else None
-
-
-def write_tfvars(key: str, value: str, tfvars_file: str = "terraform.tfvars") -> None:
-    """Write or update a value in terraform.tfvars."""
-    tfvars_path = get_project_root() / tfvars_file
+    """Read a value from terraform.tfvars (parsed once, cached until the file changes)."""
+    return load_tfvars(get_project_root() / "terraform.tfvars").get_str(key)
 
-    if tfvars_path.exists():
-        with open(tfvars_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    else:
-        content = ""
 
-    # Check if key exists
-    pattern = rf'^{key}\s*=.*$'
-    if re.search(pattern, content, re.MULTILINE):
-        # Update existing
-        content = re.sub(pattern, f'{key} = "{value}"', content, flags=re.MULTILINE)
-    else:
-        # Append new
-        content += f'\n{key} = "{value}"\n'
-
-    with open(tfvars_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+def update_tfvars(values: dict, tfvars_file: str = "terraform.tfvars") -> None:
+    """Write or update several values in terraform.tfvars with a single atomic write."""
+    with tfvars_transaction(get_project_root() / tfvars_file) as doc:
+        doc.update(values)
 
 
 def check_ssh(host: str, user: str = "root", timeout: int = 5) -> bool:
     """Check if SSH is available on a host."""
     try:
-        result = run_cmd(
-            ["ssh", "-o", f"ConnectTimeout={timeout}",
-             "-o", "StrictHostKeyChecking=no",
-             "-o", "BatchMode=yes",
-             f"{user}@{host}", "exit"],
-            capture=True,
-            check=False
-        )
+        result = ssh_run(host, user, "exit", connect_timeout=timeout)
         return result.returncode == 0
     except Exception:
         return False
@@ -114,32 +89,70 @@ def check_ssh(host: str, user: str = "root", timeout: int = 5) -> bool:
 def check_docker(host: str, user: str = "root") -> bool:
     """Check if Docker is available via SSH."""
     try:
-        result = run_cmd(
-            ["ssh", "-o", "ConnectTimeout=5",
-             "-o", "StrictHostKeyChecking=no",
-             f"{user}@{host}", "docker", "version"],
-            capture=True,
-            check=False
-        )
+        result = ssh_run(host, user, "docker version", connect_timeout=5)
         return result.returncode == 0
     except Exception:
         return False
 
 
+class TerraformOutputStore:
+    """In-memory snapshot of all Terraform outputs, loaded with one `terraform output -json`."""
+
+    def __init__(self, cwd: Optional[Path] = None):
+        self.cwd = cwd or get_project_root()
+        self._outputs: Optional[dict] = None
+        self.loads = 0
+
+    def load(self) -> dict:
+        """Load (or return the cached) map of output name -> value."""
+        if self._outputs is not None:
+            return self._outputs
+
+        outputs = {}
+        try:
+            result = run_cmd(
+                ["terraform", "output", "-json"],
+                capture=True,
+                check=False,
+                cwd=str(self.cwd)
+            )
+            if result.returncode == 0 and result.stdout.strip():
+                outputs = {
+                    name: data.get("value")
+                    for name, data in json.loads(result.stdout).items()
+                }
+        except Exception:
+            pass
+
+        self.loads += 1
+        self._outputs = outputs
+        return outputs
+
+    def get(self, name: str) -> Optional[str]:
+        """Get an output formatted like `terraform output -raw` (None if unset or complex)."""
+        value = self.load().get(name)
+        if value is None or isinstance(value, (dict, list)):
+            return None
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        return str(value)
+
+    def invalidate(self) -> None:
+        """Drop the snapshot so the next lookup re-reads Terraform state."""
+        self._outputs = None
+
+
+_terraform_outputs = TerraformOutputStore()
+
+
 def terraform_output(name: str) -> Optional[str]:
-    """Get a Terraform output value."""
-    try:
-        result = run_cmd(
-            ["terraform", "output", "-raw", name],
-            capture=True,
-            check=False,
-            cwd=str(get_project_root())
-        )
-        if result.returncode == 0:
-            return result.stdout.strip()
-    except Exception:
-        pass
-    return None
+    """Get a Terraform output value (served from the cached output snapshot)."""
+    return _terraform_outputs.get(name)
+
+
+def invalidate_terraform_outputs() -> None:
+    """Invalidate cached Terraform outputs after state changes (apply, destroy, state rm)."""
+    _terraform_outputs.invalidate()
 
 
 def ensure_ssh_key() -> Tuple[str, str]:
@@ -169,64 +182,49 @@ def ensure_ssh_key() -> Tuple[str, str]:
 
 
 def cleanup_docker_resources(host: str, user: str, network_name: str = "infisical") -> bool:
-    """Clean up Docker containers, volumes, and networks via SSH."""
-    log_step("Cleaning up Docker resources...")
+    """
+    Remove the Infisical containers, network and volumes on the Docker host.
 
-    cleanup_script = f'''
-        # Find containers connected to network
-        CONTAINERS=$(docker network inspect {network_name} --format '{{{{range .Containers}}}}{{{{.Name}}}} {{{{end}}}}' 2>/dev/null || echo '')
-
-        if [ -n "$CONTAINERS" ]; then
-            echo "Stopping containers: $CONTAINERS"
-            for container in $CONTAINERS; do
-                docker stop "$container" 2>/dev/null || true
-                docker rm -f "$container" 2>/dev/null || true
-            done
-        fi
-
-        # Also stop/remove known infisical containers by name
-        for container in infisical infisical-postgres infisical-redis; do
-            docker stop "$container" 2>/dev/null || true
-            docker rm -f "$container" 2>/dev/null || true
-        done
-
-        # Force disconnect all containers from network
-        docker network inspect {network_name} --format '{{{{range $key, $value := .Containers}}}}{{{{println $key}}}}{{{{end}}}}' 2>/dev/null | while read container_id; do
-            if [ -n "$container_id" ]; then
-                docker network disconnect -f {network_name} "$container_id" 2>/dev/null || true
-            fi
-        done
-
-        # Force remove network (try multiple times, handle stale endpoints)
-        for i in 1 2 3; do
-            docker network rm {network_name} 2>/dev/null && break
-            # If failed, try to remove stale endpoints
-            docker network inspect {network_name} 2>/dev/null | grep -o '"EndpointID": "[^"]*"' | cut -d'"' -f4 | while read ep; do
-                docker network disconnect -f {network_name} "$ep" 2>/dev/null || true
-            done
-            sleep 1
-        done
-
-        # Remove volumes (important: this deletes all data!)
-        for volume in {network_name}_postgres_data {network_name}_redis_data; do
-            docker volume rm "$volume" 2>/dev/null || true
-        done
-        echo "Docker cleanup completed (containers, network, volumes)"
-    '''
+    Talks to the Docker Engine API over the shared SSH connection; if the
+    socket cannot be forwarded, falls back to a one-shot docker CLI command.
+    Failures are logged but never fatal.
+    """
+    log_step("Cleaning up Docker resources...")
+    containers = ["infisical", "infisical-postgres", "infisical-redis"]
+    volumes = [f"{network_name}_postgres_data", f"{network_name}_redis_data"]
 
     try:
-        result = run_cmd(
-            ["ssh", "-o", "StrictHostKeyChecking=no", f"{user}@{host}", cleanup_script],
-            capture=True,
-            check=False
-        )
-
-        if result.returncode == 0:
-            log_info("Docker cleanup completed")
+        client = DockerClient.over_ssh(host, user)
+        if client is None:
+            log_warn("Could not forward the Docker socket, falling back to the docker CLI")
+            # Same as DockerClient.cleanup: if the network has stale endpoints
+            # (containers gone, endpoints left behind), detach them and retry once
+            endpoint_ids = "'{{range $id, $_ := .Containers}}{{$id}} {{end}}'"
+            endpoints = f"docker network inspect -f {endpoint_ids} {network_name} 2>/dev/null"
+            detach = f'docker network disconnect -f {network_name} "$ep"'
+            rm_network = f"docker network rm {network_name} 2>/dev/null"
+            rm_containers = f"docker rm -f {' '.join(containers)} 2>/dev/null"
+            rm_volumes = f"docker volume rm {' '.join(volumes)} 2>/dev/null"
+            retry_network = f"{{ for ep in $({endpoints}); do {detach}; done; {rm_network}; }}"
+            result = ssh_run(
+                host, user,
+                f"{rm_containers}; {rm_network} || {retry_network}; {rm_volumes}; true"
+            )
+            if result.returncode != 0:
+                log_warn(f"Docker cleanup had issues: {result.stderr}")
             return True
 
-        log_warn(f"Docker cleanup had issues: {result.stderr}")
-        return True  # Non-fatal
+        result = client.cleanup(network_name, containers, volumes)
+        removed = (
+            result.removed_containers
+            + ([network_name] if result.removed_network else [])
+            + result.removed_volumes
+        )
+        summary = ', '.join(removed) or 'nothing'
+        log_info(f"Docker cleanup removed {summary} in {result.seconds:.1f}s")
+        for error in result.errors:
+            log_warn(f"Docker cleanup had issues: {error}")
+        return True
 
     except Exception as e:
         log_warn(f"Docker cleanup failed: {e}")
@@ -245,11 +243,7 @@ def copy_ssh_key_to_container(
     # Check if key already exists
     check_cmd = f"pct exec {container_id} -- cat /root/.ssh/authorized_keys 2>/dev/null"
     try:
-        result = run_cmd(
-            ["ssh", "-o", "StrictHostKeyChecking=no", f"{proxmox_user}@{proxmox_host}", check_cmd],
-            capture=True,
-            check=False
-        )
+        result = ssh_run(proxmox_host, proxmox_user, check_cmd)
 
         # Extract key fingerprint to compare
         key_part = public_key.split()[1] if len(public_key.split()) > 1 else public_key
@@ -269,11 +263,7 @@ def copy_ssh_key_to_container(
     ' '''
 
     try:
-        run_cmd(
-            ["ssh", "-o", "StrictHostKeyChecking=no", f"{proxmox_user}@{proxmox_host}", add_cmd],
-            capture=True,
-            check=True
-        )
+        ssh_run(proxmox_host, proxmox_user, add_cmd, check=True)
         log_info("SSH key copied to container")
         return True
 
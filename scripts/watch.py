@@ -0,0 +1,273 @@
+"""Continuous health monitor for the Infisical stack, exported as Prometheus metrics.
+
+Infisical is probed over HTTP (keep-alive session); Postgres and Redis are
+probed inside their containers through one long-lived remote shell each,
+multiplexed over the shared SSH connection, so a probe costs one round trip
+instead of a new ssh process (and never waits for another probe's command).
+"""
+
+import queue
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+import requests
+from requests.exceptions import RequestException
+
+from scripts.ssh_session import get_ssh_session
+from scripts.utils import log_info, log_warn
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+DEFAULT_PORT = 9477
+DEFAULT_INTERVAL = 15.0
+PROBE_TIMEOUT = 5.0
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram (Prometheus semantics: rates are computed by the scraper)."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    self.counts[i] += 1
+            self.total += seconds
+            self.count += 1
+
+    def snapshot(self) -> tuple[list[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.total, self.count
+
+
+class RemoteShell:
+    """A long-lived `sh` on a host over the shared SSH master; runs one command at a time."""
+
+    def __init__(self, host: str, user: str):
+        self.host = host
+        self.user = user
+        self._proc: Optional[subprocess.Popen] = None
+        self._lines: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+
+    def _start(self) -> None:
+        session = get_ssh_session()
+        session.connect(self.user, self.host)
+        self._proc = subprocess.Popen(
+            [*session.ssh_cmd(self.user, self.host), "sh"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read, args=(self._proc, self._lines), daemon=True).start()
+
+    @staticmethod
+    def _read(proc: subprocess.Popen, lines: queue.Queue) -> None:
+        for line in proc.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    def run(self, command: str, timeout: float = PROBE_TIMEOUT) -> tuple[int, str]:
+        """
+        Run a command in the remote shell.
+
+        Returns:
+            (exit code, output); raises TimeoutError or ConnectionError, after
+            which the shell is restarted on the next call
+        """
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+            marker = f"__selfhost_{uuid.uuid4().hex}__"
+            try:
+                self._proc.stdin.write(f"{{ {command}; }} </dev/null 2>&1; echo \"{marker} $?\"\n")
+                self._proc.stdin.flush()
+            except OSError as e:
+                self._close()
+                raise ConnectionError(f"{self.user}@{self.host}: {e}") from e
+
+            deadline = time.monotonic() + timeout
+            output = []
+            while True:
+                try:
+                    line = self._lines.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    # The shell is stuck in the command: drop it rather than desync the stream
+                    self._close()
+                    raise TimeoutError(f"{command!r} timed out after {timeout:.0f}s") from None
+                if line is None:
+                    self._close()
+                    raise ConnectionError(f"{self.user}@{self.host}: shell exited")
+                if line.startswith(marker):
+                    return int(line.split()[1]), "".join(output)
+                output.append(line)
+
+    def _close(self) -> None:
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.wait()
+            self._proc = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+
+@dataclass
+class Probe:
+    """A named health check; check() raises or returns False when unhealthy."""
+    name: str
+    check: Callable[[], bool]
+
+
+class HealthMonitor:
+    """Runs probes on an interval and keeps their latency histograms and status."""
+
+    def __init__(self, probes: list[Probe], interval: float = DEFAULT_INTERVAL):
+        self.probes = probes
+        self.interval = interval
+        self.histograms = {p.name: LatencyHistogram() for p in probes}
+        # Outcome of the last probe (absent until the first one ran)
+        self.up: dict[str, bool] = {}
+        self.failures = {p.name: 0 for p in probes}
+        # Probe threads write up/failures while the metrics handler reads them
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _run_probe(self, probe: Probe) -> None:
+        start = time.perf_counter()
+        try:
+            ok, error = probe.check(), "check failed"
+        except Exception as e:  # a probe error is a data point, not a crash
+            ok, error = False, f"{type(e).__name__}: {e}"
+        self.histograms[probe.name].observe(time.perf_counter() - start)
+        with self._lock:
+            was_up = self.up.get(probe.name)
+            self.up[probe.name] = ok
+            if not ok:
+                self.failures[probe.name] += 1
+        if not ok and was_up is not False:
+            log_warn(f"{probe.name} is down: {error}")
+        elif ok and was_up is False:
+            log_info(f"{probe.name} is back up")
+
+    def run(self) -> None:
+        """Probe concurrently every interval until stop() is called."""
+        with ThreadPoolExecutor(max_workers=len(self.probes), thread_name_prefix="probe") as pool:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                list(pool.map(self._run_probe, self.probes))
+                self._stop.wait(max(self.interval - (time.monotonic() - started), 0))
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def render(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        with self._lock:
+            up, failures = dict(self.up), dict(self.failures)
+        lines = [
+            "# HELP selfhost_probe_duration_seconds Health probe latency.",
+            "# TYPE selfhost_probe_duration_seconds histogram",
+        ]
+        metric = "selfhost_probe_duration_seconds"
+        for name, histogram in self.histograms.items():
+            counts, total, count = histogram.snapshot()
+            target = f'target="{name}"'
+            for bound, n in zip(histogram.buckets, counts):
+                lines.append(f'{metric}_bucket{{{target},le="{bound}"}} {n}')
+            lines.append(f'{metric}_bucket{{{target},le="+Inf"}} {count}')
+            lines.append(f"{metric}_sum{{{target}}} {total:.6f}")
+            lines.append(f"{metric}_count{{{target}}} {count}")
+        lines += [
+            "# HELP selfhost_probe_up Whether the last probe succeeded.",
+            "# TYPE selfhost_probe_up gauge",
+        ]
+        lines += [f'selfhost_probe_up{{target="{name}"}} {int(is_up)}'
+                  for name, is_up in up.items()]
+        lines += [
+            "# HELP selfhost_probe_failures_total Failed probes.",
+            "# TYPE selfhost_probe_failures_total counter",
+        ]
+        lines += [f'selfhost_probe_failures_total{{target="{name}"}} {n}'
+                  for name, n in failures.items()]
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(
+    monitor: HealthMonitor,
+    port: int,
+    bind: str = "127.0.0.1"
+) -> ThreadingHTTPServer:
+    """Serve /metrics on a background thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = monitor.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((bind, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def infisical_stack_probes(
+    docker_host: str,
+    docker_ssh_user: str,
+    infisical_port: int,
+    network_name: str = "infisical"
+) -> tuple[list[Probe], list[RemoteShell]]:
+    """
+    Probes for Infisical, Postgres and Redis on the Docker host (and their shells, to close).
+
+    Each remote probe has its own shell: on a shared one, a probe's latency
+    would include waiting for the other probe's command.
+    """
+    postgres_shell = RemoteShell(docker_host, docker_ssh_user)
+    redis_shell = RemoteShell(docker_host, docker_ssh_user)
+    # Plain session (no retry adapter): every probe is exactly one request
+    http = requests.Session()
+    status_url = f"http://{docker_host}:{infisical_port}/api/status"
+
+    def infisical() -> bool:
+        try:
+            return http.get(status_url, timeout=PROBE_TIMEOUT).status_code == 200
+        except RequestException:
+            return False
+
+    def postgres() -> bool:
+        return postgres_shell.run(f"docker exec {network_name}-postgres pg_isready -q")[0] == 0
+
+    def redis() -> bool:
+        code, output = redis_shell.run(f"docker exec {network_name}-redis redis-cli ping")
+        return code == 0 and output.strip() == "PONG"
+
+    probes = [Probe("infisical", infisical), Probe("postgres", postgres), Probe("redis", redis)]
+    return probes, [postgres_shell, redis_shell]
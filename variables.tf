@@ -87,6 +87,18 @@ variable "docker_template_storage" {
   default     = "local"
 }
 
+variable "docker_template_vmid" {
+  description = "VMID of the golden Docker LXC template (set by deploy.py template build, 0 = use ostemplate)"
+  type        = number
+  default     = 0
+}
+
+variable "docker_full_clone" {
+  description = "Full clone of the golden template (false = linked clone where the storage supports it)"
+  type        = bool
+  default     = false
+}
+
 variable "docker_cores" {
   description = "Number of CPU cores"
   type        = number
@@ -135,6 +147,12 @@ variable "docker_install_compose" {
   default     = true
 }
 
+variable "docker_apk_cache_max_mb" {
+  description = "Size limit in MB of the apk package cache on the Proxmox host (0 = disabled)"
+  type        = number
+  default     = 0
+}
+
 variable "docker_start_on_boot" {
   description = "Start on boot"
   type        = bool